@@ -7,18 +7,29 @@ from fastapi.responses import JSONResponse
 
 from app.core.logging import logger
 from app.models.error import ErrorResponse
-from app.services.errors import ConflictError, NotFoundError, ServiceError, ValidationError
+from app.services.errors import (
+    ConflictError,
+    NotFoundError,
+    PreconditionFailedError,
+    ServiceError,
+    StaleVersionError,
+    ValidationError,
+)
 
 SERVICE_ERROR_STATUS = {
     NotFoundError: status.HTTP_404_NOT_FOUND,
     ConflictError: status.HTTP_409_CONFLICT,
+    StaleVersionError: status.HTTP_409_CONFLICT,
     ValidationError: status.HTTP_400_BAD_REQUEST,
+    PreconditionFailedError: status.HTTP_412_PRECONDITION_FAILED,
 }
 
 SERVICE_ERROR_CODES = {
     NotFoundError: "not_found",
     ConflictError: "conflict",
+    StaleVersionError: "version_conflict",
     ValidationError: "validation_error",
+    PreconditionFailedError: "precondition_failed",
 }
 
 HTTP_STATUS_CODES = {
@@ -27,6 +38,7 @@ HTTP_STATUS_CODES = {
     status.HTTP_403_FORBIDDEN: "forbidden",
     status.HTTP_404_NOT_FOUND: "not_found",
     status.HTTP_409_CONFLICT: "conflict",
+    status.HTTP_412_PRECONDITION_FAILED: "precondition_failed",
     status.HTTP_422_UNPROCESSABLE_CONTENT: "request_validation_error",
 }
 
@@ -56,6 +68,17 @@ def register_exception_handlers(app: FastAPI) -> None:
         status_code = SERVICE_ERROR_STATUS.get(type(exc), status.HTTP_400_BAD_REQUEST)
         code = SERVICE_ERROR_CODES.get(type(exc), "service_error")
         trace_id = _ensure_trace_id(request)
+        if isinstance(exc, StaleVersionError):
+            # The current state lets the client merge and retry with its version.
+            payload = ErrorResponse(
+                code=code,
+                message=str(exc),
+                detail=jsonable_encoder(exc.current),
+                trace_id=trace_id,
+            )
+            response = _response(status_code=status_code, payload=payload, trace_id=trace_id)
+            response.headers["ETag"] = f'"{exc.current["version"]}"'
+            return response
         payload = ErrorResponse(code=code, message=str(exc), detail=None, trace_id=trace_id)
         return _response(status_code=status_code, payload=payload, trace_id=trace_id)
 
@@ -1,25 +1,37 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Annotated, Any
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
+from typing import Annotated, Any, TypedDict, Unpack
 
-from fastapi import APIRouter, Depends, Query, status
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
-from app.db.session import get_session
+from app.db.session import SessionLocal, get_session
 from app.models.planning_pro import (
     Assignment,
+    AssignmentBatch,
+    AssignmentBatchResult,
     AssignmentCreate,
     AssignmentUpdate,
     AssignmentWriteResponse,
+    Blackout,
+    BlackoutCreate,
     ConflictEntry,
     ConflictRule,
+    CoverageReport,
     HrRule,
+    PlanningBoardDay,
+    PlanningChangeFeed,
+    PlanningValidationReport,
     Publication,
     ShiftInstance,
     ShiftInstanceCreate,
     ShiftInstanceUpdate,
+    ShiftMaterialisation,
+    ShiftMaterialisationRequest,
     ShiftTemplate,
     ShiftTemplateCreate,
     ShiftTemplateUpdate,
@@ -28,19 +40,41 @@ from app.models.planning_pro import (
     UserAvailability,
     UserAvailabilityCreate,
 )
+from app.services.auto_assign_jobs import AutoAssignJobService
+from app.services.board_days import BoardDayProjection
+from app.services.conflict_maintenance import ConflictMaintenanceService
+from app.services.errors import PreconditionFailedError
 from app.services.planning_pro import (
+    CHANGE_FEED_BATCH_SIZE,
     AssignmentService,
     AuditService,
-    AutoAssignJobService,
     AvailabilityService,
+    BlackoutService,
+    PlanningChangeRecord,
     PublicationService,
     RuleService,
+    ShiftCursor,
     ShiftInstanceService,
     ShiftTemplateService,
 )
+from app.services.planning_validation import CoverageService, PlanningValidationService
+from app.services.planning_versions import PlanningVersionService
+from app.services.references import ReferenceLoader
 
 router = APIRouter(prefix="/api/v1/planning", tags=["planning_pro"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class _ShiftFilters(TypedDict, total=False):
+    mission_id: int | None
+    start: datetime | None
+    end: datetime | None
+    site_ids: list[int] | None
+    collaborator_ids: list[int] | None
+    statuses: list[str] | None
+    understaffed: bool | None
+
 
 class ConflictPreviewPayload(BaseModel):
     shift: ShiftInstanceCreate | None = None
@@ -59,20 +93,23 @@ class ConflictPreviewResult(BaseModel):
 
 class AutoAssignStartRequest(BaseModel):
     shift_ids: list[int] | None = None
+    time_budget_seconds: float | None = Field(default=None, gt=0)
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
 def get_planning_services(session: SessionDep) -> dict[str, object]:
-    rule_service = RuleService(session)
-    template_service = ShiftTemplateService(session)
-    instance_service = ShiftInstanceService(session, rule_service)
-    assignment_service = AssignmentService(session, rule_service)
-    availability_service = AvailabilityService(session)
+    references = ReferenceLoader(session)
+    rule_service = RuleService(session, references)
+    conflict_service = ConflictMaintenanceService(session, rule_service)
+    template_service = ShiftTemplateService(session, references)
+    instance_service = ShiftInstanceService(session, conflict_service, references)
+    assignment_service = AssignmentService(session, conflict_service, references)
+    availability_service = AvailabilityService(session, conflict_service)
     audit_service = AuditService(session)
     publication_service = PublicationService(session, audit_service)
-    auto_assign_service = AutoAssignJobService(session, assignment_service)
+    auto_assign_service = AutoAssignJobService(session, SessionLocal)
     return {
         "templates": template_service,
         "instances": instance_service,
@@ -82,16 +119,86 @@ def get_planning_services(session: SessionDep) -> dict[str, object]:
         "publication": publication_service,
         "auto_assign": auto_assign_service,
         "rules": rule_service,
+        "conflicts": conflict_service,
+        "blackouts": BlackoutService(session, conflict_service, references),
+        "validation": PlanningValidationService(session, rule_service),
+        "board_days": BoardDayProjection(session),
+        "versions": PlanningVersionService(session),
+        "coverage": CoverageService(session),
     }
 
 
 PlanningServicesDep = Annotated[dict[str, object], Depends(get_planning_services)]
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate == "*" or candidate.removeprefix("W/") == opaque
+        for candidate in (value.strip() for value in if_none_match.split(","))
+    )
+
+
+def _not_modified(
+    request: Request,
+    response: Response,
+    services: dict[str, object],
+    organization_id: int | None = None,
+) -> Response | None:
+    """Answer ``304 Not Modified`` when the client already holds this read.
+
+    The ETag hashes the planning version of ``organization_id`` (all
+    organizations when ``None``) with the path, query string and ``Accept``
+    header, so revalidating costs one lookup on ``planning_versions``. Otherwise
+    the tag is set on ``response`` and the caller runs its query.
+    """
+
+    versions: PlanningVersionService = services["versions"]  # type: ignore[assignment]
+    headers = {
+        "ETag": versions.etag(
+            organization_id,
+            request.url.path,
+            request.url.query,
+            request.headers.get("accept", ""),
+        ),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _if_match_version(request: Request) -> int | None:
+    """Row version required by ``If-Match``; ``None`` when absent or ``*``.
+
+    Shift and assignment versions are exchanged as strong entity tags
+    (``"3"``), the ``version`` field of their representation. If-Match uses
+    strong comparison, so weak tags, tag lists and anything else can never
+    match a version and fail the precondition.
+    """
+
+    value = request.headers.get("if-match", "").strip()
+    if value in ("", "*"):
+        return None
+    tag = value.removeprefix('"').removesuffix('"')
+    if len(tag) != len(value) - 2 or not tag.isdigit():
+        raise PreconditionFailedError('If-Match must be a single version tag such as "3"')
+    return int(tag)
+
+
 @router.get("/shift-templates", response_model=list[ShiftTemplate])
 def list_shift_templates(
-    services: PlanningServicesDep, mission_id: int | None = Query(default=None)
-) -> list[ShiftTemplate]:
+    request: Request,
+    response: Response,
+    services: PlanningServicesDep,
+    mission_id: int | None = Query(default=None),
+) -> list[ShiftTemplate] | Response:
+    if (not_modified := _not_modified(request, response, services)) is not None:
+        return not_modified
     template_service: ShiftTemplateService = services["templates"]  # type: ignore[assignment]
     return template_service.list_templates(mission_id=mission_id)
 
@@ -162,12 +269,89 @@ def delete_shift_template(
     )
 
 
+@router.post(
+    "/shift-templates/materialise",
+    response_model=ShiftMaterialisation,
+    status_code=status.HTTP_201_CREATED,
+)
+def materialise_shift_templates(
+    payload: ShiftMaterialisationRequest,
+    services: PlanningServicesDep,
+) -> ShiftMaterialisation:
+    instance_service: ShiftInstanceService = services["instances"]  # type: ignore[assignment]
+    audit_service: AuditService = services["audit"]  # type: ignore[assignment]
+    result = instance_service.materialise_occurrences(payload)
+    audit_service.log_changes(
+        organization_id=1,
+        actor_user_id=None,
+        entity_type="shift_instance",
+        changes=[
+            PlanningChangeRecord(
+                entity_id=shift.id, action="create_shift", before=None, after=shift.model_dump()
+            )
+            for shift in instance_service.get_instance_states(result.shift_ids)
+        ],
+        payload={"materialisation": payload.model_dump()},
+    )
+    return result
+
+
+def _list_shifts(
+    request: Request,
+    response: Response,
+    services: dict[str, object],
+    *,
+    cursor: str | None,
+    limit: int | None,
+    **filters: Unpack[_ShiftFilters],
+) -> list[ShiftWithAssignments] | Response:
+    """List shifts in ``(start_utc, id)`` order, paged by keyset or streamed.
+
+    With ``limit`` a full page sets ``X-Next-Cursor`` to pass back as
+    ``cursor``; ``Accept: application/x-ndjson`` streams one shift per line.
+    Reads are conditional on the planning version of all organizations.
+    """
+
+    if (not_modified := _not_modified(request, response, services)) is not None:
+        return not_modified
+    instance_service: ShiftInstanceService = services["instances"]  # type: ignore[assignment]
+    after = ShiftCursor.decode(cursor) if cursor else None
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _stream_shifts(after, limit, filters),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=dict(response.headers),
+        )
+    shifts = instance_service.list_instances(after=after, limit=limit, **filters)
+    if limit is not None and len(shifts) == limit:
+        response.headers["X-Next-Cursor"] = ShiftCursor.after_shift(shifts[-1].shift).encode()
+    return shifts
+
+
+def _stream_shifts(
+    after: ShiftCursor | None, limit: int | None, filters: _ShiftFilters
+) -> Iterator[str]:
+    # The body is sent after the endpoint returns, when the request session may
+    # already be closed, so the stream reads through a session of its own.
+    with SessionLocal() as session:
+        conflict_service = ConflictMaintenanceService(session, RuleService(session))
+        instance_service = ShiftInstanceService(session, conflict_service)
+        for view in instance_service.stream_instances(after=after, limit=limit, **filters):
+            yield view.model_dump_json() + "\n"
+
+
 @router.get("/shifts", response_model=list[ShiftWithAssignments])
 def list_shift_instances(
-    services: PlanningServicesDep, mission_id: int | None = Query(default=None)
-) -> list[ShiftWithAssignments]:
-    instance_service: ShiftInstanceService = services["instances"]  # type: ignore[assignment]
-    return instance_service.list_instances(mission_id=mission_id)
+    request: Request,
+    response: Response,
+    services: PlanningServicesDep,
+    mission_id: int | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=1000),
+) -> list[ShiftWithAssignments] | Response:
+    return _list_shifts(
+        request, response, services, cursor=cursor, limit=limit, mission_id=mission_id
+    )
 
 
 @router.post("/shifts", response_model=ShiftWriteResponse, status_code=status.HTTP_201_CREATED)
@@ -192,20 +376,30 @@ def create_shift_instance(
 
 @router.get("/shift-instances", response_model=list[ShiftWithAssignments])
 def filter_shift_instances(
+    request: Request,
+    response: Response,
     services: PlanningServicesDep,
     start: Annotated[datetime | None, Query()] = None,
     end: Annotated[datetime | None, Query()] = None,
     place_ids: Annotated[list[int] | None, Query(alias="place_ids")] = None,
     person_ids: Annotated[list[int] | None, Query(alias="person_ids")] = None,
     status: Annotated[list[str] | None, Query(alias="status")] = None,
-) -> list[ShiftWithAssignments]:
-    instance_service: ShiftInstanceService = services["instances"]  # type: ignore[assignment]
-    return instance_service.list_instances(
+    understaffed: Annotated[bool | None, Query()] = None,
+    cursor: Annotated[str | None, Query()] = None,
+    limit: Annotated[int | None, Query(ge=1, le=1000)] = None,
+) -> list[ShiftWithAssignments] | Response:
+    return _list_shifts(
+        request,
+        response,
+        services,
+        cursor=cursor,
+        limit=limit,
         start=start,
         end=end,
         site_ids=place_ids,
         collaborator_ids=person_ids,
         statuses=status,
+        understaffed=understaffed,
     )
 
 
@@ -213,17 +407,22 @@ def filter_shift_instances(
 def update_shift_instance(
     shift_id: int,
     payload: ShiftInstanceUpdate,
+    request: Request,
+    response: Response,
     services: PlanningServicesDep,
 ) -> ShiftWriteResponse:
     instance_service: ShiftInstanceService = services["instances"]  # type: ignore[assignment]
     audit_service: AuditService = services["audit"]  # type: ignore[assignment]
     before = instance_service.get_instance_state(shift_id).model_dump()
-    shift_view = instance_service.update_instance(shift_id, payload)
+    shift_view = instance_service.update_instance(
+        shift_id, payload, expected_version=_if_match_version(request)
+    )
+    response.headers["ETag"] = f'"{shift_view.shift.version}"'
     audit_service.log_change(
         organization_id=1,
         actor_user_id=None,
         entity_type="shift_instance",
-        entity_id=shift_id,
+        entity_id=shift_view.shift.id,
         action="update_shift",
         before=before,
         after=shift_view.shift.model_dump(),
@@ -235,9 +434,11 @@ def update_shift_instance(
 def update_shift_instance_alias(
     shift_id: int,
     payload: ShiftInstanceUpdate,
+    request: Request,
+    response: Response,
     services: PlanningServicesDep,
 ) -> ShiftWriteResponse:
-    return update_shift_instance(shift_id, payload, services)
+    return update_shift_instance(shift_id, payload, request, response, services)
 
 
 @router.delete("/shifts/{shift_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -248,12 +449,39 @@ def delete_shift_instance(
     instance_service: ShiftInstanceService = services["instances"]  # type: ignore[assignment]
     audit_service: AuditService = services["audit"]  # type: ignore[assignment]
     before = instance_service.get_instance_state(shift_id).model_dump()
-    instance_service.delete_instance(shift_id)
+    removal = instance_service.delete_instance(shift_id)
+    audit_service.log_changes(
+        organization_id=1,
+        actor_user_id=None,
+        entity_type="assignment",
+        changes=[
+            PlanningChangeRecord(
+                entity_id=assignment.id,
+                action="delete_assignment",
+                before=assignment.model_dump(),
+                after=None,
+            )
+            for assignment in removal.assignments
+        ],
+        payload={"shift_deleted": shift_id},
+    )
+    if removal.cancelled is not None:
+        # Recurring occurrences stay stored as cancelled rows: an upsert, not a tombstone.
+        audit_service.log_change(
+            organization_id=1,
+            actor_user_id=None,
+            entity_type="shift_instance",
+            entity_id=removal.cancelled.id,
+            action="cancel_shift",
+            before=before,
+            after=removal.cancelled.model_dump(),
+        )
+        return
     audit_service.log_change(
         organization_id=1,
         actor_user_id=None,
         entity_type="shift_instance",
-        entity_id=shift_id,
+        entity_id=before["id"],
         action="delete_shift",
         before=before,
         after=None,
@@ -262,8 +490,13 @@ def delete_shift_instance(
 
 @router.get("/assignments", response_model=list[Assignment])
 def list_assignments(
-    services: PlanningServicesDep, instance_id: int | None = Query(default=None)
-) -> list[Assignment]:
+    request: Request,
+    response: Response,
+    services: PlanningServicesDep,
+    instance_id: int | None = Query(default=None),
+) -> list[Assignment] | Response:
+    if (not_modified := _not_modified(request, response, services)) is not None:
+        return not_modified
     assignment_service: AssignmentService = services["assignments"]  # type: ignore[assignment]
     return assignment_service.list_assignments(instance_id=instance_id)
 
@@ -292,16 +525,56 @@ def create_assignment(
     return AssignmentWriteResponse(assignment=assignment, conflicts=conflicts)
 
 
+@router.post("/assignments:batch", response_model=AssignmentBatchResult)
+def create_assignments_batch(
+    payload: AssignmentBatch,
+    services: PlanningServicesDep,
+) -> AssignmentBatchResult:
+    assignment_service: AssignmentService = services["assignments"]  # type: ignore[assignment]
+    audit_service: AuditService = services["audit"]  # type: ignore[assignment]
+    before = assignment_service.existing_states(payload.items)
+    result = assignment_service.bulk_upsert(payload.items)
+    after = {
+        item.assignment.id: item.assignment
+        for item in result.items
+        if item.assignment is not None
+    }
+    previous = {assignment.id: assignment for assignment in before.values()}
+    audit_service.log_changes(
+        organization_id=1,
+        actor_user_id=None,
+        entity_type="assignment",
+        changes=[
+            PlanningChangeRecord(
+                entity_id=assignment_id,
+                action="update_assignment" if assignment_id in previous else "create_assignment",
+                before=(
+                    previous[assignment_id].model_dump() if assignment_id in previous else None
+                ),
+                after=assignment.model_dump(),
+            )
+            for assignment_id, assignment in after.items()
+        ],
+        payload={"batch": True},
+    )
+    return result
+
+
 @router.put("/assignments/{assignment_id}", response_model=AssignmentWriteResponse)
 def update_assignment(
     assignment_id: int,
     payload: AssignmentUpdate,
+    request: Request,
+    response: Response,
     services: PlanningServicesDep,
 ) -> AssignmentWriteResponse:
     assignment_service: AssignmentService = services["assignments"]  # type: ignore[assignment]
     audit_service: AuditService = services["audit"]  # type: ignore[assignment]
     before = assignment_service.get_assignment_state(assignment_id).model_dump()
-    assignment, conflicts = assignment_service.update_assignment(assignment_id, payload)
+    assignment, conflicts = assignment_service.update_assignment(
+        assignment_id, payload, expected_version=_if_match_version(request)
+    )
+    response.headers["ETag"] = f'"{assignment.version}"'
     audit_service.log_change(
         organization_id=1,
         actor_user_id=None,
@@ -355,14 +628,35 @@ def create_availability(
     return availability_service.record_availability(payload)
 
 
+@router.get("/blackouts", response_model=list[Blackout])
+def list_blackouts(
+    services: PlanningServicesDep, site_id: int | None = Query(default=None)
+) -> list[Blackout]:
+    blackout_service: BlackoutService = services["blackouts"]  # type: ignore[assignment]
+    return blackout_service.list_blackouts(site_id=site_id)
+
+
+@router.post("/blackouts", response_model=Blackout, status_code=status.HTTP_201_CREATED)
+def create_blackout(payload: BlackoutCreate, services: PlanningServicesDep) -> Blackout:
+    blackout_service: BlackoutService = services["blackouts"]  # type: ignore[assignment]
+    return blackout_service.create_blackout(payload)
+
+
+@router.delete("/blackouts/{blackout_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_blackout(blackout_id: int, services: PlanningServicesDep) -> None:
+    blackout_service: BlackoutService = services["blackouts"]  # type: ignore[assignment]
+    blackout_service.delete_blackout(blackout_id)
+
+
 @router.get("/rules")
 def list_rules(
     services: PlanningServicesDep, organization_id: int = Query(default=1)
-) -> dict[str, list[HrRule] | list[ConflictRule]]:
+) -> dict[str, list[HrRule] | list[ConflictRule] | str]:
     rule_service: RuleService = services["rules"]  # type: ignore[assignment]
     hr_rules = rule_service.list_hr_rules(organization_id)
     conflict_rules = rule_service.list_conflict_rules(organization_id)
-    return {"hr_rules": hr_rules, "conflict_rules": conflict_rules}
+    version = rule_service.rules_for_organization(organization_id).version
+    return {"hr_rules": hr_rules, "conflict_rules": conflict_rules, "version": version}
 
 
 @router.post("/conflicts/preview", response_model=list[ConflictPreviewResult])
@@ -371,6 +665,8 @@ def preview_conflicts(
     services: PlanningServicesDep,
 ) -> list[ConflictPreviewResult]:
     rule_service: RuleService = services["rules"]  # type: ignore[assignment]
+    assignments = payload.assignments or []
+    rule_service.prime_assignments(assignments)
     results: list[ConflictPreviewResult] = []
     if payload.shift is not None:
         results.append(
@@ -379,7 +675,7 @@ def preview_conflicts(
                 conflicts=rule_service.evaluate_shift(payload.shift),
             )
         )
-    for assignment in payload.assignments or []:
+    for assignment in assignments:
         results.append(
             ConflictPreviewResult(
                 assignment=assignment,
@@ -389,6 +685,84 @@ def preview_conflicts(
     return results
 
 
+@router.post("/conflicts/rebuild")
+def rebuild_conflicts(
+    services: PlanningServicesDep,
+    start: Annotated[datetime | None, Query()] = None,
+    end: Annotated[datetime | None, Query()] = None,
+) -> dict[str, int]:
+    conflict_service: ConflictMaintenanceService = services["conflicts"]  # type: ignore[assignment]
+    return {"shifts_rebuilt": conflict_service.rebuild(start=start, end=end)}
+
+
+@router.get("/validation", response_model=PlanningValidationReport)
+def validate_planning(
+    request: Request,
+    response: Response,
+    services: PlanningServicesDep,
+    organization_id: int = Query(default=1),
+    start: Annotated[datetime | None, Query()] = None,
+    end: Annotated[datetime | None, Query()] = None,
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=50, ge=1, le=500),
+    pushdown: bool = Query(default=True),
+) -> PlanningValidationReport | Response:
+    if (not_modified := _not_modified(request, response, services, organization_id)) is not None:
+        return not_modified
+    validation_service: PlanningValidationService = services["validation"]  # type: ignore[assignment]
+    return validation_service.validate_organization(
+        organization_id,
+        start=start,
+        end=end,
+        page=page,
+        page_size=page_size,
+        pushdown=pushdown,
+    )
+
+
+@router.get("/board-days", response_model=list[PlanningBoardDay])
+def list_board_days(
+    request: Request,
+    response: Response,
+    services: PlanningServicesDep,
+    start: Annotated[date, Query()],
+    end: Annotated[date, Query()],
+    organization_id: int = Query(default=1),
+    site_ids: Annotated[list[int] | None, Query(alias="site_ids")] = None,
+) -> list[PlanningBoardDay] | Response:
+    if (not_modified := _not_modified(request, response, services, organization_id)) is not None:
+        return not_modified
+    board_days: BoardDayProjection = services["board_days"]  # type: ignore[assignment]
+    return board_days.list_days(organization_id, start=start, end=end, site_ids=site_ids)
+
+
+@router.get("/coverage", response_model=CoverageReport)
+def get_coverage(
+    request: Request,
+    response: Response,
+    services: PlanningServicesDep,
+    start: Annotated[datetime, Query()],
+    end: Annotated[datetime, Query()],
+    organization_id: int = Query(default=1),
+    site_ids: Annotated[list[int] | None, Query(alias="site_ids")] = None,
+    role_ids: Annotated[list[int] | None, Query(alias="role_ids")] = None,
+    resolution_minutes: Annotated[int | None, Query(ge=5)] = None,
+) -> CoverageReport | Response:
+    if (not_modified := _not_modified(request, response, services, organization_id)) is not None:
+        return not_modified
+    coverage_service: CoverageService = services["coverage"]  # type: ignore[assignment]
+    return coverage_service.coverage(
+        organization_id,
+        start=start,
+        end=end,
+        site_ids=site_ids,
+        role_ids=role_ids,
+        resolution=(
+            timedelta(minutes=resolution_minutes) if resolution_minutes is not None else None
+        ),
+    )
+
+
 @router.post("/publish", response_model=Publication)
 def publish_planning(
     payload: PublishRequest,
@@ -400,12 +774,14 @@ def publish_planning(
     return published
 
 
-@router.post("/auto-assign/start")
+@router.post("/auto-assign/start", status_code=status.HTTP_202_ACCEPTED)
 def start_auto_assign(
     payload: AutoAssignStartRequest, services: PlanningServicesDep
 ) -> dict[str, Any]:
     auto_assign_service: AutoAssignJobService = services["auto_assign"]  # type: ignore[assignment]
-    return auto_assign_service.start_job(shift_ids=payload.shift_ids)
+    return auto_assign_service.start_job(
+        shift_ids=payload.shift_ids, time_budget_seconds=payload.time_budget_seconds
+    )
 
 
 @router.get("/auto-assign/status/{job_id}")
@@ -417,6 +793,26 @@ def get_auto_assign_status(
     return auto_assign_service.get_status(job_id)
 
 
+@router.post("/auto-assign/cancel/{job_id}")
+def cancel_auto_assign(
+    job_id: str,
+    services: PlanningServicesDep,
+) -> dict[str, Any]:
+    auto_assign_service: AutoAssignJobService = services["auto_assign"]  # type: ignore[assignment]
+    return auto_assign_service.cancel_job(job_id)
+
+
+@router.get("/changes", response_model=PlanningChangeFeed)
+def list_planning_changes(
+    services: PlanningServicesDep,
+    since: int = Query(default=0, ge=0),
+    organization_id: int = Query(default=1),
+    limit: int = Query(default=CHANGE_FEED_BATCH_SIZE, ge=1, le=CHANGE_FEED_BATCH_SIZE),
+) -> PlanningChangeFeed:
+    audit_service: AuditService = services["audit"]  # type: ignore[assignment]
+    return audit_service.changes_since(organization_id, since=since, limit=limit)
+
+
 @router.get("/audit", response_model=list[dict[str, Any]])
 def list_audit_trail(
     services: PlanningServicesDep,
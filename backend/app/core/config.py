@@ -27,6 +27,22 @@ class Settings(BaseSettings):
     postgres_db: str = Field(default="app_db", alias="POSTGRES_DB")
     postgres_user: str = Field(default="app_user", alias="POSTGRES_USER")
     postgres_password: str = Field(default="change_me", alias="POSTGRES_PASSWORD")
+    rule_catalog_ttl_seconds: float = Field(default=300.0, alias="RULE_CATALOG_TTL_SECONDS")
+    blackout_catalog_ttl_seconds: float = Field(
+        default=300.0, alias="BLACKOUT_CATALOG_TTL_SECONDS"
+    )
+    workload_ledger_ttl_seconds: float = Field(default=300.0, alias="WORKLOAD_LEDGER_TTL_SECONDS")
+    double_booking_constraint: bool = Field(default=False, alias="DOUBLE_BOOKING_CONSTRAINT")
+    auto_assign_workers: int = Field(default=2, ge=1, alias="AUTO_ASSIGN_WORKERS")
+    auto_assign_time_budget_seconds: float = Field(
+        default=300.0, gt=0, alias="AUTO_ASSIGN_TIME_BUDGET_SECONDS"
+    )
+    auto_assign_job_ttl_seconds: float = Field(
+        default=86_400.0, gt=0, alias="AUTO_ASSIGN_JOB_TTL_SECONDS"
+    )
+    auto_assign_queue_timeout_seconds: float = Field(
+        default=600.0, gt=0, alias="AUTO_ASSIGN_QUEUE_TIMEOUT_SECONDS"
+    )
     cors_origins: list[str] = Field(
         default_factory=lambda: DEFAULT_CORS_ORIGINS.copy(),
         alias="CORS_ORIGINS",
@@ -1,20 +1,25 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Boolean,
     CheckConstraint,
+    Date,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
+    false,
     func,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -221,6 +226,14 @@ class ShiftInstance(Base):
     status: Mapped[str] = mapped_column(String(20), default="draft", nullable=False)
     source: Mapped[str] = mapped_column(String(50), default="manual", nullable=False)
     capacity: Mapped[int] = mapped_column(Integer, default=1)
+    assigned_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    # Start of the template occurrence this row materialises, kept when it moves.
+    occurrence_start_utc: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # Optimistic concurrency counter (``version_id_col``): every ORM update
+    # checks and increments it, ``assigned_count`` is moved in SQL without it.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
 
     mission: Mapped[Mission] = relationship(back_populates="shift_instances")
     template: Mapped[ShiftTemplate | None] = relationship(back_populates="shift_instances")
@@ -231,7 +244,29 @@ class ShiftInstance(Base):
 
     __table_args__ = (
         CheckConstraint("start_utc < end_utc", name="ck_shift_instance_time_order"),
+        Index(
+            "ix_shift_instances_understaffed",
+            "start_utc",
+            postgresql_where=text("assigned_count < capacity"),
+            sqlite_where=text("assigned_count < capacity"),
+        ),
+        Index("ix_shift_instances_start_id", "start_utc", "id"),
+        Index(
+            "ix_shift_instances_active_window",
+            "start_utc",
+            "end_utc",
+            postgresql_where=text("status <> 'cancelled'"),
+            sqlite_where=text("status <> 'cancelled'"),
+        ),
+        Index("ix_shift_instances_mission_id", "mission_id"),
+        Index(
+            "uix_shift_instance_occurrence",
+            "template_id",
+            "occurrence_start_utc",
+            unique=True,
+        ),
     )
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Assignment(Base):
@@ -245,6 +280,17 @@ class Assignment(Base):
     source: Mapped[str] = mapped_column(String(50), default="manual", nullable=False)
     note: Mapped[str | None] = mapped_column(Text())
     is_locked: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Copy of the shift window, kept in step by the planning services so that
+    # double bookings can be rejected by an exclusion constraint (PostgreSQL,
+    # migration 202610180003) or an indexed probe on this table alone.
+    booking_start_utc: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    booking_end_utc: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    booking_active: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default=false(), nullable=False
+    )
+    # Optimistic concurrency counter (``version_id_col``); the booking copy
+    # above is kept in step in SQL without it.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -254,6 +300,75 @@ class Assignment(Base):
     collaborator: Mapped[Collaborator] = relationship(back_populates="assignments")
     role: Mapped[Role] = relationship(back_populates="assignments")
 
+    __table_args__ = (
+        Index("ix_assignments_shift_instance_id", "shift_instance_id"),
+        Index("ix_assignments_collaborator_booking", "collaborator_id", "booking_start_utc"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+class PlanningBoardDay(Base):
+    """Read model: one site's shifts for one local day, as a compact summary.
+
+    Rewritten by the planning services in the transaction of every write that
+    touches the day, so the board reads a week with 7 indexed row fetches.
+    """
+
+    __tablename__ = "planning_board_days"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id"), nullable=False)
+    site_id: Mapped[int] = mapped_column(ForeignKey("sites.id"), nullable=False)
+    local_date: Mapped[date] = mapped_column(Date, nullable=False)
+    shift_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    hard_conflicts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    soft_conflicts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    shifts: Mapped[list[dict[str, Any]]] = mapped_column(JSON, default=list)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint(
+            "organization_id", "site_id", "local_date", name="uix_planning_board_day"
+        ),
+    )
+
+
+class PlanningVersion(Base):
+    """Monotonic counter bumped by every planning write of an organization."""
+
+    __tablename__ = "planning_versions"
+
+    organization_id: Mapped[int] = mapped_column(
+        ForeignKey("organizations.id"), primary_key=True, autoincrement=False
+    )
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class PlanningConflict(Base):
+    __tablename__ = "planning_conflicts"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    shift_instance_id: Mapped[int] = mapped_column(ForeignKey("shift_instances.id"), nullable=False)
+    assignment_id: Mapped[int | None] = mapped_column(ForeignKey("assignments.id"))
+    collaborator_id: Mapped[int | None] = mapped_column(ForeignKey("collaborators.id"))
+    rule: Mapped[str] = mapped_column(String(120), nullable=False)
+    type: Mapped[str] = mapped_column(String(10), nullable=False)
+    details: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    __table_args__ = (
+        Index("ix_planning_conflicts_shift_instance_id", "shift_instance_id"),
+        Index("ix_planning_conflicts_assignment_id", "assignment_id"),
+        Index("ix_planning_conflicts_collaborator_id", "collaborator_id"),
+    )
+
 
 class UserAvailability(Base):
     __tablename__ = "user_availabilities"
@@ -267,7 +382,10 @@ class UserAvailability(Base):
 
     collaborator: Mapped[Collaborator] = relationship(back_populates="availabilities")
 
-    __table_args__ = (CheckConstraint("start_utc < end_utc", name="ck_availability_time_order"),)
+    __table_args__ = (
+        CheckConstraint("start_utc < end_utc", name="ck_availability_time_order"),
+        Index("ix_user_availabilities_collaborator_start", "collaborator_id", "start_utc"),
+    )
 
 
 class Leave(Base):
@@ -340,6 +458,10 @@ class PlanningChange(Base):
     organization: Mapped[Organization] = relationship()
     actor: Mapped[User | None] = relationship()
 
+    __table_args__ = (
+        Index("ix_planning_changes_entity", "entity_type", "entity_id", "created_at"),
+    )
+
 
 class Publication(Base):
     __tablename__ = "publications"
@@ -373,6 +495,49 @@ class NotificationEvent(Base):
     organization: Mapped[Organization] = relationship()
 
 
+class AutoAssignJob(Base):
+    """State of an auto-assign job, readable from every worker process.
+
+    ``scope_key`` hashes the shift selection with the planning versions of its
+    organizations, so an unchanged selection reuses its job while any planning
+    write in between starts a new one. ``result`` keeps the created assignment
+    ids and conflict counts only. Rows are deleted once ``expires_at`` passed.
+    A scope has at most one queued or running job.
+    """
+
+    __tablename__ = "auto_assign_jobs"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    scope_key: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="queued", nullable=False)
+    progress: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    time_budget_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+    cancel_requested: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default=false(), nullable=False
+    )
+    slots_open: Mapped[int | None] = mapped_column(Integer)
+    slots_planned: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    assignments_created: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    result: Mapped[dict[str, Any] | None] = mapped_column(JSON)
+    error: Mapped[str | None] = mapped_column(String(500))
+    queued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_auto_assign_jobs_scope", "scope_key", "status"),
+        Index("ix_auto_assign_jobs_expires_at", "expires_at"),
+        Index(
+            "uix_auto_assign_jobs_active_scope",
+            "scope_key",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+
 __all__ = [
     "Organization",
     "Site",
@@ -387,6 +552,7 @@ __all__ = [
     "ShiftTemplate",
     "ShiftInstance",
     "Assignment",
+    "PlanningConflict",
     "UserAvailability",
     "Leave",
     "Blackout",
@@ -1,9 +1,9 @@
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime
 from typing import Any
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
-from app.models.common import TimeWindow
+from app.models.common import PaginatedResponse, TimeWindow
 
 
 class ShiftTemplateBase(BaseModel):
@@ -78,7 +78,43 @@ class ShiftInstanceCreate(ShiftInstanceBase):
 
 
 class ShiftInstance(ShiftInstanceBase):
+    """A stored shift, or a virtual occurrence of a recurring template.
+
+    Virtual occurrences have a negative ``id`` and ``is_virtual`` set; writes
+    addressing that id store the occurrence first. ``occurrence_start_utc``
+    links both forms to the template occurrence. ``version`` is the value to
+    send back in ``If-Match`` when updating.
+    """
+
     id: int
+    assigned_count: int = Field(default=0, ge=0)
+    occurrence_start_utc: datetime | None = None
+    is_virtual: bool = False
+    version: int = 1
+
+    model_config = {"extra": "forbid"}
+
+
+class ShiftMaterialisationRequest(TimeWindow):
+    """Store the occurrences of one recurring template, or of a mission's templates."""
+
+    template_id: int | None = None
+    mission_id: int | None = None
+
+    @model_validator(mode="after")
+    def validate_scope(self) -> "ShiftMaterialisationRequest":
+        if (self.template_id is None) == (self.mission_id is None):
+            raise ValueError("Exactly one of template_id and mission_id is required")
+        return self
+
+
+class ShiftMaterialisation(BaseModel):
+    template_ids: list[int]
+    start_utc: datetime
+    end_utc: datetime
+    created: int
+    skipped: int = 0
+    shift_ids: list[int] = Field(default_factory=list)
 
     model_config = {"extra": "forbid"}
 
@@ -123,6 +159,7 @@ class Assignment(AssignmentBase):
     id: int
     created_at: datetime | None = None
     updated_at: datetime | None = None
+    version: int = 1
 
     model_config = {"extra": "forbid"}
 
@@ -152,6 +189,22 @@ class UserAvailability(UserAvailabilityBase):
     model_config = {"extra": "forbid"}
 
 
+class BlackoutBase(TimeWindow):
+    site_id: int
+    reason: str | None = Field(default=None, max_length=255)
+    is_hard_limit: bool = True
+
+
+class BlackoutCreate(BlackoutBase):
+    pass
+
+
+class Blackout(BlackoutBase):
+    id: int
+
+    model_config = {"extra": "forbid"}
+
+
 class HrRule(BaseModel):
     id: int
     organization_id: int
@@ -219,3 +272,134 @@ class ShiftWriteResponse(BaseModel):
 class AssignmentWriteResponse(BaseModel):
     assignment: Assignment
     conflicts: list[ConflictEntry] = Field(default_factory=list)
+
+
+class AssignmentBatch(BaseModel):
+    """Assignments to create, or to update when the collaborator is already on the shift."""
+
+    items: list[AssignmentCreate] = Field(min_length=1, max_length=5_000)
+
+
+class AssignmentBatchItem(BaseModel):
+    index: int
+    status: str = Field(pattern="^(created|updated|rejected)$")
+    assignment: Assignment | None = None
+    conflicts: list[ConflictEntry] = Field(default_factory=list)
+    error: str | None = None
+
+
+class AssignmentBatchResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+    items: list[AssignmentBatchItem] = Field(default_factory=list)
+
+    model_config = {"extra": "forbid"}
+
+
+class PlanningViolation(ConflictEntry):
+    shift_instance_id: int
+    assignment_id: int | None = None
+    collaborator_id: int | None = None
+
+
+class PlanningValidationSummary(BaseModel):
+    organization_id: int
+    rule_version: str
+    assignments_scanned: int
+    hard: int = 0
+    soft: int = 0
+    by_rule: dict[str, int] = Field(default_factory=dict)
+
+
+class PlanningValidationReport(BaseModel):
+    summary: PlanningValidationSummary
+    violations: PaginatedResponse[PlanningViolation]
+
+
+class BoardDayAssignment(BaseModel):
+    id: int
+    collaborator_id: int
+    status: str
+    is_locked: bool = False
+
+
+class BoardDayShift(BaseModel):
+    id: int
+    mission_id: int
+    role_id: int
+    start_utc: datetime
+    end_utc: datetime
+    status: str
+    capacity: int
+    assigned_count: int
+    assignments: list[BoardDayAssignment] = Field(default_factory=list)
+    hard_conflicts: int = 0
+    soft_conflicts: int = 0
+    conflict_rules: list[str] = Field(default_factory=list)
+
+
+class PlanningBoardDay(BaseModel):
+    organization_id: int
+    site_id: int
+    local_date: date
+    shift_count: int
+    hard_conflicts: int = 0
+    soft_conflicts: int = 0
+    shifts: list[BoardDayShift] = Field(default_factory=list)
+    updated_at: datetime | None = None
+
+    model_config = {"extra": "forbid"}
+
+
+class PlanningUpsert(BaseModel):
+    entity_type: str
+    entity_id: int
+    change_id: int
+    data: dict[str, Any]
+
+    model_config = {"extra": "forbid"}
+
+
+class PlanningTombstone(BaseModel):
+    entity_type: str
+    entity_id: int
+    change_id: int
+
+    model_config = {"extra": "forbid"}
+
+
+class PlanningChangeFeed(BaseModel):
+    cursor: int
+    has_more: bool
+    upserts: list[PlanningUpsert] = Field(default_factory=list)
+    tombstones: list[PlanningTombstone] = Field(default_factory=list)
+
+    model_config = {"extra": "forbid"}
+
+
+class CoverageSeries(BaseModel):
+    """Step function of one site and role, as parallel columns.
+
+    From ``at[i]`` until ``at[i + 1]`` the shifts require ``required[i]`` people
+    and have ``staffed[i]`` assigned; the last point is back to zero. Bucket
+    means, when requested, start at the report ``start`` and are
+    ``resolution_minutes`` wide (the last bucket stops at ``end``).
+    """
+
+    site_id: int
+    role_id: int
+    at: list[datetime] = Field(default_factory=list)
+    required: list[int] = Field(default_factory=list)
+    staffed: list[int] = Field(default_factory=list)
+    bucket_required: list[float] = Field(default_factory=list)
+    bucket_staffed: list[float] = Field(default_factory=list)
+
+
+class CoverageReport(BaseModel):
+    start: datetime
+    end: datetime
+    resolution_minutes: int | None = None
+    series: list[CoverageSeries] = Field(default_factory=list)
+
+    model_config = {"extra": "forbid"}
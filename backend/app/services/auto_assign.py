@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import planning as db_models
+from app.models.planning_pro import AssignmentCreate
+from app.services.blackout_catalog import blackout_catalog
+from app.services.matching import min_cost_assignment
+from app.services.planning_pro import (
+    RuleService,
+    _blackout_conflicts,
+    _ensure_timezone,
+    _shift_window,
+    _to_shift_instance,
+    _workload_conflicts,
+)
+from app.services.rule_catalog import DAY, WEEK, CompiledRules
+from app.services.workload import CollaboratorWorkload
+
+AUTO_ASSIGN_SOURCE = "auto-assign-v2"
+# Matching costs, in hours of booked time: a candidate's cost is their booked
+# hours from a week before the planned window to its end (fairness), minus a
+# bonus when a declared availability covers the shift (preference), plus
+# penalties for soft conflicts and working time overruns.
+AUTO_ASSIGN_PREFERENCE_BONUS = 4.0
+AUTO_ASSIGN_SOFT_CONFLICT_PENALTY = 8.0
+AUTO_ASSIGN_OVERTIME_PENALTY = 24.0
+
+
+@dataclass(slots=True)
+class _IntervalColumns:
+    """Collaborator intervals as columns; ``owners`` index the planner's candidates."""
+
+    owners: npt.NDArray[np.int64]
+    starts: npt.NDArray[np.float64]
+    ends: npt.NDArray[np.float64]
+
+    @classmethod
+    def build(cls, rows: Iterable[tuple[int, datetime, datetime]]) -> _IntervalColumns:
+        rows = list(rows)
+        return cls(
+            owners=np.array([owner for owner, _, _ in rows], dtype=np.int64),
+            starts=np.array([_ensure_timezone(start).timestamp() for _, start, _ in rows]),
+            ends=np.array([_ensure_timezone(end).timestamp() for _, _, end in rows]),
+        )
+
+    def hits(
+        self,
+        local: npt.NDArray[np.int64],
+        starts: npt.NDArray[np.float64],
+        ends: npt.NDArray[np.float64],
+        *,
+        margin: float = 0.0,
+        covering: bool = False,
+    ) -> npt.NDArray[np.bool_]:
+        """``[shift, candidate]`` mask of intervals within ``margin`` of (or covering) shifts."""
+
+        owners, interval_starts, interval_ends = self._near(
+            local, starts - margin, ends + margin
+        )
+        if covering:
+            hits = (interval_starts[None, :] <= starts[:, None]) & (
+                interval_ends[None, :] >= ends[:, None]
+            )
+        else:
+            hits = (interval_starts[None, :] < ends[:, None] + margin) & (
+                interval_ends[None, :] > starts[:, None] - margin
+            )
+        mask = np.zeros((len(starts), int(local.max()) + 1), dtype=bool)
+        rows, columns = np.nonzero(hits)
+        mask[rows, local[owners[columns]]] = True
+        return mask
+
+    def seconds(
+        self,
+        local: npt.NDArray[np.int64],
+        lows: npt.NDArray[np.float64],
+        highs: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """``[window, candidate]`` interval seconds inside each ``[lows, highs)`` window."""
+
+        owners, interval_starts, interval_ends = self._near(local, lows, highs)
+        inside = np.clip(
+            np.minimum(interval_ends[None, :], highs[:, None])
+            - np.maximum(interval_starts[None, :], lows[:, None]),
+            0,
+            None,
+        )
+        totals = np.zeros((len(lows), int(local.max()) + 1))
+        np.add.at(totals, (np.arange(len(lows))[:, None], local[owners][None, :]), inside)
+        return totals
+
+    def _near(
+        self,
+        local: npt.NDArray[np.int64],
+        lows: npt.NDArray[np.float64],
+        highs: npt.NDArray[np.float64],
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        keep = (
+            (local[self.owners] >= 0)
+            & (self.starts < highs.max())
+            & (self.ends > lows.min())
+        )
+        return self.owners[keep], self.starts[keep], self.ends[keep]
+
+
+class _AutoAssignPlanner:
+    """Min-cost matching of open shift slots to eligible collaborators, wave by wave."""
+
+    def __init__(
+        self,
+        session: Session,
+        rule_service: RuleService,
+        shifts: Sequence[db_models.ShiftInstance],
+    ) -> None:
+        self._session = session
+        site_ids = {shift.site_id for shift in shifts}
+        self._organizations: dict[int, int] = dict(
+            session.execute(
+                select(db_models.Site.id, db_models.Site.organization_id).where(
+                    db_models.Site.id.in_(site_ids)
+                )
+            )
+            .tuples()
+            .all()
+        )
+        blackouts = blackout_catalog.get_many(session, site_ids)
+        self._shifts = sorted(
+            (
+                shift
+                for shift in shifts
+                if shift.site_id in self._organizations
+                and not any(
+                    conflict.type == "hard"
+                    for conflict in _blackout_conflicts(
+                        *_shift_window(shift), blackouts[shift.site_id]
+                    )
+                )
+            ),
+            key=lambda shift: (_ensure_timezone(shift.start_utc), shift.id),
+        )
+        self.open_slots = sum(shift.capacity - shift.assigned_count for shift in self._shifts)
+        self._rules = {
+            organization_id: rule_service.rules_for_organization(organization_id)
+            for organization_id in set(self._organizations.values())
+        }
+
+        self._collaborator_ids: list[int] = []
+        groups: defaultdict[tuple[int, int], list[int]] = defaultdict(list)
+        for collaborator_id, organization_id, role_id in session.execute(
+            select(
+                db_models.Collaborator.id,
+                db_models.Collaborator.organization_id,
+                db_models.Collaborator.primary_role_id,
+            )
+            .where(
+                db_models.Collaborator.organization_id.in_(self._rules),
+                db_models.Collaborator.primary_role_id.in_(
+                    {shift.role_id for shift in self._shifts}
+                ),
+                db_models.Collaborator.status == "active",
+            )
+            .order_by(db_models.Collaborator.id)
+        ).tuples():
+            if role_id is not None:
+                groups[(organization_id, role_id)].append(len(self._collaborator_ids))
+                self._collaborator_ids.append(collaborator_id)
+        self._groups = {key: np.array(value, dtype=np.int64) for key, value in groups.items()}
+        self._workloads: dict[int, CollaboratorWorkload] = {}
+        self._next_booking_id = 0
+        self._load = np.zeros(len(self._collaborator_ids))
+        empty = _IntervalColumns.build([])
+        self._booked, self._unavailable, self._available = empty, empty, empty
+        self._booked_shift_ids = np.zeros(0, dtype=np.int64)
+        if self._shifts and self._collaborator_ids:
+            self._load_state()
+
+    def _load_state(self) -> None:
+        index = {
+            collaborator_id: position
+            for position, collaborator_id in enumerate(self._collaborator_ids)
+        }
+        window_start = min(_ensure_timezone(shift.start_utc) for shift in self._shifts)
+        window_end = max(_ensure_timezone(shift.end_utc) for shift in self._shifts)
+        reach = max(rules.neighbourhood for rules in self._rules.values())
+        history_start = window_start - WEEK
+        bookings = self._session.execute(
+            select(
+                db_models.Assignment.collaborator_id,
+                db_models.Assignment.id,
+                db_models.ShiftInstance.id,
+                db_models.ShiftInstance.start_utc,
+                db_models.ShiftInstance.end_utc,
+            )
+            .join(
+                db_models.ShiftInstance,
+                db_models.Assignment.shift_instance_id == db_models.ShiftInstance.id,
+            )
+            .where(
+                db_models.Assignment.collaborator_id.in_(self._collaborator_ids),
+                db_models.ShiftInstance.status != "cancelled",
+                db_models.ShiftInstance.start_utc < window_end + reach,
+                db_models.ShiftInstance.end_utc > min(window_start - reach, history_start),
+            )
+        ).tuples().all()
+        self._booked = _IntervalColumns.build(
+            (index[collaborator_id], start, end)
+            for collaborator_id, _, _, start, end in bookings
+        )
+        self._booked_shift_ids = np.array(
+            [shift_id for _, _, shift_id, _, _ in bookings], dtype=np.int64
+        )
+        inside = np.clip(self._booked.ends, None, window_end.timestamp()) - np.clip(
+            self._booked.starts, history_start.timestamp(), None
+        )
+        np.add.at(self._load, self._booked.owners, np.clip(inside, 0, None) / 3600)
+
+        limited = {
+            collaborator_id
+            for (organization_id, _), members in self._groups.items()
+            if self._rules[organization_id].has_workload_limits
+            for collaborator_id in (self._collaborator_ids[member] for member in members)
+        }
+        ledgers: dict[int, list[tuple[int, datetime, datetime]]] = defaultdict(list)
+        for collaborator_id, assignment_id, _, start, end in bookings:
+            if collaborator_id in limited:
+                ledgers[index[collaborator_id]].append((assignment_id, start, end))
+        self._workloads = {
+            index[collaborator_id]: CollaboratorWorkload(ledgers[index[collaborator_id]])
+            for collaborator_id in limited
+        }
+
+        unavailable: list[tuple[int, datetime, datetime]] = []
+        available: list[tuple[int, datetime, datetime]] = []
+        for collaborator_id, start, end, is_available in self._session.execute(
+            select(
+                db_models.UserAvailability.collaborator_id,
+                db_models.UserAvailability.start_utc,
+                db_models.UserAvailability.end_utc,
+                db_models.UserAvailability.is_available,
+            ).where(
+                db_models.UserAvailability.collaborator_id.in_(self._collaborator_ids),
+                db_models.UserAvailability.start_utc < window_end,
+                db_models.UserAvailability.end_utc > window_start,
+            )
+        ).tuples():
+            (available if is_available else unavailable).append(
+                (index[collaborator_id], start, end)
+            )
+        unavailable.extend(
+            (index[collaborator_id], start, end)
+            for collaborator_id, start, end in self._session.execute(
+                select(
+                    db_models.Leave.collaborator_id,
+                    db_models.Leave.start_utc,
+                    db_models.Leave.end_utc,
+                ).where(
+                    db_models.Leave.collaborator_id.in_(self._collaborator_ids),
+                    db_models.Leave.start_utc < window_end,
+                    db_models.Leave.end_utc > window_start,
+                )
+            ).tuples()
+        )
+        self._unavailable = _IntervalColumns.build(unavailable)
+        self._available = _IntervalColumns.build(available)
+
+    def plan(
+        self, on_wave: Callable[[int, int, int], None] | None = None
+    ) -> list[AssignmentCreate]:
+        """Return the assignments filling as many slots as possible at minimal cost."""
+
+        planned: list[AssignmentCreate] = []
+        wave: list[db_models.ShiftInstance] = []
+        wave_end: datetime | None = None
+        done = 0
+        for shift in [*self._shifts, None]:
+            if shift is not None:
+                start, end = _shift_window(shift)
+                if wave_end is None or start < wave_end:
+                    wave.append(shift)
+                    wave_end = end if wave_end is None else min(wave_end, end)
+                    continue
+            planned.extend(self._solve_wave(wave))
+            done += len(wave)
+            if on_wave is not None:
+                on_wave(done, len(self._shifts), len(planned))
+            if shift is not None:
+                wave, wave_end = [shift], _ensure_timezone(shift.end_utc)
+        return planned
+
+    def _solve_wave(self, wave: Sequence[db_models.ShiftInstance]) -> list[AssignmentCreate]:
+        groups: defaultdict[tuple[int, int], list[db_models.ShiftInstance]] = defaultdict(list)
+        for shift in wave:
+            if shift.capacity > shift.assigned_count:
+                groups[(self._organizations[shift.site_id], shift.role_id)].append(shift)
+        return [
+            AssignmentCreate(
+                shift_instance_id=shift.id,
+                collaborator_id=self._collaborator_ids[candidate],
+                role_id=shift.role_id,
+                status="proposed",
+                source=AUTO_ASSIGN_SOURCE,
+            )
+            for key, shifts in groups.items()
+            if key in self._groups
+            for shift, candidate in self._match(shifts, self._rules[key[0]], self._groups[key])
+        ]
+
+    def _match(
+        self,
+        shifts: Sequence[db_models.ShiftInstance],
+        rules: CompiledRules,
+        candidates: npt.NDArray[np.int64],
+    ) -> list[tuple[db_models.ShiftInstance, int]]:
+        local = np.full(len(self._collaborator_ids), -1, dtype=np.int64)
+        local[candidates] = np.arange(len(candidates))
+        starts = np.array([_ensure_timezone(shift.start_utc).timestamp() for shift in shifts])
+        ends = np.array([_ensure_timezone(shift.end_utc).timestamp() for shift in shifts])
+
+        near = self._booked.hits(local, starts, ends, margin=rules.min_rest.total_seconds())
+        overlapping = self._booked.hits(local, starts, ends)
+        hard = self._unavailable.hits(local, starts, ends)
+        soft = np.zeros_like(hard)
+        (hard if rules.min_rest_type == "hard" else soft)[near] = True
+        if rules.double_booking_enforced:
+            (hard if rules.double_booking_type == "hard" else soft)[overlapping] = True
+        for row, shift in enumerate(shifts):
+            on_shift = self._booked.owners[self._booked_shift_ids == shift.id]
+            hard[row, local[on_shift][local[on_shift] >= 0]] = True
+        declared = self._available.hits(local, starts, ends)
+        covered = self._available.hits(local, starts, ends, covering=True)
+        costs = (
+            np.broadcast_to(self._load[candidates], hard.shape)
+            - AUTO_ASSIGN_PREFERENCE_BONUS * covered
+            + AUTO_ASSIGN_SOFT_CONFLICT_PENALTY * (soft | (declared & ~covered))
+        )
+        if rules.has_workload_limits:
+            # Time booked within a day/week of the shift bounds every window the
+            # exact check looks at; only candidates that may exceed it are checked.
+            own = (ends - starts)[:, None]
+            exact = np.zeros_like(hard)
+            for limit, span in (
+                (rules.max_hours_day, DAY.total_seconds()),
+                (rules.max_hours_week, WEEK.total_seconds()),
+            ):
+                if limit is not None:
+                    worked = self._booked.seconds(local, starts - span, ends + span)
+                    exact |= worked + own > limit.total_seconds()
+            if rules.max_hours_week is not None and rules.max_hours_week_type == "hard":
+                # The weeks ending with and starting with the shift are among the
+                # checked windows, so exceeding either is already a violation.
+                week = WEEK.total_seconds()
+                worked = np.maximum(
+                    self._booked.seconds(local, ends - week, ends),
+                    self._booked.seconds(local, starts, starts + week),
+                )
+                hard |= worked + own > rules.max_hours_week.total_seconds()
+            views = [_to_shift_instance(shift) for shift in shifts]
+            for row, column in zip(*np.nonzero(exact & ~hard), strict=True):
+                entries = _workload_conflicts(
+                    views[row],
+                    rules,
+                    self._workloads[int(candidates[column])],
+                    assignment_id=None,
+                )
+                if any(entry.type == "hard" for entry in entries):
+                    hard[row, column] = True
+                else:
+                    costs[row, column] += AUTO_ASSIGN_OVERTIME_PENALTY * len(entries)
+
+        slot_shifts = np.repeat(
+            np.arange(len(shifts)), [shift.capacity - shift.assigned_count for shift in shifts]
+        )
+        eligible = ~hard[slot_shifts]
+        slots = np.flatnonzero(eligible.any(axis=1))
+        columns = np.flatnonzero(eligible.any(axis=0))
+        if not len(slots):
+            return []
+        eligible = eligible[np.ix_(slots, columns)]
+        slot_costs = costs[slot_shifts][np.ix_(slots, columns)]
+        # One "unfilled" column per slot, dearer than any set of real choices,
+        # keeps the problem rectangular and fills as many slots as possible.
+        low, high = float(slot_costs.min()), float(slot_costs.max())
+        unfilled = high + (high - low + 1) * (len(slots) + 1)
+        matrix = np.full((len(slots), len(columns) + len(slots)), unfilled)
+        matrix[:, : len(columns)] = np.where(eligible, slot_costs, 2 * unfilled)
+        matched: list[tuple[db_models.ShiftInstance, int]] = []
+        for slot, column in enumerate(min_cost_assignment(matrix)):
+            if column >= len(columns) or not eligible[slot, column]:
+                continue
+            shift = shifts[int(slot_shifts[slots[slot]])]
+            matched.append((shift, int(candidates[columns[column]])))
+        self._book(matched)
+        return matched
+
+    def _book(self, matched: Sequence[tuple[db_models.ShiftInstance, int]]) -> None:
+        if not matched:
+            return
+        added = _IntervalColumns.build(
+            (candidate, shift.start_utc, shift.end_utc) for shift, candidate in matched
+        )
+        self._booked = _IntervalColumns(
+            owners=np.concatenate([self._booked.owners, added.owners]),
+            starts=np.concatenate([self._booked.starts, added.starts]),
+            ends=np.concatenate([self._booked.ends, added.ends]),
+        )
+        self._booked_shift_ids = np.concatenate(
+            [self._booked_shift_ids, np.array([shift.id for shift, _ in matched])]
+        )
+        np.add.at(self._load, added.owners, (added.ends - added.starts) / 3600)
+        for shift, candidate in matched:
+            workload = self._workloads.get(candidate)
+            if workload is not None:
+                # Planned bookings have no id yet; negative ones never collide.
+                self._next_booking_id -= 1
+                workload.add(self._next_booking_id, *_shift_window(shift))
@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, cast
+from uuid import uuid4
+
+from sqlalchemy import CursorResult, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.models import planning as db_models
+from app.models.planning_pro import AssignmentBatchResult
+from app.services.auto_assign import _AutoAssignPlanner
+from app.services.conflict_maintenance import ConflictMaintenanceService
+from app.services.errors import ConflictError, NotFoundError
+from app.services.planning_pro import (
+    AssignmentService,
+    AuditService,
+    PlanningChangeRecord,
+    RuleService,
+    _ensure_timezone,
+    _timestamp,
+)
+from app.services.planning_versions import PlanningVersionService
+
+
+class _JobStopped(Exception):
+    """Raised inside a running auto-assign job to end it early with ``status``."""
+
+    def __init__(self, status: str, error: str | None = None) -> None:
+        super().__init__(error or status)
+        self.status = status
+        self.error = error
+
+
+AUTO_ASSIGN_ACTIVE_STATUSES = frozenset({"queued", "running"})
+# A completed job stays the answer for its scope until the planning changes.
+AUTO_ASSIGN_REUSABLE_STATUSES = AUTO_ASSIGN_ACTIVE_STATUSES | {"completed"}
+# Grace given to a running job past its time budget before it is considered lost.
+AUTO_ASSIGN_RUN_MARGIN = timedelta(seconds=60)
+_auto_assign_pool = ThreadPoolExecutor(
+    max_workers=settings.auto_assign_workers, thread_name_prefix="auto-assign"
+)
+# Namespace of the per-organization advisory locks taken by runs on PostgreSQL.
+AUTO_ASSIGN_LOCK_CLASS = 0x4A55
+AUTO_ASSIGN_LOCK_POLL_SECONDS = 0.05
+# Other databases take one writer at a time: runs queue in this process.
+_auto_assign_lock = Lock()
+
+
+def _job_state(job: db_models.AutoAssignJob) -> dict[str, Any]:
+    result = job.result or {}
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "progress": job.progress,
+        "queued_at": _ensure_timezone(job.queued_at),
+        "started_at": job.started_at and _ensure_timezone(job.started_at),
+        "completed_at": job.completed_at and _ensure_timezone(job.completed_at),
+        "expires_at": _ensure_timezone(job.expires_at),
+        "time_budget_seconds": job.time_budget_seconds,
+        "slots_open": job.slots_open,
+        "slots_planned": job.slots_planned,
+        "assignments_created": job.assignments_created,
+        "assignment_ids": result.get("assignment_ids", []),
+        "conflicts": [
+            {"type": type_, "rule": rule, "count": count}
+            for type_, rule, count in result.get("conflicts", [])
+        ],
+        "error": job.error,
+    }
+
+
+def _job_result(result: AssignmentBatchResult) -> dict[str, Any]:
+    conflicts = Counter(
+        (conflict.type, conflict.rule) for item in result.items for conflict in item.conflicts
+    )
+    return {
+        "assignment_ids": [item.assignment.id for item in result.items if item.assignment],
+        "conflicts": [[type_, rule, count] for (type_, rule), count in sorted(conflicts.items())],
+    }
+
+
+class AutoAssignJobService:
+    """Auto-assign jobs run outside the request by a bounded worker pool."""
+
+    def __init__(self, session: Session, session_factory: Callable[[], Session]) -> None:
+        self._session = session
+        self._session_factory = session_factory
+
+    def start_job(
+        self, *, shift_ids: list[int] | None = None, time_budget_seconds: float | None = None
+    ) -> dict[str, Any]:
+        """Queue a job filling the open slots of ``shift_ids`` (or of every shift)."""
+
+        now = _timestamp()
+        self._session.execute(
+            delete(db_models.AutoAssignJob).where(db_models.AutoAssignJob.expires_at < now)
+        )
+        scope_key = self._scope_key(shift_ids or [])
+        for active in self._session.scalars(
+            select(db_models.AutoAssignJob).where(
+                db_models.AutoAssignJob.scope_key == scope_key,
+                db_models.AutoAssignJob.status.in_(AUTO_ASSIGN_ACTIVE_STATUSES),
+            )
+        ):
+            self._fail_if_lost(active, now)
+        self._session.flush()
+        existing = self._reusable(scope_key)
+        if existing is not None:
+            self._session.commit()
+            return _job_state(existing)
+        budget = min(
+            time_budget_seconds or settings.auto_assign_time_budget_seconds,
+            settings.auto_assign_time_budget_seconds,
+        )
+        job = db_models.AutoAssignJob(
+            id=f"job-{scope_key[:16]}-{uuid4().hex[:8]}",
+            scope_key=scope_key,
+            status="queued",
+            progress=0,
+            time_budget_seconds=budget,
+            slots_planned=0,
+            assignments_created=0,
+            queued_at=now,
+            expires_at=now + timedelta(seconds=settings.auto_assign_job_ttl_seconds),
+        )
+        self._session.add(job)
+        try:
+            self._session.commit()
+        except IntegrityError:
+            # A concurrent start queued a job for this scope first.
+            self._session.rollback()
+            existing = self._reusable(scope_key)
+            if existing is None:
+                raise
+            return _job_state(existing)
+        _auto_assign_pool.submit(self._run, job.id, list(shift_ids or []), budget)
+        return _job_state(job)
+
+    def cancel_job(self, job_id: str) -> dict[str, Any]:
+        """Cancel a job: at once when queued, at its next wave when running."""
+
+        job = self._get(job_id)
+        if job.status not in AUTO_ASSIGN_ACTIVE_STATUSES:
+            raise ConflictError(f"Job is already {job.status}")
+        job.cancel_requested = True
+        if job.status == "queued":
+            now = _timestamp()
+            job.status = "cancelled"
+            job.completed_at = now
+            job.expires_at = now + timedelta(seconds=settings.auto_assign_job_ttl_seconds)
+        self._session.commit()
+        return _job_state(job)
+
+    def get_status(self, job_id: str) -> dict[str, Any]:
+        job = self._get(job_id)
+        if self._fail_if_lost(job, _timestamp()):
+            self._session.commit()
+        return _job_state(job)
+
+    def _get(self, job_id: str) -> db_models.AutoAssignJob:
+        job = self._session.get(db_models.AutoAssignJob, job_id)
+        if job is None:
+            raise NotFoundError("Job not found")
+        return job
+
+    def _reusable(self, scope_key: str) -> db_models.AutoAssignJob | None:
+        return self._session.scalars(
+            select(db_models.AutoAssignJob)
+            .where(
+                db_models.AutoAssignJob.scope_key == scope_key,
+                db_models.AutoAssignJob.status.in_(AUTO_ASSIGN_REUSABLE_STATUSES),
+            )
+            .order_by(db_models.AutoAssignJob.queued_at.desc())
+            .limit(1)
+        ).first()
+
+    @staticmethod
+    def _fail_if_lost(job: db_models.AutoAssignJob, now: datetime) -> bool:
+        """Mark ``job`` failed when its worker is gone; return whether it was."""
+
+        if job.status == "queued":
+            timeout = timedelta(seconds=settings.auto_assign_queue_timeout_seconds)
+            if _ensure_timezone(job.queued_at) + timeout >= now:
+                return False
+            error = "Job was not picked up by a worker in time"
+        elif job.status == "running" and job.started_at is not None:
+            budget = timedelta(seconds=job.time_budget_seconds)
+            if _ensure_timezone(job.started_at) + budget + AUTO_ASSIGN_RUN_MARGIN >= now:
+                return False
+            error = "Job stopped reporting before the end of its time budget"
+        else:
+            return False
+        job.status = "failed"
+        job.error = error
+        job.cancel_requested = True
+        job.completed_at = now
+        job.expires_at = now + timedelta(seconds=settings.auto_assign_job_ttl_seconds)
+        logger.warning("Auto-assign job lost", extra={"job_id": job.id, "error": error})
+        return True
+
+    def _scope_key(self, shift_ids: list[int]) -> str:
+        versions = PlanningVersionService(self._session)
+        if shift_ids:
+            organization_ids = self._session.scalars(
+                select(db_models.Site.organization_id)
+                .join(
+                    db_models.ShiftInstance,
+                    db_models.ShiftInstance.site_id == db_models.Site.id,
+                )
+                .where(db_models.ShiftInstance.id.in_(shift_ids))
+                .distinct()
+            ).all()
+            selection = ",".join(str(shift_id) for shift_id in sorted(set(shift_ids)))
+            version = ",".join(
+                f"{organization_id}:{versions.current(organization_id)}"
+                for organization_id in sorted(organization_ids)
+            )
+        else:
+            selection, version = "all", str(versions.current())
+        return hashlib.sha256(f"{selection}|{version}".encode()).hexdigest()
+
+    def _run(self, job_id: str, shift_ids: list[int], budget: float) -> None:
+        deadline = time.monotonic() + budget
+        if not self._claim(job_id):
+            return
+        reported = -1
+
+        def checkpoint(done: int, total: int, planned: int) -> None:
+            nonlocal reported
+            # Planning is reported as 5-90 %, writing the plan as the rest.
+            progress = 5 + 85 * done // max(total, 1)
+            if progress != reported or done == total:
+                reported = progress
+                if self._update(job_id, progress=progress, slots_planned=planned):
+                    raise _JobStopped("cancelled")
+            if time.monotonic() > deadline:
+                raise _JobStopped("failed", f"Time budget of {budget:g}s exceeded")
+
+        session = self._session_factory()
+        try:
+            with self._serialised(session, shift_ids, deadline):
+                query = select(db_models.ShiftInstance).where(
+                    db_models.ShiftInstance.status != "cancelled",
+                    db_models.ShiftInstance.assigned_count < db_models.ShiftInstance.capacity,
+                )
+                if shift_ids:
+                    query = query.where(db_models.ShiftInstance.id.in_(shift_ids))
+                rule_service = RuleService(session)
+                planner = _AutoAssignPlanner(
+                    session, rule_service, session.scalars(query).all()
+                )
+                self._update(job_id, slots_open=planner.open_slots)
+                checkpoint(0, 1, 0)
+                plan = planner.plan(checkpoint)
+                assignment_service = AssignmentService(
+                    session, ConflictMaintenanceService(session, rule_service)
+                )
+                result = (
+                    assignment_service.bulk_upsert(plan, exclusive=True)
+                    if plan
+                    else AssignmentBatchResult()
+                )
+            self._log_changes(session, job_id, result)
+        except _JobStopped as stopped:
+            session.rollback()
+            self._finish(job_id, status=stopped.status, error=stopped.error)
+            return
+        except Exception as exc:
+            session.rollback()
+            logger.exception("Auto-assign job failed", extra={"job_id": job_id})
+            self._finish(job_id, status="failed", error=str(exc)[:500])
+            return
+        finally:
+            session.close()
+        logger.info(
+            "Auto-assign job completed",
+            extra={"job_id": job_id, "slots": planner.open_slots, "created": result.created},
+        )
+        self._finish(
+            job_id,
+            status="completed",
+            error=None,
+            progress=100,
+            assignments_created=result.created,
+            result=_job_result(result),
+        )
+
+    @staticmethod
+    @contextmanager
+    def _serialised(session: Session, shift_ids: list[int], deadline: float) -> Iterator[None]:
+        """Keep other runs on the organizations of ``shift_ids`` out until the plan is written."""
+
+        if session.get_bind().dialect.name != "postgresql":
+            if not _auto_assign_lock.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                raise _JobStopped("failed", "Time budget exceeded waiting for another job")
+            try:
+                yield
+            finally:
+                _auto_assign_lock.release()
+            return
+        query = select(db_models.Site.organization_id).distinct()
+        if shift_ids:
+            query = query.join(
+                db_models.ShiftInstance, db_models.ShiftInstance.site_id == db_models.Site.id
+            ).where(db_models.ShiftInstance.id.in_(shift_ids))
+        for organization_id in sorted(session.scalars(query)):
+            while not session.scalar(
+                select(func.pg_try_advisory_xact_lock(AUTO_ASSIGN_LOCK_CLASS, organization_id))
+            ):
+                if time.monotonic() > deadline:
+                    raise _JobStopped("failed", "Time budget exceeded waiting for another job")
+                time.sleep(AUTO_ASSIGN_LOCK_POLL_SECONDS)
+        yield
+
+    @staticmethod
+    def _log_changes(session: Session, job_id: str, result: AssignmentBatchResult) -> None:
+        """Record the written plan in the change feed of each organization."""
+
+        written = [
+            (item.status, item.assignment) for item in result.items if item.assignment is not None
+        ]
+        if not written:
+            return
+        organizations = dict(
+            session.execute(
+                select(db_models.ShiftInstance.id, db_models.Site.organization_id)
+                .join(db_models.Site, db_models.ShiftInstance.site_id == db_models.Site.id)
+                .where(
+                    db_models.ShiftInstance.id.in_(
+                        {assignment.shift_instance_id for _, assignment in written}
+                    )
+                )
+            )
+            .tuples()
+            .all()
+        )
+        changes: defaultdict[int, list[PlanningChangeRecord]] = defaultdict(list)
+        for status, assignment in written:
+            changes[organizations[assignment.shift_instance_id]].append(
+                PlanningChangeRecord(
+                    entity_id=assignment.id,
+                    action="update_assignment" if status == "updated" else "create_assignment",
+                    before=None,
+                    after=assignment.model_dump(),
+                )
+            )
+        audit_service = AuditService(session)
+        for organization_id, records in sorted(changes.items()):
+            audit_service.log_changes(
+                organization_id=organization_id,
+                actor_user_id=None,
+                entity_type="assignment",
+                changes=records,
+                payload={"auto_assign_job": job_id},
+            )
+
+    def _claim(self, job_id: str) -> bool:
+        with self._session_factory() as session:
+            claimed = cast(
+                CursorResult[Any],
+                session.execute(
+                    update(db_models.AutoAssignJob)
+                    .where(
+                        db_models.AutoAssignJob.id == job_id,
+                        db_models.AutoAssignJob.status == "queued",
+                    )
+                    .values(status="running", started_at=_timestamp())
+                ),
+            )
+            session.commit()
+            return claimed.rowcount > 0
+
+    def _update(self, job_id: str, **changes: object) -> bool:
+        """Write ``changes`` to the job; return whether its cancellation was requested."""
+
+        with self._session_factory() as session:
+            session.execute(
+                update(db_models.AutoAssignJob)
+                .where(db_models.AutoAssignJob.id == job_id)
+                .values(**changes)
+            )
+            cancel_requested = session.scalar(
+                select(db_models.AutoAssignJob.cancel_requested).where(
+                    db_models.AutoAssignJob.id == job_id
+                )
+            )
+            session.commit()
+            return bool(cancel_requested)
+
+    def _finish(self, job_id: str, **changes: object) -> None:
+        now = _timestamp()
+        # A job given up as lost keeps its failed state, unless its plan was written.
+        finishing = ("running", "failed") if changes["status"] == "completed" else ("running",)
+        with self._session_factory() as session:
+            session.execute(
+                update(db_models.AutoAssignJob)
+                .where(
+                    db_models.AutoAssignJob.id == job_id,
+                    db_models.AutoAssignJob.status.in_(finishing),
+                )
+                .values(
+                    completed_at=now,
+                    expires_at=now + timedelta(seconds=settings.auto_assign_job_ttl_seconds),
+                    **changes,
+                )
+            )
+            session.commit()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from itertools import chain
+from threading import Lock
+from typing import NamedTuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, UOWTransaction
+
+from app.core.config import settings
+from app.db.models import planning as db_models
+from app.services.intervals import Interval, IntervalIndex
+
+_PENDING_BLACKOUT_SITES = "planning_blackout_sites"
+
+
+class BlackoutWindow(NamedTuple):
+    blackout_id: int
+    reason: str | None
+    is_hard_limit: bool
+
+
+def _ensure_timezone(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+class BlackoutCatalog:
+    """Process-level cache of per-site blackout interval trees.
+
+    Missing sites are loaded together with one query, so checking a batch of
+    shifts costs at most one round trip and every lookup afterwards is an
+    O(log n + k) tree query. Sites are dropped when a session commits or rolls
+    back a blackout change; the TTL bounds staleness across worker processes.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._entries: dict[int, tuple[float, IntervalIndex[BlackoutWindow]]] = {}
+        self._lock = Lock()
+
+    def get(self, session: Session, site_id: int) -> IntervalIndex[BlackoutWindow]:
+        return self.get_many(session, [site_id])[site_id]
+
+    def get_many(
+        self, session: Session, site_ids: Iterable[int]
+    ) -> dict[int, IntervalIndex[BlackoutWindow]]:
+        now = time.monotonic()
+        indexes: dict[int, IntervalIndex[BlackoutWindow]] = {}
+        missing: set[int] = set()
+        for site_id in set(site_ids):
+            entry = self._entries.get(site_id)
+            if entry is not None and now - entry[0] < self._ttl_seconds:
+                indexes[site_id] = entry[1]
+            else:
+                missing.add(site_id)
+        if not missing:
+            return indexes
+        intervals: dict[int, list[Interval[BlackoutWindow]]] = defaultdict(list)
+        for blackout in session.scalars(
+            select(db_models.Blackout).where(db_models.Blackout.site_id.in_(missing))
+        ):
+            intervals[blackout.site_id].append(
+                Interval(
+                    start=_ensure_timezone(blackout.start_utc),
+                    end=_ensure_timezone(blackout.end_utc),
+                    payload=BlackoutWindow(
+                        blackout_id=blackout.id,
+                        reason=blackout.reason,
+                        is_hard_limit=bool(blackout.is_hard_limit),
+                    ),
+                )
+            )
+        loaded = {site_id: IntervalIndex(intervals.get(site_id, ())) for site_id in missing}
+        with self._lock:
+            for site_id, index in loaded.items():
+                self._entries[site_id] = (now, index)
+        indexes.update(loaded)
+        return indexes
+
+    def invalidate(self, site_ids: Iterable[int]) -> None:
+        with self._lock:
+            for site_id in site_ids:
+                self._entries.pop(site_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+blackout_catalog = BlackoutCatalog(ttl_seconds=settings.blackout_catalog_ttl_seconds)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_blackout_changes(session: Session, flush_context: UOWTransaction) -> None:  # noqa: ARG001
+    sites = {
+        instance.site_id
+        for instance in chain(session.new, session.dirty, session.deleted)
+        if isinstance(instance, db_models.Blackout)
+    }
+    if sites:
+        blackout_catalog.invalidate(sites)
+        session.info.setdefault(_PENDING_BLACKOUT_SITES, set()).update(sites)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_blackout_sites(session: Session) -> None:
+    sites = session.info.pop(_PENDING_BLACKOUT_SITES, None)
+    if sites:
+        blackout_catalog.invalidate(sites)
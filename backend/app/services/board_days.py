@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import UTC, date, datetime, time, timedelta, tzinfo
+from typing import Any, NamedTuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import ColumnElement, and_, delete, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
+
+from app.db.models import planning as db_models
+from app.models.planning_pro import BoardDayAssignment, BoardDayShift, PlanningBoardDay
+from app.services.errors import ValidationError
+
+MAX_BOARD_DAYS = timedelta(days=62)
+
+
+class _SiteCalendar(NamedTuple):
+    organization_id: int
+    zone: tzinfo
+
+
+def site_zone(name: str) -> tzinfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return UTC
+
+
+def _ensure_timezone(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+class _ConflictTally:
+    __slots__ = ("hard", "soft", "rules")
+
+    def __init__(self) -> None:
+        self.hard = 0
+        self.soft = 0
+        self.rules: set[str] = set()
+
+    def add(self, severity: str, rule: str, total: int) -> None:
+        if severity == "hard":
+            self.hard += total
+        else:
+            self.soft += total
+        self.rules.add(rule)
+
+
+class BoardDayProjection:
+    """Maintains the ``planning_board_days`` read model for one session.
+
+    A day bucket is keyed by site and by the local date (site timezone) on
+    which its shifts start. Writes report the shifts they touched, and
+    ``refresh`` rewrites those buckets from the tables, including the stored
+    conflicts, before the write commits. Days a shift is about to leave, because
+    it moves or is deleted, must be ``mark``-ed first.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+        self._calendars: dict[int, _SiteCalendar] = {}
+        self._pending: set[tuple[int, date]] = set()
+
+    def mark(self, shift_ids: Iterable[int]) -> None:
+        """Remember the days currently holding ``shift_ids``."""
+
+        shift_ids = list(shift_ids)
+        if not shift_ids:
+            return
+        rows = self._session.execute(
+            select(db_models.ShiftInstance.site_id, db_models.ShiftInstance.start_utc).where(
+                db_models.ShiftInstance.id.in_(shift_ids)
+            )
+        ).tuples()
+        self._pending |= self._day_keys(list(rows))
+
+    def refresh(self, shifts: Iterable[tuple[int, datetime]]) -> set[int]:
+        """Rewrite the buckets of ``(site_id, start_utc)`` shifts and of marked days.
+
+        Returns the organizations owning the rewritten buckets.
+        """
+
+        keys = self._pending | self._day_keys(list(shifts))
+        self._pending = set()
+        if not keys:
+            return set()
+        self._rewrite(keys)
+        return {self._calendars[site_id].organization_id for site_id, _ in keys}
+
+    def list_days(
+        self,
+        organization_id: int,
+        *,
+        start: date,
+        end: date,
+        site_ids: list[int] | None = None,
+    ) -> list[PlanningBoardDay]:
+        """Return stored buckets for local dates in ``[start, end]``; empty days are absent."""
+
+        if end < start:
+            raise ValidationError("end must not be earlier than start")
+        if end - start > MAX_BOARD_DAYS:
+            raise ValidationError("Board windows are limited to 62 days")
+        query = (
+            select(db_models.PlanningBoardDay)
+            .where(
+                db_models.PlanningBoardDay.organization_id == organization_id,
+                db_models.PlanningBoardDay.local_date >= start,
+                db_models.PlanningBoardDay.local_date <= end,
+            )
+            .order_by(db_models.PlanningBoardDay.site_id, db_models.PlanningBoardDay.local_date)
+        )
+        if site_ids:
+            query = query.where(db_models.PlanningBoardDay.site_id.in_(site_ids))
+        return [
+            PlanningBoardDay(
+                organization_id=row.organization_id,
+                site_id=row.site_id,
+                local_date=row.local_date,
+                shift_count=row.shift_count,
+                hard_conflicts=row.hard_conflicts,
+                soft_conflicts=row.soft_conflicts,
+                shifts=[BoardDayShift.model_validate(shift) for shift in row.shifts],
+                updated_at=row.updated_at,
+            )
+            for row in self._session.scalars(query)
+        ]
+
+    def _day_keys(self, shifts: list[tuple[int, datetime]]) -> set[tuple[int, date]]:
+        calendars = self._site_calendars({site_id for site_id, _ in shifts})
+        return {
+            (site_id, _ensure_timezone(start).astimezone(calendars[site_id].zone).date())
+            for site_id, start in shifts
+            if site_id in calendars
+        }
+
+    def _site_calendars(self, site_ids: set[int]) -> dict[int, _SiteCalendar]:
+        missing = site_ids - self._calendars.keys()
+        if missing:
+            for site_id, organization_id, timezone in self._session.execute(
+                select(
+                    db_models.Site.id, db_models.Site.organization_id, db_models.Site.timezone
+                ).where(db_models.Site.id.in_(missing))
+            ).tuples():
+                self._calendars[site_id] = _SiteCalendar(organization_id, site_zone(timezone))
+        return self._calendars
+
+    def _rewrite(self, keys: set[tuple[int, date]]) -> None:
+        calendars = self._site_calendars({site_id for site_id, _ in keys})
+        windows: list[ColumnElement[bool]] = []
+        for site_id, day in keys:
+            zone = calendars[site_id].zone
+            windows.append(
+                and_(
+                    db_models.ShiftInstance.site_id == site_id,
+                    db_models.ShiftInstance.start_utc
+                    >= datetime.combine(day, time(), zone).astimezone(UTC),
+                    db_models.ShiftInstance.start_utc
+                    < datetime.combine(day + timedelta(days=1), time(), zone).astimezone(UTC),
+                )
+            )
+        instances = self._session.scalars(
+            select(db_models.ShiftInstance)
+            .options(selectinload(db_models.ShiftInstance.assignments))
+            .where(or_(*windows))
+            .order_by(db_models.ShiftInstance.start_utc, db_models.ShiftInstance.id)
+            .execution_options(populate_existing=True)
+        ).all()
+
+        counts: dict[int, _ConflictTally] = defaultdict(_ConflictTally)
+        if instances:
+            for shift_id, severity, rule, total in self._session.execute(
+                select(
+                    db_models.PlanningConflict.shift_instance_id,
+                    db_models.PlanningConflict.type,
+                    db_models.PlanningConflict.rule,
+                    func.count(),
+                )
+                .where(
+                    db_models.PlanningConflict.shift_instance_id.in_(
+                        [instance.id for instance in instances]
+                    )
+                )
+                .group_by(
+                    db_models.PlanningConflict.shift_instance_id,
+                    db_models.PlanningConflict.type,
+                    db_models.PlanningConflict.rule,
+                )
+            ).tuples():
+                counts[shift_id].add(severity, rule, total)
+
+        buckets: dict[tuple[int, date], list[BoardDayShift]] = defaultdict(list)
+        for instance in instances:
+            start = _ensure_timezone(instance.start_utc)
+            key = (instance.site_id, start.astimezone(calendars[instance.site_id].zone).date())
+            conflicts = counts.get(instance.id, _ConflictTally())
+            buckets[key].append(
+                BoardDayShift(
+                    id=instance.id,
+                    mission_id=instance.mission_id,
+                    role_id=instance.role_id,
+                    start_utc=start,
+                    end_utc=_ensure_timezone(instance.end_utc),
+                    status=instance.status,
+                    capacity=instance.capacity,
+                    assigned_count=instance.assigned_count,
+                    assignments=[
+                        BoardDayAssignment(
+                            id=assignment.id,
+                            collaborator_id=assignment.collaborator_id,
+                            status=assignment.status,
+                            is_locked=bool(assignment.is_locked),
+                        )
+                        for assignment in sorted(instance.assignments, key=lambda a: a.id)
+                    ],
+                    hard_conflicts=conflicts.hard,
+                    soft_conflicts=conflicts.soft,
+                    conflict_rules=sorted(conflicts.rules),
+                )
+            )
+
+        emptied = keys - buckets.keys()
+        if emptied:
+            self._session.execute(
+                delete(db_models.PlanningBoardDay).where(
+                    or_(
+                        *(
+                            and_(
+                                db_models.PlanningBoardDay.site_id == site_id,
+                                db_models.PlanningBoardDay.local_date == day,
+                            )
+                            for site_id, day in emptied
+                        )
+                    )
+                )
+            )
+        rows: list[dict[str, Any]] = [
+            {
+                "organization_id": calendars[site_id].organization_id,
+                "site_id": site_id,
+                "local_date": day,
+                "shift_count": len(shifts),
+                "hard_conflicts": sum(shift.hard_conflicts for shift in shifts),
+                "soft_conflicts": sum(shift.soft_conflicts for shift in shifts),
+                "shifts": [shift.model_dump(mode="json") for shift in shifts],
+                "updated_at": datetime.now(UTC),
+            }
+            # Key order keeps concurrent writers locking buckets in the same order.
+            for (site_id, day), shifts in sorted(buckets.items())
+        ]
+        if rows:
+            self._upsert(rows)
+
+    def _upsert(self, rows: list[dict[str, Any]]) -> None:
+        """Write buckets with ``INSERT … ON CONFLICT DO UPDATE``.
+
+        A delete-then-insert would let two writers of the same day both find
+        nothing to delete, and the second insert would break
+        ``uix_planning_board_day``.
+        """
+
+        statement: postgresql.Insert | sqlite.Insert
+        if self._session.get_bind().dialect.name == "postgresql":
+            statement = postgresql.insert(db_models.PlanningBoardDay)
+        else:
+            statement = sqlite.insert(db_models.PlanningBoardDay)
+        self._session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["organization_id", "site_id", "local_date"],
+                set_={
+                    column: statement.excluded[column]
+                    for column in (
+                        "shift_count",
+                        "hard_conflicts",
+                        "soft_conflicts",
+                        "shifts",
+                        "updated_at",
+                    )
+                },
+            ),
+            rows,
+        )
+
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from sqlalchemy import ColumnElement, and_, delete, event, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.logging import logger
+from app.db.models import planning as db_models
+from app.models.planning_pro import Assignment, ConflictEntry, ShiftInstance
+from app.services.board_days import BoardDayProjection
+from app.services.planning_pro import RuleService, _to_assignment, _to_shift_instance
+from app.services.planning_versions import PlanningVersionService
+from app.services.rule_catalog import DEFAULT_MIN_REST, changed_rule_organizations
+
+# Rules that depend on the shift alone: they are reported with assignment
+# checks but stored, and shown on boards, once at shift level.
+SHIFT_LEVEL_RULES = frozenset({"site_blackout"})
+
+
+class ConflictRefresh(NamedTuple):
+    shifts: dict[int, list[ConflictEntry]]
+    assignments: dict[int, list[ConflictEntry]]
+
+
+class ConflictMaintenanceService:
+    """Owns the persisted ``planning_conflicts`` table."""
+
+    _REBUILD_CHUNK_SIZE = 500
+
+    def __init__(self, session: Session, rule_service: RuleService) -> None:
+        self._session = session
+        self._rule_service = rule_service
+        self._board_days = BoardDayProjection(session)
+        self._versions = PlanningVersionService(session)
+
+    def mark_board_days(self, shift_ids: Iterable[int]) -> None:
+        """Rewrite the current board days of ``shift_ids`` on the next refresh."""
+
+        self._board_days.mark(shift_ids)
+
+    def conflicts_for_shifts(self, shift_ids: Iterable[int]) -> dict[int, list[ConflictEntry]]:
+        conflicts: dict[int, list[ConflictEntry]] = {shift_id: [] for shift_id in shift_ids}
+        if not conflicts:
+            return conflicts
+        rows = self._session.scalars(
+            select(db_models.PlanningConflict)
+            .where(db_models.PlanningConflict.shift_instance_id.in_(list(conflicts)))
+            .order_by(
+                db_models.PlanningConflict.assignment_id.is_not(None),
+                db_models.PlanningConflict.assignment_id,
+                db_models.PlanningConflict.id,
+            )
+        )
+        for row in rows:
+            conflicts[row.shift_instance_id].append(
+                ConflictEntry(type=row.type, rule=row.rule, details=row.details)
+            )
+        return conflicts
+
+    def refresh(
+        self,
+        *,
+        shift_ids: Iterable[int] = (),
+        neighbourhoods: Iterable[tuple[int, datetime, datetime]] = (),
+    ) -> ConflictRefresh:
+        """Recompute stored conflicts for shifts and collaborator time windows."""
+
+        self._session.flush()
+        shift_ids = set(shift_ids)
+        neighbourhoods = list(neighbourhoods)
+        margins = self._rule_service.neighbourhood_margins(
+            {collaborator_id for collaborator_id, _, _ in neighbourhoods}
+        )
+        conditions: list[ColumnElement[bool]] = []
+        if shift_ids:
+            conditions.append(db_models.Assignment.shift_instance_id.in_(shift_ids))
+        for collaborator_id, start, end in neighbourhoods:
+            margin = margins.get(collaborator_id, DEFAULT_MIN_REST)
+            conditions.append(
+                and_(
+                    db_models.Assignment.collaborator_id == collaborator_id,
+                    db_models.ShiftInstance.start_utc < end + margin,
+                    db_models.ShiftInstance.end_utc > start - margin,
+                )
+            )
+        items: list[tuple[Assignment, ShiftInstance]] = []
+        if conditions:
+            items = [
+                (_to_assignment(assignment), _to_shift_instance(shift))
+                for assignment, shift in self._session.execute(
+                    select(db_models.Assignment, db_models.ShiftInstance)
+                    .join(
+                        db_models.ShiftInstance,
+                        db_models.Assignment.shift_instance_id == db_models.ShiftInstance.id,
+                    )
+                    .where(or_(*conditions))
+                    .order_by(db_models.Assignment.id)
+                ).tuples()
+            ]
+        shifts = (
+            [
+                _to_shift_instance(shift)
+                for shift in self._session.scalars(
+                    select(db_models.ShiftInstance).where(
+                        db_models.ShiftInstance.id.in_(shift_ids)
+                    )
+                )
+            ]
+            if shift_ids
+            else []
+        )
+
+        stale: list[ColumnElement[bool]] = []
+        if shift_ids:
+            stale.append(
+                and_(
+                    db_models.PlanningConflict.shift_instance_id.in_(shift_ids),
+                    db_models.PlanningConflict.assignment_id.is_(None),
+                )
+            )
+        if items:
+            stale.append(
+                db_models.PlanningConflict.assignment_id.in_(
+                    [assignment.id for assignment, _ in items]
+                )
+            )
+        if stale:
+            self._session.execute(delete(db_models.PlanningConflict).where(or_(*stale)))
+
+        shift_conflicts = self._rule_service.evaluate_shifts(shifts)
+        assignment_conflicts = {
+            assignment.id: entries
+            for (assignment, _), entries in zip(
+                items,
+                self._rule_service.evaluate_assignments(items),
+                strict=True,
+            )
+        }
+        rows: list[dict[str, Any]] = [
+            {
+                "shift_instance_id": shift_id,
+                "assignment_id": None,
+                "collaborator_id": None,
+                "rule": entry.rule,
+                "type": entry.type,
+                "details": entry.details,
+            }
+            for shift_id, entries in shift_conflicts.items()
+            for entry in entries
+        ]
+        for assignment, shift in items:
+            rows.extend(
+                {
+                    "shift_instance_id": shift.id,
+                    "assignment_id": assignment.id,
+                    "collaborator_id": assignment.collaborator_id,
+                    "rule": entry.rule,
+                    "type": entry.type,
+                    "details": entry.details,
+                }
+                for entry in assignment_conflicts[assignment.id]
+                if entry.rule not in SHIFT_LEVEL_RULES
+            )
+        if rows:
+            self._session.execute(insert(db_models.PlanningConflict), rows)
+        organizations = self._board_days.refresh(
+            [(shift.site_id, shift.start_utc) for shift in shifts]
+            + [(shift.site_id, shift.start_utc) for _, shift in items]
+        )
+        self._versions.bump(organizations)
+        return ConflictRefresh(shifts=shift_conflicts, assignments=assignment_conflicts)
+
+    def forget_shift(self, shift_id: int) -> None:
+        self._board_days.mark([shift_id])
+        self._session.execute(
+            delete(db_models.PlanningConflict).where(
+                db_models.PlanningConflict.shift_instance_id == shift_id
+            )
+        )
+
+    def forget_assignment(self, assignment_id: int) -> None:
+        self._session.execute(
+            delete(db_models.PlanningConflict).where(
+                db_models.PlanningConflict.assignment_id == assignment_id
+            )
+        )
+
+    def rebuild(self, *, start: datetime | None = None, end: datetime | None = None) -> int:
+        """Recompute the store for every shift in the window, in chunks."""
+
+        query = select(db_models.ShiftInstance.id).order_by(db_models.ShiftInstance.id)
+        if start is not None:
+            query = query.where(db_models.ShiftInstance.end_utc > start)
+        if end is not None:
+            query = query.where(db_models.ShiftInstance.start_utc < end)
+        shift_ids = list(self._session.scalars(query))
+        self._refresh_in_chunks(shift_ids)
+        self._session.commit()
+        logger.info("Planning conflicts rebuilt", extra={"shift_count": len(shift_ids)})
+        return len(shift_ids)
+
+    def refresh_organizations(self, organization_ids: Iterable[int]) -> int:
+        """Recompute the store for every shift of ``organization_ids``; the caller commits."""
+
+        shift_ids = list(
+            self._session.scalars(
+                select(db_models.ShiftInstance.id)
+                .join(db_models.Site, db_models.ShiftInstance.site_id == db_models.Site.id)
+                .where(db_models.Site.organization_id.in_(set(organization_ids)))
+                .order_by(db_models.ShiftInstance.id)
+            )
+        )
+        self._refresh_in_chunks(shift_ids)
+        return len(shift_ids)
+
+    def _refresh_in_chunks(self, shift_ids: Sequence[int]) -> None:
+        for offset in range(0, len(shift_ids), self._REBUILD_CHUNK_SIZE):
+            self.refresh(shift_ids=shift_ids[offset : offset + self._REBUILD_CHUNK_SIZE])
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_conflicts_after_rule_changes(session: Session) -> None:
+    # Stored conflicts and board days were computed with the previous rules.
+    organizations = changed_rule_organizations(session)
+    if organizations:
+        maintenance = ConflictMaintenanceService(session, RuleService(session))
+        refreshed = maintenance.refresh_organizations(organizations)
+        logger.info(
+            "Planning conflicts refreshed after rule change",
+            extra={"organizations": sorted(organizations), "shift_count": refreshed},
+        )
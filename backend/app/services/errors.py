@@ -1,3 +1,6 @@
+from typing import Any
+
+
 class ServiceError(Exception):
     """Base class for service layer errors."""
 
@@ -10,5 +13,17 @@ class ConflictError(ServiceError):
     """Raised when an operation conflicts with existing data."""
 
 
+class StaleVersionError(ConflictError):
+    """Raised when a write is based on an outdated version of an entity."""
+
+    def __init__(self, message: str, *, current: dict[str, Any]) -> None:
+        super().__init__(message)
+        self.current = current
+
+
 class ValidationError(ServiceError):
     """Raised when validation fails at the service layer."""
+
+
+class PreconditionFailedError(ServiceError):
+    """Raised when a conditional request header cannot be satisfied."""
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic, TypeVar
+
+PayloadType = TypeVar("PayloadType")
+
+
+@dataclass(frozen=True, slots=True)
+class Interval(Generic[PayloadType]):
+    start: datetime
+    end: datetime
+    payload: PayloadType
+
+
+class IntervalIndex(Generic[PayloadType]):
+    """Static interval tree over half-open ``[start, end)`` intervals.
+
+    Intervals are sorted by start and an implicit balanced tree over that array
+    keeps the greatest end of every subtree, so overlap queries visit
+    O(log n + k) nodes instead of scanning every interval.
+    """
+
+    def __init__(self, intervals: Iterable[Interval[PayloadType]] = ()) -> None:
+        self._intervals = sorted(intervals, key=lambda item: (item.start, item.end))
+        self._max_end: list[datetime | None] = [None] * len(self._intervals)
+        self._build(0, len(self._intervals))
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __iter__(self) -> Iterator[Interval[PayloadType]]:
+        return iter(self._intervals)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Interval[PayloadType]]:
+        """Return intervals overlapping ``[start, end)`` ordered by start."""
+
+        matches: list[Interval[PayloadType]] = []
+        self._collect(0, len(self._intervals), start, end, matches)
+        return matches
+
+    def _build(self, low: int, high: int) -> datetime | None:
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        greatest = self._intervals[middle].end
+        for child in (self._build(low, middle), self._build(middle + 1, high)):
+            if child is not None and child > greatest:
+                greatest = child
+        self._max_end[middle] = greatest
+        return greatest
+
+    def _collect(
+        self,
+        low: int,
+        high: int,
+        start: datetime,
+        end: datetime,
+        matches: list[Interval[PayloadType]],
+    ) -> None:
+        if low >= high:
+            return
+        middle = (low + high) // 2
+        greatest = self._max_end[middle]
+        if greatest is None or greatest <= start:
+            return
+        self._collect(low, middle, start, end, matches)
+        interval = self._intervals[middle]
+        if interval.start >= end:
+            return
+        if interval.end > start:
+            matches.append(interval)
+        self._collect(middle + 1, high, start, end, matches)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+import numpy.typing as npt
+
+IntArray = npt.NDArray[np.int64]
+FloatArray = npt.NDArray[np.float64]
+
+
+def min_cost_assignment(costs: FloatArray) -> IntArray:
+    """Solve the rectangular assignment problem with the Hungarian algorithm.
+
+    ``costs`` has one row per worker and at least as many columns as rows, all
+    finite. Returns, for every row, the column it is matched to so that the
+    total cost is minimal and no column is used twice. This is the shortest
+    augmenting path variant with row/column potentials, O(n² m), where the
+    scan over columns of each step runs vectorised in NumPy.
+    """
+
+    rows, columns = costs.shape
+    if rows > columns:
+        raise ValueError("costs must have at least as many columns as rows")
+    # Index 0 is a sentinel column; rows and columns are 1-based below.
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    owner = np.zeros(columns + 1, dtype=np.int64)
+    way = np.zeros(columns + 1, dtype=np.int64)
+    for row in range(1, rows + 1):
+        owner[0] = row
+        column = 0
+        min_reduced = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = owner[column]
+            free = ~used[1:]
+            reduced = costs[current_row - 1] - u[current_row] - v[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            visited = np.flatnonzero(used)
+            u[owner[visited]] += delta
+            v[visited] -= delta
+            min_reduced[1:][free] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    matched = np.full(rows, -1, dtype=np.int64)
+    assigned = np.flatnonzero(owner[1:])
+    matched[owner[assigned + 1] - 1] = assigned
+    return matched
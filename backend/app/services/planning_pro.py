@@ -1,28 +1,46 @@
 from __future__ import annotations
 
-import hashlib
-from collections.abc import Iterable
-from datetime import UTC, datetime, timedelta
-from typing import Any
+import base64
+import binascii
+import heapq
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta, tzinfo
+from itertools import islice
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, insert, or_, select, text, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
+from app.core.config import settings
 from app.core.logging import logger
 from app.db.models import planning as db_models
 from app.models.planning_pro import (
     Assignment,
+    AssignmentBatchItem,
+    AssignmentBatchResult,
     AssignmentCreate,
     AssignmentUpdate,
+    Blackout,
+    BlackoutCreate,
     ConflictEntry,
     ConflictRule,
     HrRule,
     NotificationEvent,
+    PlanningChangeFeed,
+    PlanningTombstone,
+    PlanningUpsert,
     Publication,
     ShiftInstance,
     ShiftInstanceCreate,
     ShiftInstanceUpdate,
+    ShiftMaterialisation,
+    ShiftMaterialisationRequest,
     ShiftTemplate,
     ShiftTemplateCreate,
     ShiftTemplateUpdate,
@@ -30,7 +48,18 @@ from app.models.planning_pro import (
     UserAvailability,
     UserAvailabilityCreate,
 )
-from app.services.errors import NotFoundError, ValidationError
+from app.services.blackout_catalog import BlackoutWindow, blackout_catalog
+from app.services.board_days import site_zone
+from app.services.errors import ConflictError, NotFoundError, StaleVersionError, ValidationError
+from app.services.intervals import Interval, IntervalIndex
+from app.services.planning_versions import PlanningVersionService
+from app.services.recurrence import RecurrenceRule
+from app.services.references import ReferenceLoader
+from app.services.rule_catalog import DAY, DEFAULT_MIN_REST, WEEK, CompiledRules, rule_catalog
+from app.services.workload import CollaboratorWorkload, workload_ledger
+
+if TYPE_CHECKING:
+    from app.services.conflict_maintenance import ConflictMaintenanceService
 
 
 def _overlaps(
@@ -47,6 +76,399 @@ def _timestamp() -> datetime:
     return datetime.now(UTC)
 
 
+def _shift_window(shift: db_models.ShiftInstance) -> tuple[datetime, datetime]:
+    return _ensure_timezone(shift.start_utc), _ensure_timezone(shift.end_utc)
+
+
+DOUBLE_BOOKING_CONSTRAINT = "ex_assignments_double_booking"
+STREAM_BATCH_SIZE = 200
+# Statements issued by one board listing (or one streamed batch), whatever the
+# number of shifts: the shifts, their assignments (selectinload) and the stored
+# conflicts.
+BOARD_QUERY_BUDGET = 3
+
+# Changes read per ``GET /planning/changes`` call unless the client asks for less.
+CHANGE_FEED_BATCH_SIZE = 500
+
+# Items of ``POST /planning/assignments:batch`` whose conflicts are refreshed
+# (and rows re-read) per statement.
+ASSIGNMENT_BATCH_CHUNK_SIZE = 500
+
+# Bulk materialisation of recurring templates: rows per ``INSERT ... RETURNING``
+# statement and per conflict refresh, and the widest window one call may fill.
+MATERIALISE_CHUNK_SIZE = 1_000
+MAX_MATERIALISE_WINDOW = timedelta(days=366)
+
+
+class ShiftCursor(NamedTuple):
+    """Keyset position in the ``(start_utc, id)`` ordering of shift instances."""
+
+    start_utc: datetime
+    id: int
+
+    @classmethod
+    def after_shift(cls, shift: ShiftInstance) -> ShiftCursor:
+        return cls(_ensure_timezone(shift.start_utc), shift.id)
+
+    def encode(self) -> str:
+        raw = f"{self.start_utc.isoformat()}|{self.id}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> ShiftCursor:
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+            start, _, shift_id = raw.rpartition("|")
+            return cls(_ensure_timezone(datetime.fromisoformat(start)), int(shift_id))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+            raise ValidationError("Invalid cursor") from exc
+
+
+# Virtual occurrences of recurring templates use
+# ``-(template_id * VIRTUAL_ID_SPAN + start minute since the epoch)`` as id:
+# minutes stay below the span until 2160 and ids within JSON's 53-bit integers.
+VIRTUAL_ID_SPAN = 100_000_000
+
+
+class ShiftRemoval(NamedTuple):
+    """Outcome of ``delete_instance``: the occurrence kept as cancelled, the deleted assignments."""
+
+    cancelled: ShiftInstance | None
+    assignments: list[Assignment]
+
+
+def _shift_view_key(view: ShiftWithAssignments) -> tuple[datetime, int]:
+    return _ensure_timezone(view.shift.start_utc), view.shift.id
+
+
+def _sync_booking(assignment: db_models.Assignment, shift: db_models.ShiftInstance) -> None:
+    assignment.booking_start_utc = shift.start_utc
+    assignment.booking_end_utc = shift.end_utc
+    assignment.booking_active = shift.status != "cancelled"
+
+
+def _is_booked(
+    session: Session,
+    collaborator_id: int,
+    start: datetime,
+    end: datetime,
+    *,
+    exclude_assignment_id: int | None,
+) -> bool:
+    query = select(db_models.Assignment.id).where(
+        db_models.Assignment.collaborator_id == collaborator_id,
+        db_models.Assignment.booking_active.is_(True),
+        db_models.Assignment.booking_start_utc < end,
+        db_models.Assignment.booking_end_utc > start,
+    )
+    if exclude_assignment_id is not None:
+        query = query.where(db_models.Assignment.id != exclude_assignment_id)
+    return session.scalar(query.limit(1)) is not None
+
+
+# Databases seen to carry the exclusion constraint; absence is checked again.
+_constraint_databases: set[str] = set()
+
+
+def _has_double_booking_constraint(session: Session) -> bool:
+    """Whether the database enforces ``ex_assignments_double_booking`` itself."""
+
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    database = bind.engine.url.render_as_string()
+    if database not in _constraint_databases and session.scalar(
+        text("SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = :name)"),
+        {"name": DOUBLE_BOOKING_CONSTRAINT},
+    ):
+        _constraint_databases.add(database)
+    return database in _constraint_databases
+
+
+def _double_booking_enforced(session: Session) -> bool:
+    return settings.double_booking_constraint or _has_double_booking_constraint(session)
+
+
+@contextmanager
+def _double_booking_guard(
+    session: Session, bookings: Iterable[tuple[int, datetime, datetime, int | None]]
+) -> Iterator[None]:
+    """Reject writes booking a collaborator twice at the same time."""
+
+    if settings.double_booking_constraint and not _has_double_booking_constraint(session):
+        for collaborator_id, start, end, assignment_id in bookings:
+            if _is_booked(
+                session, collaborator_id, start, end, exclude_assignment_id=assignment_id
+            ):
+                session.rollback()
+                raise ConflictError("Collaborator is already booked during this shift")
+    try:
+        yield
+    except IntegrityError as exc:
+        if DOUBLE_BOOKING_CONSTRAINT not in str(exc.orig):
+            raise
+        session.rollback()
+        raise ConflictError("Collaborator is already booked during this shift") from exc
+
+
+def _check_version(
+    entity: str, version: int, expected: int | None, current: ShiftInstance | Assignment
+) -> None:
+    if expected is not None and version != expected:
+        raise StaleVersionError(
+            f"{entity} is at version {version}, not {expected}", current=current.model_dump()
+        )
+
+
+@contextmanager
+def _version_guard(
+    session: Session, entity: str, current: Callable[[], ShiftInstance | Assignment]
+) -> Iterator[None]:
+    """Turn a lost race on a versioned row into ``StaleVersionError``."""
+
+    try:
+        yield
+    except StaleDataError as exc:
+        session.rollback()
+        raise StaleVersionError(
+            f"{entity} was modified concurrently", current=current().model_dump()
+        ) from exc
+
+
+def _adjust_assigned_counts(session: Session, deltas: dict[int, int]) -> None:
+    """Move ``assigned_count`` in SQL, leaving the shifts' ``version`` alone."""
+
+    by_delta: defaultdict[int, list[int]] = defaultdict(list)
+    for shift_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(shift_id)
+    for delta, shift_ids in by_delta.items():
+        session.execute(
+            update(db_models.ShiftInstance)
+            .where(db_models.ShiftInstance.id.in_(shift_ids))
+            .values(assigned_count=db_models.ShiftInstance.assigned_count + delta)
+        )
+
+
+class _Booking(NamedTuple):
+    assignment_id: int
+    shift_instance_id: int
+
+
+class _AvailabilityWindow(NamedTuple):
+    is_available: bool
+    reason: str | None
+
+
+@dataclass(slots=True)
+class _ConflictContext:
+    """Preloaded neighbourhood used to evaluate assignments without further queries."""
+
+    bookings: dict[int, IntervalIndex[_Booking]]
+    availabilities: dict[int, IntervalIndex[_AvailabilityWindow]]
+    primary_roles: dict[int, int | None]
+    rules: dict[int, CompiledRules]
+    default_rules: CompiledRules
+    blackouts: dict[int, IntervalIndex[BlackoutWindow]]
+    workloads: dict[int, CollaboratorWorkload]
+
+    def rules_for(self, collaborator_id: int) -> CompiledRules:
+        return self.rules.get(collaborator_id, self.default_rules)
+
+
+def _booking_conflicts(
+    shift: ShiftInstance,
+    bookings: IntervalIndex[_Booking],
+    rules: CompiledRules,
+    *,
+    assignment_id: int | None,
+) -> list[ConflictEntry]:
+    conflicts: list[ConflictEntry] = []
+    margin = rules.min_rest
+    for booking in bookings.overlapping(shift.start_utc - margin, shift.end_utc + margin):
+        if assignment_id is not None and booking.payload.assignment_id == assignment_id:
+            continue
+        if rules.double_booking_enforced and _overlaps(
+            shift.start_utc, shift.end_utc, booking.start, booking.end
+        ):
+            conflicts.append(
+                ConflictEntry(
+                    type=rules.double_booking_type,
+                    rule="double_booking",
+                    details={"other_shift_id": booking.payload.shift_instance_id},
+                )
+            )
+        if shift.start_utc >= booking.end:
+            rest_gap = shift.start_utc - booking.end
+        else:
+            rest_gap = booking.start - shift.end_utc
+        conflicts.append(
+            ConflictEntry(
+                type=rules.min_rest_type,
+                rule="min_rest",
+                details={"minutes_gap": int(rest_gap.total_seconds() // 60)},
+            )
+        )
+    return conflicts
+
+
+def _blackout_conflicts(
+    start: datetime, end: datetime, blackouts: IntervalIndex[BlackoutWindow]
+) -> list[ConflictEntry]:
+    return [
+        ConflictEntry(
+            type="hard" if blackout.payload.is_hard_limit else "soft",
+            rule="site_blackout",
+            details={
+                "blackout_id": blackout.payload.blackout_id,
+                "reason": blackout.payload.reason,
+            },
+        )
+        for blackout in blackouts.overlapping(start, end)
+    ]
+
+
+def _hours(value: timedelta) -> float:
+    return round(value.total_seconds() / 3600, 2)
+
+
+def _workload_conflicts(
+    shift: ShiftInstance,
+    rules: CompiledRules,
+    workload: CollaboratorWorkload,
+    *,
+    assignment_id: int | None,
+) -> list[ConflictEntry]:
+    def worked(start: datetime, end: datetime) -> timedelta:
+        own = min(shift.end_utc, end) - max(shift.start_utc, start)
+        booked = workload.worked_seconds(start, end, exclude=assignment_id)
+        return timedelta(seconds=booked) + max(own, timedelta(0))
+
+    conflicts: list[ConflictEntry] = []
+    if rules.max_hours_day is not None:
+        day = shift.start_utc.astimezone(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < shift.end_utc:
+            total = worked(day, day + DAY)
+            if total > rules.max_hours_day:
+                conflicts.append(
+                    ConflictEntry(
+                        type=rules.max_hours_day_type,
+                        rule="max_hours_day",
+                        details={
+                            "day": day.date().isoformat(),
+                            "limit_hours": _hours(rules.max_hours_day),
+                            "worked_hours": _hours(total),
+                        },
+                    )
+                )
+            day += DAY
+    if rules.max_hours_week is not None:
+        # The busiest rolling week containing the shift starts at a booking start
+        # or ends at a booking end, so only those breakpoints need a lookup.
+        window_starts = {shift.start_utc, shift.end_utc - WEEK}
+        window_starts.update(workload.starts_between(shift.end_utc - WEEK, shift.start_utc))
+        window_starts.update(
+            booking_end - WEEK
+            for booking_end in workload.ends_between(shift.end_utc, shift.start_utc + WEEK)
+        )
+        total = max(worked(window_start, window_start + WEEK) for window_start in window_starts)
+        if total > rules.max_hours_week:
+            conflicts.append(
+                ConflictEntry(
+                    type=rules.max_hours_week_type,
+                    rule="max_hours_week",
+                    details={
+                        "limit_hours": _hours(rules.max_hours_week),
+                        "worked_hours": _hours(total),
+                    },
+                )
+            )
+    return conflicts
+
+
+def _assignment_conflicts(
+    assignment: Assignment | AssignmentCreate,
+    shift: ShiftInstance,
+    context: _ConflictContext,
+) -> list[ConflictEntry]:
+    conflicts: list[ConflictEntry] = []
+    bookings = context.bookings.get(assignment.collaborator_id)
+    if bookings is not None:
+        conflicts.extend(
+            _booking_conflicts(
+                shift,
+                bookings,
+                context.rules_for(assignment.collaborator_id),
+                assignment_id=getattr(assignment, "id", None),
+            )
+        )
+    workload = context.workloads.get(assignment.collaborator_id)
+    if workload is not None:
+        conflicts.extend(
+            _workload_conflicts(
+                shift,
+                context.rules_for(assignment.collaborator_id),
+                workload,
+                assignment_id=getattr(assignment, "id", None),
+            )
+        )
+    availabilities = context.availabilities.get(assignment.collaborator_id)
+    windows = (
+        availabilities.overlapping(shift.start_utc, shift.end_utc)
+        if availabilities is not None
+        else []
+    )
+    for availability in windows:
+        if not availability.payload.is_available:
+            conflicts.append(
+                ConflictEntry(
+                    type="hard",
+                    rule="leave",
+                    details={"reason": availability.payload.reason},
+                )
+            )
+        else:
+            conflicts.append(
+                ConflictEntry(
+                    type="soft",
+                    rule="availability_partial",
+                    details={"reason": availability.payload.reason},
+                )
+            )
+    site_blackouts = context.blackouts.get(shift.site_id)
+    if site_blackouts is not None:
+        conflicts.extend(_blackout_conflicts(shift.start_utc, shift.end_utc, site_blackouts))
+    if (
+        assignment.collaborator_id in context.primary_roles
+        and context.primary_roles[assignment.collaborator_id] != assignment.role_id
+    ):
+        conflicts.append(
+            ConflictEntry(
+                type="hard",
+                rule="missing_skill",
+                details={"expected_role_id": context.primary_roles[assignment.collaborator_id]},
+            )
+        )
+    assigned_count = shift.assigned_count
+    if assigned_count > shift.capacity:
+        conflicts.append(
+            ConflictEntry(
+                type="hard",
+                rule="capacity_exceeded",
+                details={"capacity": shift.capacity, "attempted": assigned_count},
+            )
+        )
+    elif assigned_count == shift.capacity:
+        conflicts.append(
+            ConflictEntry(
+                type="soft",
+                rule="capacity_full",
+                details={"capacity": shift.capacity},
+            )
+        )
+    return conflicts
+
+
 def _to_shift_template(model: db_models.ShiftTemplate) -> ShiftTemplate:
     return ShiftTemplate(
         id=model.id,
@@ -75,6 +497,13 @@ def _to_shift_instance(model: db_models.ShiftInstance) -> ShiftInstance:
         status=model.status,
         source=model.source,
         capacity=model.capacity,
+        assigned_count=model.assigned_count,
+        occurrence_start_utc=(
+            _ensure_timezone(model.occurrence_start_utc)
+            if model.occurrence_start_utc is not None
+            else None
+        ),
+        version=model.version,
     )
 
 
@@ -90,6 +519,7 @@ def _to_assignment(model: db_models.Assignment) -> Assignment:
         is_locked=model.is_locked,
         created_at=model.created_at,
         updated_at=model.updated_at,
+        version=model.version,
     )
 
 
@@ -97,13 +527,24 @@ def _to_availability(model: db_models.UserAvailability) -> UserAvailability:
     return UserAvailability(
         id=model.id,
         collaborator_id=model.collaborator_id,
-        start_utc=model.start_utc,
-        end_utc=model.end_utc,
+        start_utc=_ensure_timezone(model.start_utc),
+        end_utc=_ensure_timezone(model.end_utc),
         is_available=model.is_available,
         reason=model.reason,
     )
 
 
+def _to_blackout(model: db_models.Blackout) -> Blackout:
+    return Blackout(
+        id=model.id,
+        site_id=model.site_id,
+        start_utc=_ensure_timezone(model.start_utc),
+        end_utc=_ensure_timezone(model.end_utc),
+        reason=model.reason,
+        is_hard_limit=bool(model.is_hard_limit),
+    )
+
+
 def _to_publication(model: db_models.Publication) -> Publication:
     return Publication(
         id=model.id,
@@ -116,9 +557,19 @@ def _to_publication(model: db_models.Publication) -> Publication:
     )
 
 
+def _validate_recurrence(rule: str | None) -> None:
+    if rule is None:
+        return
+    try:
+        RecurrenceRule.parse(rule)
+    except ValueError as exc:
+        raise ValidationError(f"Invalid recurrence rule: {exc}") from exc
+
+
 class ShiftTemplateService:
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: Session, references: ReferenceLoader | None = None) -> None:
         self._session = session
+        self._references = references or ReferenceLoader(session)
 
     def list_templates(self, *, mission_id: int | None = None) -> list[ShiftTemplate]:
         query = select(db_models.ShiftTemplate)
@@ -128,6 +579,7 @@ class ShiftTemplateService:
         return [_to_shift_template(template) for template in templates]
 
     def create_template(self, payload: ShiftTemplateCreate) -> ShiftTemplate:
+        _validate_recurrence(payload.recurrence_rule)
         self._validate_references(
             mission_id=payload.mission_id,
             site_id=payload.site_id,
@@ -143,6 +595,7 @@ class ShiftTemplateService:
     def update_template(self, template_id: int, payload: ShiftTemplateUpdate) -> ShiftTemplate:
         template = self._get_template(template_id)
         updates = payload.model_dump(exclude_none=True)
+        _validate_recurrence(updates.get("recurrence_rule"))
         mission_id = updates.get("mission_id", template.mission_id)
         site_id = updates.get("site_id", template.site_id)
         role_id = updates.get("role_id", template.role_id)
@@ -175,9 +628,9 @@ class ShiftTemplateService:
         return template
 
     def _validate_references(self, *, mission_id: int, site_id: int, role_id: int) -> None:
-        mission = self._session.get(db_models.Mission, mission_id)
-        site = self._session.get(db_models.Site, site_id)
-        role = self._session.get(db_models.Role, role_id)
+        mission = self._references.get(db_models.Mission, mission_id)
+        site = self._references.get(db_models.Site, site_id)
+        role = self._references.get(db_models.Role, role_id)
         if mission is None:
             raise NotFoundError("Mission not found")
         if site is None:
@@ -188,10 +641,281 @@ class ShiftTemplateService:
             raise ValidationError("Mission must match site and role references")
 
 
+class _RecurringTemplate(NamedTuple):
+    template: db_models.ShiftTemplate
+    rule: RecurrenceRule
+    dtstart: datetime
+    duration: timedelta
+
+
+class RecurringShiftService:
+    """Virtual occurrences of recurring shift templates, stored once edited or assigned."""
+
+    def __init__(self, session: Session, rule_service: RuleService | None = None) -> None:
+        self._session = session
+        self._rule_service = rule_service or RuleService(session)
+        self._zones: dict[str, tzinfo] = {}
+
+    def occurrences(
+        self,
+        *,
+        start: datetime,
+        end: datetime,
+        mission_id: int | None = None,
+        site_ids: list[int] | None = None,
+        after: ShiftCursor | None = None,
+    ) -> Iterator[ShiftWithAssignments]:
+        """Yield unstored occurrences overlapping ``[start, end)`` in ``(start_utc, id)`` order."""
+
+        templates = self._templates(mission_id=mission_id, site_ids=site_ids)
+        for shift in self._unstored(templates, start=start, end=end, after=after):
+            (conflicts,) = self._rule_service.blackout_conflicts([shift])
+            yield ShiftWithAssignments(shift=shift, assignments=[], conflicts=conflicts)
+
+    def store_window(
+        self,
+        *,
+        start: datetime,
+        end: datetime,
+        template_id: int | None = None,
+        mission_id: int | None = None,
+    ) -> tuple[list[int], list[int], int]:
+        """Insert every unstored occurrence overlapping ``[start, end)``."""
+
+        templates = self._templates(template_id=template_id, mission_id=mission_id)
+        if template_id is not None and not templates:
+            raise NotFoundError("Recurring shift template not found")
+        template_ids = [recurring.template.id for recurring in templates]
+        misaligned = self._session.scalar(
+            select(db_models.ShiftTemplate.id)
+            .join(db_models.Mission, db_models.ShiftTemplate.mission_id == db_models.Mission.id)
+            .where(
+                db_models.ShiftTemplate.id.in_(template_ids),
+                or_(
+                    db_models.Mission.site_id != db_models.ShiftTemplate.site_id,
+                    db_models.Mission.role_id != db_models.ShiftTemplate.role_id,
+                ),
+            )
+            .limit(1)
+        )
+        if misaligned is not None:
+            raise ValidationError("Shift must align with mission site and role")
+        occurrences = self._unstored(templates, start=start, end=end)
+        # Ids come back unordered: asking for parameter order makes some
+        # dialects fall back to one statement per row.
+        statement = insert(db_models.ShiftInstance).returning(db_models.ShiftInstance.id)
+        shift_ids: list[int] = []
+        skipped = 0
+        while chunk := list(islice(occurrences, MATERIALISE_CHUNK_SIZE)):
+            rows = [
+                shift.model_dump(exclude={"id", "is_virtual"})
+                for shift, conflicts in zip(
+                    chunk, self._rule_service.blackout_conflicts(chunk), strict=True
+                )
+                if not any(conflict.type == "hard" for conflict in conflicts)
+            ]
+            skipped += len(chunk) - len(rows)
+            if not rows:
+                continue
+            try:
+                shift_ids.extend(self._session.scalars(statement, rows))
+            except IntegrityError as exc:
+                # A concurrent write stored one of these occurrences first.
+                self._session.rollback()
+                raise ConflictError("Shift occurrences were stored concurrently") from exc
+        return template_ids, sorted(shift_ids), skipped
+
+    def _unstored(
+        self,
+        templates: list[_RecurringTemplate],
+        *,
+        start: datetime,
+        end: datetime,
+        after: ShiftCursor | None = None,
+    ) -> Iterator[ShiftInstance]:
+        if not templates:
+            return
+        longest = max(recurring.duration for recurring in templates)
+        stored = {
+            (template_id, _ensure_timezone(occurrence_start))
+            for template_id, occurrence_start in self._session.execute(
+                select(
+                    db_models.ShiftInstance.template_id,
+                    db_models.ShiftInstance.occurrence_start_utc,
+                ).where(
+                    db_models.ShiftInstance.template_id.in_(
+                        [recurring.template.id for recurring in templates]
+                    ),
+                    db_models.ShiftInstance.occurrence_start_utc > start - longest,
+                    db_models.ShiftInstance.occurrence_start_utc < end,
+                )
+            ).tuples()
+            if occurrence_start is not None
+        }
+        lower = start if after is None else max(start, after.start_utc)
+        expansions = [self._expand(recurring, lower, end) for recurring in templates]
+        for shift in heapq.merge(*expansions, key=lambda item: (item.start_utc, item.id)):
+            if (shift.template_id, shift.start_utc) in stored:
+                continue
+            if after is not None and (shift.start_utc, shift.id) <= after:
+                continue
+            yield shift
+
+    def state(self, shift_id: int) -> ShiftInstance:
+        """The stored row of a virtual id if it has one, else the virtual occurrence."""
+
+        recurring, start = self._occurrence(shift_id)
+        stored = self._stored(recurring.template.id, start)
+        if stored is not None:
+            return _to_shift_instance(stored)
+        return self._virtual(recurring, start)
+
+    def materialise(self, shift_id: int) -> db_models.ShiftInstance:
+        """Return the row of a virtual occurrence, inserting it on first use."""
+
+        recurring, start = self._occurrence(shift_id)
+        stored = self._stored(recurring.template.id, start)
+        if stored is not None:
+            return stored
+        template = recurring.template
+        instance = db_models.ShiftInstance(
+            mission_id=template.mission_id,
+            template_id=template.id,
+            site_id=template.site_id,
+            role_id=template.role_id,
+            team_id=template.team_id,
+            start_utc=start,
+            end_utc=start + recurring.duration,
+            status="draft",
+            source="recurrence",
+            capacity=template.expected_headcount,
+            assigned_count=0,
+            occurrence_start_utc=start,
+        )
+        try:
+            with self._session.begin_nested():
+                self._session.add(instance)
+        except IntegrityError:
+            # A concurrent write stored the same occurrence first.
+            stored = self._stored(template.id, start)
+            if stored is None:
+                raise
+            return stored
+        logger.info(
+            "Recurring shift occurrence stored",
+            extra={"template_id": template.id, "shift_instance_id": instance.id},
+        )
+        return instance
+
+    def _occurrence(self, shift_id: int) -> tuple[_RecurringTemplate, datetime]:
+        template_id, minute = divmod(-shift_id, VIRTUAL_ID_SPAN)
+        templates = self._templates(template_id=template_id) if shift_id < 0 else []
+        if not templates:
+            raise NotFoundError("Shift instance not found")
+        recurring = templates[0]
+        since = datetime.fromtimestamp(minute * 60, tz=UTC)
+        start = next(recurring.rule.occurrences(recurring.dtstart, since=since), None)
+        if start is None or start - since >= timedelta(minutes=1):
+            raise NotFoundError("Shift instance not found")
+        return recurring, start.astimezone(UTC)
+
+    def _stored(self, template_id: int, start: datetime) -> db_models.ShiftInstance | None:
+        return self._session.scalars(
+            select(db_models.ShiftInstance).where(
+                db_models.ShiftInstance.template_id == template_id,
+                db_models.ShiftInstance.occurrence_start_utc == start,
+            )
+        ).first()
+
+    def _templates(
+        self,
+        *,
+        template_id: int | None = None,
+        mission_id: int | None = None,
+        site_ids: list[int] | None = None,
+    ) -> list[_RecurringTemplate]:
+        query = (
+            select(db_models.ShiftTemplate, db_models.Site.timezone)
+            .join(db_models.Site, db_models.ShiftTemplate.site_id == db_models.Site.id)
+            .where(
+                db_models.ShiftTemplate.is_active.is_(True),
+                db_models.ShiftTemplate.recurrence_rule.is_not(None),
+            )
+            .order_by(db_models.ShiftTemplate.id)
+        )
+        if template_id is not None:
+            query = query.where(db_models.ShiftTemplate.id == template_id)
+        if mission_id is not None:
+            query = query.where(db_models.ShiftTemplate.mission_id == mission_id)
+        if site_ids:
+            query = query.where(db_models.ShiftTemplate.site_id.in_(site_ids))
+        templates: list[_RecurringTemplate] = []
+        for template, timezone in self._session.execute(query).tuples():
+            try:
+                rule = RecurrenceRule.parse(template.recurrence_rule or "")
+            except ValueError as exc:
+                logger.warning(
+                    "Skipping shift template with invalid recurrence rule",
+                    extra={"template_id": template.id, "error": str(exc)},
+                )
+                continue
+            if timezone not in self._zones:
+                self._zones[timezone] = site_zone(timezone)
+            start = _ensure_timezone(template.start_time_utc)
+            templates.append(
+                _RecurringTemplate(
+                    template=template,
+                    rule=rule,
+                    dtstart=start.astimezone(self._zones[timezone]),
+                    duration=_ensure_timezone(template.end_time_utc) - start,
+                )
+            )
+        return templates
+
+    def _expand(
+        self, recurring: _RecurringTemplate, start: datetime, end: datetime
+    ) -> Iterator[ShiftInstance]:
+        for occurrence in recurring.rule.occurrences(
+            recurring.dtstart, since=start - recurring.duration
+        ):
+            occurrence_start = occurrence.astimezone(UTC)
+            if occurrence_start >= end:
+                return
+            if occurrence_start + recurring.duration > start:
+                yield self._virtual(recurring, occurrence_start)
+
+    @staticmethod
+    def _virtual(recurring: _RecurringTemplate, start: datetime) -> ShiftInstance:
+        template = recurring.template
+        return ShiftInstance(
+            id=-(template.id * VIRTUAL_ID_SPAN + int(start.timestamp()) // 60),
+            mission_id=template.mission_id,
+            template_id=template.id,
+            site_id=template.site_id,
+            role_id=template.role_id,
+            team_id=template.team_id,
+            start_utc=start,
+            end_utc=start + recurring.duration,
+            status="draft",
+            source="recurrence",
+            capacity=template.expected_headcount,
+            assigned_count=0,
+            occurrence_start_utc=start,
+            is_virtual=True,
+        )
+
+
 class ShiftInstanceService:
-    def __init__(self, session: Session, rule_service: RuleService) -> None:
+    def __init__(
+        self,
+        session: Session,
+        conflict_service: ConflictMaintenanceService,
+        references: ReferenceLoader | None = None,
+    ) -> None:
         self._session = session
-        self._rule_service = rule_service
+        self._conflict_service = conflict_service
+        self._references = references or ReferenceLoader(session)
+        self._recurring = RecurringShiftService(session)
 
     def list_instances(
         self,
@@ -202,26 +926,81 @@ class ShiftInstanceService:
         site_ids: list[int] | None = None,
         collaborator_ids: list[int] | None = None,
         statuses: list[str] | None = None,
+        understaffed: bool | None = None,
+        after: ShiftCursor | None = None,
+        limit: int | None = None,
     ) -> list[ShiftWithAssignments]:
-        query = select(db_models.ShiftInstance)
-        if mission_id is not None:
-            query = query.where(db_models.ShiftInstance.mission_id == mission_id)
-        if start is not None:
-            query = query.where(db_models.ShiftInstance.end_utc > start)
-        if end is not None:
-            query = query.where(db_models.ShiftInstance.start_utc < end)
-        if site_ids:
-            query = query.where(db_models.ShiftInstance.site_id.in_(site_ids))
-        if statuses:
-            query = query.where(db_models.ShiftInstance.status.in_(statuses))
-        if collaborator_ids:
-            query = (
-                query.join(db_models.Assignment)
-                .where(db_models.Assignment.collaborator_id.in_(collaborator_ids))
-                .distinct()
-            )
-        instances = self._session.scalars(query).all()
-        return [self._build_shift_view(instance) for instance in instances]
+        query = self._instances_query(
+            mission_id=mission_id,
+            start=start,
+            end=end,
+            site_ids=site_ids,
+            collaborator_ids=collaborator_ids,
+            statuses=statuses,
+            understaffed=understaffed,
+            after=after,
+            limit=limit,
+        )
+        views = self._build_shift_views(self._session.scalars(query).all())
+        virtual = self._virtual_views(
+            mission_id=mission_id,
+            start=start,
+            end=end,
+            site_ids=site_ids,
+            collaborator_ids=collaborator_ids,
+            statuses=statuses,
+            understaffed=understaffed,
+            after=after,
+        )
+        if virtual is None:
+            return views
+        return list(islice(heapq.merge(views, virtual, key=_shift_view_key), limit))
+
+    def stream_instances(
+        self,
+        *,
+        mission_id: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        site_ids: list[int] | None = None,
+        collaborator_ids: list[int] | None = None,
+        statuses: list[str] | None = None,
+        understaffed: bool | None = None,
+        after: ShiftCursor | None = None,
+        limit: int | None = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[ShiftWithAssignments]:
+        """Yield shift views in ``(start_utc, id)`` order, one batch at a time."""
+
+        query = self._instances_query(
+            mission_id=mission_id,
+            start=start,
+            end=end,
+            site_ids=site_ids,
+            collaborator_ids=collaborator_ids,
+            statuses=statuses,
+            understaffed=understaffed,
+            after=after,
+            limit=limit,
+        )
+        result = self._session.scalars(query.execution_options(yield_per=batch_size))
+        views = (
+            view for batch in result.partitions() for view in self._build_shift_views(batch)
+        )
+        virtual = self._virtual_views(
+            mission_id=mission_id,
+            start=start,
+            end=end,
+            site_ids=site_ids,
+            collaborator_ids=collaborator_ids,
+            statuses=statuses,
+            understaffed=understaffed,
+            after=after,
+        )
+        if virtual is None:
+            yield from views
+        else:
+            yield from islice(heapq.merge(views, virtual, key=_shift_view_key), limit)
 
     def create_instance(self, payload: ShiftInstanceCreate) -> ShiftWithAssignments:
         mission = self._require_mission(payload.mission_id)
@@ -229,26 +1008,37 @@ class ShiftInstanceService:
         self._require_role(payload.role_id)
         if mission.site_id != payload.site_id or mission.role_id != payload.role_id:
             raise ValidationError("Shift must align with mission site and role")
-        if payload.template_id is not None and self._session.get(
+        if payload.template_id is not None and self._references.get(
             db_models.ShiftTemplate, payload.template_id
         ) is None:
             raise NotFoundError("Shift template not found")
         instance = db_models.ShiftInstance(**payload.model_dump())
         self._session.add(instance)
+        self._session.flush()
+        refreshed = self._conflict_service.refresh(shift_ids=[instance.id])
         self._session.commit()
         self._session.refresh(instance)
-        conflicts = self._rule_service.evaluate_shift(_to_shift_instance(instance))
         logger.info("Shift instance created", extra={"shift_instance_id": instance.id})
         return ShiftWithAssignments(
             shift=_to_shift_instance(instance),
             assignments=[],
-            conflicts=conflicts,
+            conflicts=refreshed.shifts[instance.id],
         )
 
     def update_instance(
-        self, instance_id: int, payload: ShiftInstanceUpdate
+        self,
+        instance_id: int,
+        payload: ShiftInstanceUpdate,
+        *,
+        expected_version: int | None = None,
     ) -> ShiftWithAssignments:
-        instance = self._get_instance(instance_id)
+        """Update a shift, optionally only if it is still at ``expected_version``."""
+
+        instance = self._resolve(instance_id)
+        instance_id = instance.id
+        _check_version(
+            "Shift instance", instance.version, expected_version, _to_shift_instance(instance)
+        )
         updates = payload.model_dump(exclude_none=True)
         mission_id = updates.get("mission_id", instance.mission_id)
         site_id = updates.get("site_id", instance.site_id)
@@ -258,11 +1048,48 @@ class ShiftInstanceService:
         self._require_role(role_id)
         if mission.site_id != site_id or mission.role_id != role_id:
             raise ValidationError("Shift must align with mission site and role")
-        for field, value in updates.items():
-            setattr(instance, field, value)
-        self._session.commit()
+        windows = {_shift_window(instance)}
+        self._conflict_service.mark_board_days([instance_id])
+        with _version_guard(self._session, "Shift instance", lambda: self._current(instance_id)):
+            for field, value in updates.items():
+                setattr(instance, field, value)
+            start, end = _shift_window(instance)
+            windows.add((start, end))
+            bookings = self._session.execute(
+                select(db_models.Assignment.id, db_models.Assignment.collaborator_id).where(
+                    db_models.Assignment.shift_instance_id == instance_id
+                )
+            ).all()
+            guarded = (
+                []
+                if instance.status == "cancelled"
+                else [
+                    (collaborator_id, start, end, assignment_id)
+                    for assignment_id, collaborator_id in bookings
+                ]
+            )
+            with _double_booking_guard(self._session, guarded):
+                self._session.execute(
+                    update(db_models.Assignment)
+                    .where(db_models.Assignment.shift_instance_id == instance_id)
+                    .values(
+                        booking_start_utc=instance.start_utc,
+                        booking_end_utc=instance.end_utc,
+                        booking_active=instance.status != "cancelled",
+                    )
+                )
+            collaborator_ids = sorted({collaborator_id for _, collaborator_id in bookings})
+            workload_ledger.reset(self._session, collaborator_ids)
+            refreshed = self._conflict_service.refresh(
+                shift_ids=[instance_id],
+                neighbourhoods=[
+                    (collaborator_id, start, end)
+                    for collaborator_id in collaborator_ids
+                    for start, end in windows
+                ],
+            )
+            self._session.commit()
         self._session.refresh(instance)
-        conflicts = self._rule_service.evaluate_shift(_to_shift_instance(instance))
         assignments = self._session.scalars(
             select(db_models.Assignment).where(
                 db_models.Assignment.shift_instance_id == instance_id
@@ -271,68 +1098,237 @@ class ShiftInstanceService:
         return ShiftWithAssignments(
             shift=_to_shift_instance(instance),
             assignments=[_to_assignment(a) for a in assignments],
-            conflicts=conflicts,
+            conflicts=refreshed.shifts[instance_id],
         )
 
-    def delete_instance(self, instance_id: int) -> None:
-        instance = self._get_instance(instance_id)
-        self._session.query(db_models.Assignment).filter(
-            db_models.Assignment.shift_instance_id == instance_id
-        ).delete()
-        self._session.delete(instance)
+    def delete_instance(self, instance_id: int) -> ShiftRemoval:
+        """Delete a shift with its assignments; a recurring occurrence is kept as cancelled."""
+
+        instance = self._resolve(instance_id)
+        instance_id = instance.id
+        start, end = _shift_window(instance)
+        removed = [
+            _to_assignment(assignment)
+            for assignment in self._session.scalars(
+                select(db_models.Assignment)
+                .where(db_models.Assignment.shift_instance_id == instance_id)
+                .order_by(db_models.Assignment.id)
+            )
+        ]
+        collaborator_ids = sorted({assignment.collaborator_id for assignment in removed})
+        workload_ledger.reset(self._session, collaborator_ids)
+        with _version_guard(self._session, "Shift instance", lambda: self._current(instance_id)):
+            self._conflict_service.forget_shift(instance_id)
+            self._session.query(db_models.Assignment).filter(
+                db_models.Assignment.shift_instance_id == instance_id
+            ).delete()
+            recurring = instance.occurrence_start_utc is not None
+            if recurring:
+                instance.status = "cancelled"
+                instance.assigned_count = 0
+            else:
+                self._session.delete(instance)
+            self._conflict_service.refresh(
+                shift_ids=[instance_id] if recurring else [],
+                neighbourhoods=[
+                    (collaborator_id, start, end) for collaborator_id in collaborator_ids
+                ],
+            )
+            self._session.commit()
+        return ShiftRemoval(
+            cancelled=_to_shift_instance(instance) if recurring else None, assignments=removed
+        )
+
+    def materialise_occurrences(
+        self, payload: ShiftMaterialisationRequest
+    ) -> ShiftMaterialisation:
+        """Store the occurrences of a template, or of a mission's templates, in a window."""
+
+        if payload.end_utc - payload.start_utc > MAX_MATERIALISE_WINDOW:
+            raise ValidationError("Materialisation window cannot exceed 366 days")
+        if payload.mission_id is not None:
+            self._require_mission(payload.mission_id)
+        template_ids, shift_ids, skipped = self._recurring.store_window(
+            start=payload.start_utc,
+            end=payload.end_utc,
+            template_id=payload.template_id,
+            mission_id=payload.mission_id,
+        )
+        for offset in range(0, len(shift_ids), MATERIALISE_CHUNK_SIZE):
+            self._conflict_service.refresh(
+                shift_ids=shift_ids[offset : offset + MATERIALISE_CHUNK_SIZE]
+            )
         self._session.commit()
+        logger.info(
+            "Recurring shift occurrences stored",
+            extra={
+                "template_ids": template_ids,
+                "shift_count": len(shift_ids),
+                "skipped_count": skipped,
+            },
+        )
+        return ShiftMaterialisation(
+            template_ids=template_ids,
+            start_utc=payload.start_utc,
+            end_utc=payload.end_utc,
+            created=len(shift_ids),
+            skipped=skipped,
+            shift_ids=shift_ids,
+        )
 
     def get_instance_state(self, instance_id: int) -> ShiftInstance:
+        if instance_id < 0:
+            return self._recurring.state(instance_id)
         instance = self._get_instance(instance_id)
         return _to_shift_instance(instance)
 
+    def get_instance_states(self, instance_ids: Sequence[int]) -> list[ShiftInstance]:
+        """Stored shifts among ``instance_ids``, in id order."""
+
+        return [
+            _to_shift_instance(instance)
+            for instance in self._session.scalars(
+                select(db_models.ShiftInstance)
+                .where(db_models.ShiftInstance.id.in_(instance_ids))
+                .order_by(db_models.ShiftInstance.id)
+            )
+        ]
+
+    def _current(self, instance_id: int) -> ShiftInstance:
+        return _to_shift_instance(self._get_instance(instance_id))
+
+    def _resolve(self, instance_id: int) -> db_models.ShiftInstance:
+        if instance_id < 0:
+            return self._recurring.materialise(instance_id)
+        return self._get_instance(instance_id)
+
+    def _virtual_views(
+        self,
+        *,
+        mission_id: int | None,
+        start: datetime | None,
+        end: datetime | None,
+        site_ids: list[int] | None,
+        collaborator_ids: list[int] | None,
+        statuses: list[str] | None,
+        understaffed: bool | None,
+        after: ShiftCursor | None,
+    ) -> Iterator[ShiftWithAssignments] | None:
+        """Virtual occurrences matching a listing, or ``None`` when none can match."""
+
+        if start is None or end is None or collaborator_ids or understaffed is False:
+            return None
+        if statuses and "draft" not in statuses:
+            return None
+        return self._recurring.occurrences(
+            start=_ensure_timezone(start),
+            end=_ensure_timezone(end),
+            mission_id=mission_id,
+            site_ids=site_ids,
+            after=after,
+        )
+
     def _get_instance(self, instance_id: int) -> db_models.ShiftInstance:
         instance = self._session.get(db_models.ShiftInstance, instance_id)
         if instance is None:
             raise NotFoundError("Shift instance not found")
         return instance
 
-    def _build_shift_view(self, instance: db_models.ShiftInstance) -> ShiftWithAssignments:
-        assignments = self._session.scalars(
-            select(db_models.Assignment).where(
-                db_models.Assignment.shift_instance_id == instance.id
+    @staticmethod
+    def _instances_query(
+        *,
+        mission_id: int | None,
+        start: datetime | None,
+        end: datetime | None,
+        site_ids: list[int] | None,
+        collaborator_ids: list[int] | None,
+        statuses: list[str] | None,
+        understaffed: bool | None,
+        after: ShiftCursor | None,
+        limit: int | None,
+    ) -> Select[db_models.ShiftInstance]:
+        shift = db_models.ShiftInstance
+        query = (
+            select(shift)
+            .options(selectinload(shift.assignments))
+            .order_by(shift.start_utc, shift.id)
+        )
+        if mission_id is not None:
+            query = query.where(shift.mission_id == mission_id)
+        if start is not None:
+            query = query.where(shift.end_utc > start)
+        if end is not None:
+            query = query.where(shift.start_utc < end)
+        if site_ids:
+            query = query.where(shift.site_id.in_(site_ids))
+        if statuses:
+            query = query.where(shift.status.in_(statuses))
+        if understaffed is not None:
+            staffed = shift.assigned_count >= shift.capacity
+            query = query.where(~staffed if understaffed else staffed)
+        if collaborator_ids:
+            query = query.where(
+                shift.id.in_(
+                    select(db_models.Assignment.shift_instance_id).where(
+                        db_models.Assignment.collaborator_id.in_(collaborator_ids)
+                    )
+                )
             )
-        ).all()
-        shift = _to_shift_instance(instance)
-        conflicts = self._rule_service.evaluate_shift(shift)
-        for assignment in assignments:
-            conflicts.extend(
-                self._rule_service.evaluate_assignment(_to_assignment(assignment), shift=shift)
+        if after is not None:
+            query = query.where(
+                tuple_(shift.start_utc, shift.id) > tuple_(after.start_utc, after.id)
             )
-        return ShiftWithAssignments(
-            shift=shift,
-            assignments=[_to_assignment(a) for a in assignments],
-            conflicts=conflicts,
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def _build_shift_views(
+        self, instances: Sequence[db_models.ShiftInstance]
+    ) -> list[ShiftWithAssignments]:
+        """Assemble board views from shifts loaded by ``_instances_query``."""
+
+        conflicts = self._conflict_service.conflicts_for_shifts(
+            instance.id for instance in instances
         )
+        return [
+            ShiftWithAssignments(
+                shift=_to_shift_instance(instance),
+                assignments=[_to_assignment(a) for a in instance.assignments],
+                conflicts=conflicts[instance.id],
+            )
+            for instance in instances
+        ]
 
     def _require_mission(self, mission_id: int) -> db_models.Mission:
-        mission = self._session.get(db_models.Mission, mission_id)
+        mission = self._references.get(db_models.Mission, mission_id)
         if mission is None:
             raise NotFoundError("Mission not found")
         return mission
 
     def _require_site(self, site_id: int) -> db_models.Site:
-        site = self._session.get(db_models.Site, site_id)
+        site = self._references.get(db_models.Site, site_id)
         if site is None:
             raise NotFoundError("Site not found")
         return site
 
     def _require_role(self, role_id: int) -> db_models.Role:
-        role = self._session.get(db_models.Role, role_id)
+        role = self._references.get(db_models.Role, role_id)
         if role is None:
             raise NotFoundError("Role not found")
         return role
 
 
 class AssignmentService:
-    def __init__(self, session: Session, rule_service: RuleService) -> None:
+    def __init__(
+        self,
+        session: Session,
+        conflict_service: ConflictMaintenanceService,
+        references: ReferenceLoader | None = None,
+    ) -> None:
         self._session = session
-        self._rule_service = rule_service
+        self._conflict_service = conflict_service
+        self._references = references or ReferenceLoader(session)
+        self._recurring = RecurringShiftService(session)
 
     def list_assignments(self, *, instance_id: int | None = None) -> list[Assignment]:
         query = select(db_models.Assignment)
@@ -344,26 +1340,47 @@ class AssignmentService:
     def create_assignment(
         self, payload: AssignmentCreate
     ) -> tuple[Assignment, list[ConflictEntry]]:
-        shift = self._require_shift(payload.shift_instance_id)
+        if payload.shift_instance_id < 0:
+            shift = self._recurring.materialise(payload.shift_instance_id)
+            payload = payload.model_copy(update={"shift_instance_id": shift.id})
+        else:
+            shift = self._require_shift(payload.shift_instance_id)
         self._require_collaborator(payload.collaborator_id)
         if shift.status == "cancelled":
             raise ValidationError("Cannot assign to a cancelled shift")
         if payload.role_id != shift.role_id:
             raise ValidationError("Assignment role must match shift role")
         assignment = db_models.Assignment(**payload.model_dump())
-        self._session.add(assignment)
+        _sync_booking(assignment, shift)
+        start, end = _shift_window(shift)
+        with _double_booking_guard(
+            self._session, [(payload.collaborator_id, start, end, None)]
+        ):
+            self._session.add(assignment)
+            _adjust_assigned_counts(self._session, {shift.id: 1})
+            self._session.flush()
+        workload_ledger.record(self._session, assignment.collaborator_id, assignment.id, start, end)
+        refreshed = self._conflict_service.refresh(
+            shift_ids=[shift.id], neighbourhoods=[(assignment.collaborator_id, start, end)]
+        )
         self._session.commit()
         self._session.refresh(assignment)
-        conflicts = self._rule_service.evaluate_assignment(
-            _to_assignment(assignment), shift=_to_shift_instance(shift)
-        )
         logger.info("Assignment created", extra={"assignment_id": assignment.id})
-        return _to_assignment(assignment), conflicts
+        return _to_assignment(assignment), refreshed.assignments[assignment.id]
 
     def update_assignment(
-        self, assignment_id: int, payload: AssignmentUpdate
+        self,
+        assignment_id: int,
+        payload: AssignmentUpdate,
+        *,
+        expected_version: int | None = None,
     ) -> tuple[Assignment, list[ConflictEntry]]:
+        """Update an assignment, optionally only if it is still at ``expected_version``."""
+
         assignment = self._get_assignment(assignment_id)
+        _check_version(
+            "Assignment", assignment.version, expected_version, _to_assignment(assignment)
+        )
         updates = payload.model_dump(exclude_none=True)
         shift = self._require_shift(updates.get("shift_instance_id", assignment.shift_instance_id))
         self._require_collaborator(updates.get("collaborator_id", assignment.collaborator_id))
@@ -371,30 +1388,250 @@ class AssignmentService:
             raise ValidationError("Cannot assign to a cancelled shift")
         if updates.get("role_id", assignment.role_id) != shift.role_id:
             raise ValidationError("Assignment role must match shift role")
-        for field, value in updates.items():
-            setattr(assignment, field, value)
-        self._session.commit()
+        collaborator_ids = {assignment.collaborator_id}
+        start, end = _shift_window(shift)
+        collaborator_id = updates.get("collaborator_id", assignment.collaborator_id)
+        with _version_guard(self._session, "Assignment", lambda: self._current(assignment_id)):
+            with _double_booking_guard(
+                self._session, [(collaborator_id, start, end, assignment_id)]
+            ):
+                workload_ledger.discard(self._session, assignment.collaborator_id, assignment_id)
+                for field, value in updates.items():
+                    setattr(assignment, field, value)
+                _sync_booking(assignment, shift)
+                self._session.flush()
+            collaborator_ids.add(assignment.collaborator_id)
+            workload_ledger.record(
+                self._session, assignment.collaborator_id, assignment_id, start, end
+            )
+            refreshed = self._conflict_service.refresh(
+                shift_ids=[shift.id],
+                neighbourhoods=[
+                    (collaborator_id, start, end) for collaborator_id in collaborator_ids
+                ],
+            )
+            self._session.commit()
         self._session.refresh(assignment)
-        conflicts = self._rule_service.evaluate_assignment(
-            _to_assignment(assignment), shift=_to_shift_instance(shift)
-        )
-        return _to_assignment(assignment), conflicts
+        return _to_assignment(assignment), refreshed.assignments[assignment_id]
 
     def delete_assignment(self, assignment_id: int) -> None:
         assignment = self._get_assignment(assignment_id)
-        self._session.delete(assignment)
-        self._session.commit()
+        shift = self._require_shift(assignment.shift_instance_id)
+        start, end = _shift_window(shift)
+        collaborator_id = assignment.collaborator_id
+        workload_ledger.discard(self._session, collaborator_id, assignment_id)
+        with _version_guard(self._session, "Assignment", lambda: self._current(assignment_id)):
+            self._conflict_service.forget_assignment(assignment_id)
+            self._session.delete(assignment)
+            _adjust_assigned_counts(self._session, {shift.id: -1})
+            self._conflict_service.refresh(
+                shift_ids=[shift.id], neighbourhoods=[(collaborator_id, start, end)]
+            )
+            self._session.commit()
 
     def get_assignment_state(self, assignment_id: int) -> Assignment:
         assignment = self._get_assignment(assignment_id)
         return _to_assignment(assignment)
 
-    def bulk_upsert(self, payloads: Iterable[AssignmentCreate]) -> list[Assignment]:
-        created: list[Assignment] = []
+    def existing_states(
+        self, payloads: Iterable[AssignmentCreate]
+    ) -> dict[tuple[int, int], Assignment]:
+        """Current assignments matching ``(shift_instance_id, collaborator_id)`` of payloads."""
+
+        keys = {
+            (payload.shift_instance_id, payload.collaborator_id)
+            for payload in payloads
+            if payload.shift_instance_id > 0
+        }
+        return {
+            (assignment.shift_instance_id, assignment.collaborator_id): _to_assignment(assignment)
+            for assignment in self._existing(keys).values()
+        }
+
+    def bulk_upsert(
+        self, payloads: Iterable[AssignmentCreate], *, exclusive: bool = False
+    ) -> AssignmentBatchResult:
+        """Create or update many assignments in one transaction."""
+
+        payloads = list(payloads)
+        collaborator_ids = set(
+            self._references.get_many(
+                db_models.Collaborator, {payload.collaborator_id for payload in payloads}
+            )
+        )
+        # Virtual occurrences are stored only for items that may still succeed.
+        stored: dict[int, int] = {}
         for payload in payloads:
-            assignment, _ = self.create_assignment(payload)
-            created.append(assignment)
-        return created
+            shift_id = payload.shift_instance_id
+            if (
+                shift_id < 0
+                and shift_id not in stored
+                and payload.collaborator_id in collaborator_ids
+            ):
+                try:
+                    stored[shift_id] = self._recurring.materialise(shift_id).id
+                except NotFoundError:
+                    continue
+        shift_ids = [
+            stored.get(payload.shift_instance_id, payload.shift_instance_id)
+            for payload in payloads
+        ]
+        shifts = self._references.get_many(db_models.ShiftInstance, shift_ids)
+        if exclusive and shifts:
+            self._session.scalars(
+                select(db_models.ShiftInstance)
+                .where(db_models.ShiftInstance.id.in_(sorted(shifts)))
+                .order_by(db_models.ShiftInstance.id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            ).all()
+        assignments = self._existing(
+            {
+                (shift_id, payload.collaborator_id)
+                for shift_id, payload in zip(shift_ids, payloads, strict=True)
+                if shift_id in shifts
+            }
+        )
+        booked = self._booked_windows(
+            [shifts[shift_id] for shift_id in shift_ids if shift_id in shifts],
+            collaborator_ids,
+            always=exclusive,
+        )
+
+        result = AssignmentBatchResult()
+        # Accepted items as ``(index, (shift_instance_id, collaborator_id), created)``.
+        accepted: list[tuple[int, tuple[int, int], bool]] = []
+        new_rows: dict[tuple[int, int], dict[str, Any]] = {}
+        added: Counter[int] = Counter()
+        for index, (shift_id, payload) in enumerate(zip(shift_ids, payloads, strict=True)):
+            shift = shifts.get(shift_id)
+            error: str | None = None
+            if shift is None:
+                error = "Shift not found"
+            elif payload.collaborator_id not in collaborator_ids:
+                error = "Collaborator not found"
+            elif shift.status == "cancelled":
+                error = "Cannot assign to a cancelled shift"
+            elif payload.role_id != shift.role_id:
+                error = "Assignment role must match shift role"
+            elif exclusive and (shift.id, payload.collaborator_id) in assignments:
+                error = "Collaborator is already assigned to this shift"
+            elif exclusive and shift.assigned_count + added[shift.id] >= shift.capacity:
+                error = "Shift is already full"
+            if error is not None or shift is None:
+                result.items.append(
+                    AssignmentBatchItem(index=index, status="rejected", error=error)
+                )
+                continue
+            key = (shift.id, payload.collaborator_id)
+            values = payload.model_dump(exclude={"shift_instance_id"})
+            if key in assignments:
+                for field, value in values.items():
+                    setattr(assignments[key], field, value)
+                accepted.append((index, key, False))
+            elif key in new_rows:
+                new_rows[key].update(values)
+                accepted.append((index, key, False))
+            else:
+                start, end = _shift_window(shift)
+                windows = booked.get(payload.collaborator_id)
+                if windows is not None:
+                    if any(_overlaps(start, end, *window) for window in windows):
+                        result.items.append(
+                            AssignmentBatchItem(
+                                index=index,
+                                status="rejected",
+                                error="Collaborator is already booked during this shift",
+                            )
+                        )
+                        continue
+                    windows.append((start, end))
+                new_rows[key] = {
+                    "shift_instance_id": shift.id,
+                    **values,
+                    "booking_start_utc": start,
+                    "booking_end_utc": end,
+                    "booking_active": True,
+                }
+                added[shift.id] += 1
+                accepted.append((index, key, True))
+
+        # Core INSERT ... RETURNING keeps the insert batched on every dialect;
+        # rows are matched back to items by their key, not by position.
+        ids = {key: assignment.id for key, assignment in assignments.items()}
+        with _double_booking_guard(self._session, []):
+            if new_rows:
+                for assignment_id, shift_id, collaborator_id in self._session.execute(
+                    insert(db_models.Assignment).returning(
+                        db_models.Assignment.id,
+                        db_models.Assignment.shift_instance_id,
+                        db_models.Assignment.collaborator_id,
+                    ),
+                    list(new_rows.values()),
+                ).tuples():
+                    ids[(shift_id, collaborator_id)] = assignment_id
+            _adjust_assigned_counts(self._session, added)
+            self._session.flush()
+        spans: dict[int, tuple[datetime, datetime]] = {}
+        for key, row in new_rows.items():
+            workload_ledger.record(
+                self._session,
+                row["collaborator_id"],
+                ids[key],
+                row["booking_start_utc"],
+                row["booking_end_utc"],
+            )
+        for _, (shift_id, collaborator_id), _ in accepted:
+            start, end = _shift_window(shifts[shift_id])
+            low, high = spans.get(collaborator_id, (start, end))
+            spans[collaborator_id] = (min(low, start), max(high, end))
+        touched = sorted({shift_id for _, (shift_id, _), _ in accepted})
+        neighbourhoods = [(collaborator_id, *span) for collaborator_id, span in spans.items()]
+        conflicts: dict[int, list[ConflictEntry]] = {}
+        chunk = ASSIGNMENT_BATCH_CHUNK_SIZE
+        for offset in range(0, max(len(touched), len(neighbourhoods)), chunk):
+            refreshed = self._conflict_service.refresh(
+                shift_ids=touched[offset : offset + chunk],
+                neighbourhoods=neighbourhoods[offset : offset + chunk],
+            )
+            conflicts.update(refreshed.assignments)
+        self._session.commit()
+
+        stored_ids = sorted(set(ids.values()))
+        rows = {
+            row.id: _to_assignment(row)
+            for offset in range(0, len(stored_ids), chunk)
+            for row in self._session.scalars(
+                select(db_models.Assignment).where(
+                    db_models.Assignment.id.in_(stored_ids[offset : offset + chunk])
+                )
+            )
+        }
+        for index, key, created in accepted:
+            result.items.append(
+                AssignmentBatchItem(
+                    index=index,
+                    status="created" if created else "updated",
+                    assignment=rows[ids[key]],
+                    conflicts=conflicts.get(ids[key], []),
+                )
+            )
+        result.items.sort(key=lambda item: item.index)
+        counts = Counter(item.status for item in result.items)
+        result.created, result.updated, result.rejected = (
+            counts["created"],
+            counts["updated"],
+            counts["rejected"],
+        )
+        logger.info(
+            "Assignments upserted in bulk",
+            extra={
+                "created": result.created,
+                "updated": result.updated,
+                "rejected": result.rejected,
+            },
+        )
+        return result
 
     def lock(self, assignment_id: int, *, locked: bool) -> Assignment:
         assignment = self._get_assignment(assignment_id)
@@ -404,17 +1641,74 @@ class AssignmentService:
         return _to_assignment(assignment)
 
     def _require_shift(self, shift_id: int) -> db_models.ShiftInstance:
-        shift = self._session.get(db_models.ShiftInstance, shift_id)
+        shift = self._references.get(db_models.ShiftInstance, shift_id)
         if shift is None:
             raise NotFoundError("Shift not found")
         return shift
 
+    def _existing(
+        self, keys: set[tuple[int, int]]
+    ) -> dict[tuple[int, int], db_models.Assignment]:
+        if not keys:
+            return {}
+        assignments: dict[tuple[int, int], db_models.Assignment] = {}
+        for assignment in self._session.scalars(
+            select(db_models.Assignment)
+            .where(
+                tuple_(
+                    db_models.Assignment.shift_instance_id, db_models.Assignment.collaborator_id
+                ).in_(keys)
+            )
+            .order_by(db_models.Assignment.id)
+        ):
+            assignments.setdefault(
+                (assignment.shift_instance_id, assignment.collaborator_id), assignment
+            )
+        return assignments
+
+    def _booked_windows(
+        self,
+        shifts: Sequence[db_models.ShiftInstance],
+        collaborator_ids: Iterable[int],
+        *,
+        always: bool = False,
+    ) -> dict[int, list[tuple[datetime, datetime]]]:
+        """Active bookings of ``collaborator_ids`` around ``shifts``, when they must not overlap."""
+
+        if not shifts or not (always or _double_booking_enforced(self._session)):
+            return {}
+        windows: dict[int, list[tuple[datetime, datetime]]] = {
+            collaborator_id: [] for collaborator_id in collaborator_ids
+        }
+        for collaborator_id, start, end in self._session.execute(
+            select(
+                db_models.Assignment.collaborator_id,
+                db_models.Assignment.booking_start_utc,
+                db_models.Assignment.booking_end_utc,
+            ).where(
+                db_models.Assignment.collaborator_id.in_(list(windows)),
+                db_models.Assignment.booking_active.is_(True),
+                db_models.Assignment.booking_start_utc
+                < max(_ensure_timezone(shift.end_utc) for shift in shifts),
+                db_models.Assignment.booking_end_utc
+                > min(_ensure_timezone(shift.start_utc) for shift in shifts),
+            )
+        ).tuples():
+            if start is not None and end is not None:
+                windows[collaborator_id].append(
+                    (_ensure_timezone(start), _ensure_timezone(end))
+                )
+        return windows
+
     def _require_collaborator(self, collaborator_id: int) -> db_models.Collaborator:
-        collaborator = self._session.get(db_models.Collaborator, collaborator_id)
+        collaborator = self._references.get(db_models.Collaborator, collaborator_id)
         if collaborator is None:
             raise NotFoundError("Collaborator not found")
         return collaborator
 
+    def _current(self, assignment_id: int) -> Assignment:
+        return _to_assignment(self._get_assignment(assignment_id))
+
     def _get_assignment(self, assignment_id: int) -> db_models.Assignment:
         assignment = self._session.get(db_models.Assignment, assignment_id)
         if assignment is None:
@@ -423,12 +1717,16 @@ class AssignmentService:
 
 
 class AvailabilityService:
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: Session, conflict_service: ConflictMaintenanceService) -> None:
         self._session = session
+        self._conflict_service = conflict_service
 
     def record_availability(self, payload: UserAvailabilityCreate) -> UserAvailability:
         availability = db_models.UserAvailability(**payload.model_dump())
         self._session.add(availability)
+        self._conflict_service.refresh(
+            neighbourhoods=[(payload.collaborator_id, payload.start_utc, payload.end_utc)]
+        )
         self._session.commit()
         self._session.refresh(availability)
         return _to_availability(availability)
@@ -454,11 +1752,73 @@ class AvailabilityService:
         )
 
 
+class BlackoutService:
+    def __init__(
+        self,
+        session: Session,
+        conflict_service: ConflictMaintenanceService,
+        references: ReferenceLoader | None = None,
+    ) -> None:
+        self._session = session
+        self._conflict_service = conflict_service
+        self._references = references or ReferenceLoader(session)
+
+    def list_blackouts(self, *, site_id: int | None = None) -> list[Blackout]:
+        query = select(db_models.Blackout).order_by(db_models.Blackout.start_utc)
+        if site_id is not None:
+            query = query.where(db_models.Blackout.site_id == site_id)
+        return [_to_blackout(blackout) for blackout in self._session.scalars(query)]
+
+    def create_blackout(self, payload: BlackoutCreate) -> Blackout:
+        if self._references.get(db_models.Site, payload.site_id) is None:
+            raise NotFoundError("Site not found")
+        blackout = db_models.Blackout(**payload.model_dump())
+        self._session.add(blackout)
+        self._session.flush()
+        self._refresh_site_window(payload.site_id, payload.start_utc, payload.end_utc)
+        self._session.commit()
+        self._session.refresh(blackout)
+        return _to_blackout(blackout)
+
+    def delete_blackout(self, blackout_id: int) -> None:
+        blackout = self._session.get(db_models.Blackout, blackout_id)
+        if blackout is None:
+            raise NotFoundError("Blackout not found")
+        site_id, start, end = blackout.site_id, blackout.start_utc, blackout.end_utc
+        self._session.delete(blackout)
+        self._session.flush()
+        self._refresh_site_window(site_id, start, end)
+        self._session.commit()
+
+    def _refresh_site_window(self, site_id: int, start: datetime, end: datetime) -> None:
+        shift_ids = self._session.scalars(
+            select(db_models.ShiftInstance.id).where(
+                db_models.ShiftInstance.site_id == site_id,
+                db_models.ShiftInstance.start_utc < end,
+                db_models.ShiftInstance.end_utc > start,
+            )
+        ).all()
+        if shift_ids:
+            self._conflict_service.refresh(shift_ids=shift_ids)
+
+
 class RuleService:
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: Session, references: ReferenceLoader | None = None) -> None:
         self._session = session
-        if not self._session.scalar(select(db_models.ConflictRule.id)):
-            self._seed_rules()
+        self._references = references or ReferenceLoader(session)
+
+    def rules_for_organization(self, organization_id: int) -> CompiledRules:
+        return rule_catalog.get(self._session, organization_id)
+
+    def neighbourhood_margins(self, collaborator_ids: Iterable[int]) -> dict[int, timedelta]:
+        """Return how far each collaborator's rules look around a booking."""
+
+        return {
+            collaborator_id: self.rules_for_organization(organization_id).neighbourhood
+            for collaborator_id, organization_id in self._collaborator_organizations(
+                collaborator_ids
+            ).items()
+        }
 
     def list_hr_rules(self, organization_id: int) -> list[HrRule]:
         rules = self._session.scalars(
@@ -516,138 +1876,207 @@ class RuleService:
                     details={"status": instance.status},
                 )
             )
+        if instance.start_utc < instance.end_utc:
+            conflicts.extend(
+                _blackout_conflicts(
+                    instance.start_utc,
+                    instance.end_utc,
+                    blackout_catalog.get(self._session, instance.site_id),
+                )
+            )
         return conflicts
 
+    def evaluate_shifts(self, shifts: Sequence[ShiftInstance]) -> dict[int, list[ConflictEntry]]:
+        blackout_catalog.get_many(self._session, {shift.site_id for shift in shifts})
+        return {shift.id: self.evaluate_shift(shift) for shift in shifts}
+
+    def blackout_conflicts(
+        self, instances: Sequence[ShiftInstance | ShiftInstanceCreate]
+    ) -> list[list[ConflictEntry]]:
+        """Check candidate shifts against site blackouts with at most one query."""
+
+        blackouts = blackout_catalog.get_many(
+            self._session, {instance.site_id for instance in instances}
+        )
+        return [
+            _blackout_conflicts(instance.start_utc, instance.end_utc, blackouts[instance.site_id])
+            for instance in instances
+        ]
+
+    def prime_assignments(self, assignments: Iterable[Assignment | AssignmentCreate]) -> None:
+        """Announce shifts and collaborators of ``assignments`` so they load in one go."""
+
+        assignments = list(assignments)
+        self._references.prime(
+            db_models.ShiftInstance, {assignment.shift_instance_id for assignment in assignments}
+        )
+        self._references.prime(
+            db_models.Collaborator, {assignment.collaborator_id for assignment in assignments}
+        )
+
     def evaluate_assignment(
         self, assignment: Assignment | AssignmentCreate, shift: ShiftInstance | None = None
     ) -> list[ConflictEntry]:
-        conflicts: list[ConflictEntry] = []
-        db_shift = self._session.get(db_models.ShiftInstance, assignment.shift_instance_id)
-        shift_instance = shift or (_to_shift_instance(db_shift) if db_shift else None)
+        shift_instance = shift
         if shift_instance is None:
-            return conflicts
-        collaborator = self._session.get(db_models.Collaborator, assignment.collaborator_id)
+            db_shift = self._references.get(
+                db_models.ShiftInstance, assignment.shift_instance_id
+            )
+            if db_shift is None:
+                return []
+            shift_instance = _to_shift_instance(db_shift)
         assignment_id = getattr(assignment, "id", None)
-        for other in self._session.scalars(select(db_models.Assignment)).all():
-            if getattr(other, "id", None) == getattr(assignment, "id", None):
-                continue
-            if other.collaborator_id != assignment.collaborator_id:
-                continue
-            other_shift = self._session.get(db_models.ShiftInstance, other.shift_instance_id)
-            if other_shift is None or other_shift.status == "cancelled":
-                continue
-            if _overlaps(
-                shift_instance.start_utc,
-                shift_instance.end_utc,
-                _ensure_timezone(other_shift.start_utc),
-                _ensure_timezone(other_shift.end_utc),
-            ):
-                conflicts.append(
-                    ConflictEntry(
-                        type="hard",
-                        rule="double_booking",
-                        details={"other_shift_id": other_shift.id},
-                    )
-                )
-            other_start = _ensure_timezone(other_shift.start_utc)
-            other_end = _ensure_timezone(other_shift.end_utc)
-            if shift_instance.start_utc >= other_end:
-                rest_gap = shift_instance.start_utc - other_end
-            else:
-                rest_gap = other_start - shift_instance.end_utc
-            if rest_gap < timedelta(hours=1):
-                conflicts.append(
-                    ConflictEntry(
-                        type="hard",
-                        rule="min_rest",
-                        details={"minutes_gap": int(rest_gap.total_seconds() // 60)},
-                    )
-                )
-        availabilities = self._session.scalars(
-            select(db_models.UserAvailability).where(
-                db_models.UserAvailability.collaborator_id == assignment.collaborator_id
+        context = self._load_context(
+            [assignment.collaborator_id],
+            site_ids=[shift_instance.site_id],
+            window_start=shift_instance.start_utc,
+            window_end=shift_instance.end_utc,
+            exclude_assignment_id=assignment_id,
+        )
+        if assignment_id is None:
+            shift_instance = shift_instance.model_copy(
+                update={"assigned_count": shift_instance.assigned_count + 1}
             )
-        ).all()
-        for availability in availabilities:
-            if _overlaps(
-                shift_instance.start_utc,
-                shift_instance.end_utc,
-                availability.start_utc,
-                availability.end_utc,
-            ):
-                if not availability.is_available:
-                    conflicts.append(
-                        ConflictEntry(
-                            type="hard",
-                            rule="leave",
-                            details={"reason": availability.reason},
-                        )
-                    )
-                else:
-                    conflicts.append(
-                        ConflictEntry(
-                            type="soft",
-                            rule="availability_partial",
-                            details={"reason": availability.reason},
-                        )
-                    )
-        if collaborator and collaborator.primary_role_id != assignment.role_id:
-            conflicts.append(
-                ConflictEntry(
-                    type="hard",
-                    rule="missing_skill",
-                    details={"expected_role_id": collaborator.primary_role_id},
-                )
+        return _assignment_conflicts(assignment, shift_instance, context)
+
+    def evaluate_assignments(
+        self,
+        items: Sequence[tuple[Assignment, ShiftInstance]],
+    ) -> list[list[ConflictEntry]]:
+        """Evaluate persisted assignments against their shifts in one pass."""
+
+        if not items:
+            return []
+        context = self._load_context(
+            {assignment.collaborator_id for assignment, _ in items},
+            site_ids={shift.site_id for _, shift in items},
+            window_start=min(shift.start_utc for _, shift in items),
+            window_end=max(shift.end_utc for _, shift in items),
+        )
+        return [_assignment_conflicts(assignment, shift, context) for assignment, shift in items]
+
+    def _load_context(
+        self,
+        collaborator_ids: Iterable[int],
+        *,
+        site_ids: Iterable[int],
+        window_start: datetime,
+        window_end: datetime,
+        exclude_assignment_id: int | None = None,
+    ) -> _ConflictContext:
+        collaborator_ids = list(collaborator_ids)
+        blackouts = blackout_catalog.get_many(self._session, site_ids)
+        primary_roles: dict[int, int | None] = {}
+        rules: dict[int, CompiledRules] = {}
+        for collaborator_id, collaborator in self._references.get_many(
+            db_models.Collaborator, collaborator_ids
+        ).items():
+            primary_roles[collaborator_id] = collaborator.primary_role_id
+            rules[collaborator_id] = self.rules_for_organization(collaborator.organization_id)
+        default_rules = CompiledRules(organization_id=0, version="default")
+        workloads = workload_ledger.get_many(
+            self._session,
+            [
+                collaborator_id
+                for collaborator_id, rule_set in rules.items()
+                if rule_set.has_workload_limits
+            ],
+        )
+        margin = max(
+            (rule_set.min_rest for rule_set in rules.values()), default=DEFAULT_MIN_REST
+        )
+        if not collaborator_ids:
+            return _ConflictContext(
+                bookings={},
+                availabilities={},
+                primary_roles=primary_roles,
+                rules=rules,
+                default_rules=default_rules,
+                blackouts=blackouts,
+                workloads=workloads,
+            )
+
+        booking_query = (
+            select(
+                db_models.Assignment.collaborator_id,
+                db_models.Assignment.id,
+                db_models.ShiftInstance.id,
+                db_models.ShiftInstance.start_utc,
+                db_models.ShiftInstance.end_utc,
+            )
+            .join(
+                db_models.ShiftInstance,
+                db_models.Assignment.shift_instance_id == db_models.ShiftInstance.id,
+            )
+            .where(
+                db_models.Assignment.collaborator_id.in_(collaborator_ids),
+                db_models.ShiftInstance.status != "cancelled",
+                db_models.ShiftInstance.start_utc < window_end + margin,
+                db_models.ShiftInstance.end_utc > window_start - margin,
             )
-        assignment_count = (
-            self._session.query(db_models.Assignment)
-            .filter(db_models.Assignment.shift_instance_id == shift_instance.id)
-            .count()
         )
-        created_count = int(assignment_count)
-        if assignment_id is None or not self._session.get(db_models.Assignment, assignment_id):
-            created_count += 1
-        if created_count > shift_instance.capacity:
-            conflicts.append(
-                ConflictEntry(
-                    type="hard",
-                    rule="capacity_exceeded",
-                    details={"capacity": shift_instance.capacity, "attempted": created_count},
+        if exclude_assignment_id is not None:
+            booking_query = booking_query.where(db_models.Assignment.id != exclude_assignment_id)
+        bookings: dict[int, list[Interval[_Booking]]] = defaultdict(list)
+        for collaborator_id, booking_id, shift_id, start, end in self._session.execute(
+            booking_query
+        ):
+            bookings[collaborator_id].append(
+                Interval(
+                    start=_ensure_timezone(start),
+                    end=_ensure_timezone(end),
+                    payload=_Booking(assignment_id=booking_id, shift_instance_id=shift_id),
                 )
             )
-        elif created_count == shift_instance.capacity:
-            conflicts.append(
-                ConflictEntry(
-                    type="soft",
-                    rule="capacity_full",
-                    details={"capacity": shift_instance.capacity},
+
+        availabilities: dict[int, list[Interval[_AvailabilityWindow]]] = defaultdict(list)
+        for availability in self._session.scalars(
+            select(db_models.UserAvailability).where(
+                db_models.UserAvailability.collaborator_id.in_(collaborator_ids),
+                db_models.UserAvailability.start_utc < window_end,
+                db_models.UserAvailability.end_utc > window_start,
+            )
+        ):
+            availabilities[availability.collaborator_id].append(
+                Interval(
+                    start=_ensure_timezone(availability.start_utc),
+                    end=_ensure_timezone(availability.end_utc),
+                    payload=_AvailabilityWindow(
+                        is_available=bool(availability.is_available), reason=availability.reason
+                    ),
                 )
             )
-        return conflicts
 
-    def _seed_rules(self) -> None:
-        org_id = 1
-        hr_rule = db_models.HrRule(
-            organization_id=org_id,
-            code="rest_minimum",
-            severity="hard",
-            description="Minimum rest between shifts",
-            config={"hours": 1},
-        )
-        conflict_rule = db_models.ConflictRule(
-            organization_id=org_id,
-            code="double_booking",
-            severity="error",
-            description="Collaborator cannot be assigned to overlapping shifts",
-            config={"enforced": True},
-        )
-        self._session.add_all([hr_rule, conflict_rule])
-        self._session.commit()
+        return _ConflictContext(
+            bookings={key: IntervalIndex(value) for key, value in bookings.items()},
+            availabilities={key: IntervalIndex(value) for key, value in availabilities.items()},
+            primary_roles=primary_roles,
+            rules=rules,
+            default_rules=default_rules,
+            blackouts=blackouts,
+            workloads=workloads,
+        )
+
+    def _collaborator_organizations(self, collaborator_ids: Iterable[int]) -> dict[int, int]:
+        return {
+            collaborator_id: collaborator.organization_id
+            for collaborator_id, collaborator in self._references.get_many(
+                db_models.Collaborator, collaborator_ids
+            ).items()
+        }
+
+
+class PlanningChangeRecord(NamedTuple):
+    entity_id: int
+    action: str
+    before: dict[str, Any] | None
+    after: dict[str, Any] | None
 
 
 class AuditService:
     def __init__(self, session: Session) -> None:
         self._session = session
+        self._versions = PlanningVersionService(session)
 
     def log_change(
         self,
@@ -666,6 +2095,10 @@ class AuditService:
             "after": after,
             "payload": payload or {},
         }
+        # Bumping first takes the organization's version row lock before the
+        # entry is inserted, so change ids are handed out in commit order and
+        # ``changes_since`` readers never skip a late commit.
+        self._versions.bump([organization_id])
         entry = db_models.PlanningChange(
             organization_id=organization_id,
             actor_user_id=actor_user_id,
@@ -681,6 +2114,42 @@ class AuditService:
             extra={"entity_type": entity_type, "entity_id": entity_id},
         )
 
+    def log_changes(
+        self,
+        *,
+        organization_id: int,
+        actor_user_id: int | None,
+        entity_type: str,
+        changes: Sequence[PlanningChangeRecord],
+        payload: dict[str, Any] | None = None,
+    ) -> None:
+        """Log many changes of one entity type with one version bump and one insert."""
+
+        if not changes:
+            return
+        self._versions.bump([organization_id])
+        self._session.execute(
+            insert(db_models.PlanningChange),
+            [
+                {
+                    "organization_id": organization_id,
+                    "actor_user_id": actor_user_id,
+                    "entity_type": entity_type,
+                    "entity_id": change.entity_id,
+                    "action": change.action,
+                    "payload": jsonable_encoder(
+                        {"before": change.before, "after": change.after, "payload": payload or {}}
+                    ),
+                }
+                for change in changes
+            ],
+        )
+        self._session.commit()
+        logger.info(
+            "Planning changes logged",
+            extra={"entity_type": entity_type, "change_count": len(changes)},
+        )
+
     def list_changes(
         self,
         *,
@@ -712,6 +2181,54 @@ class AuditService:
             for change in changes
         ]
 
+    def changes_since(
+        self,
+        organization_id: int,
+        *,
+        since: int = 0,
+        limit: int = CHANGE_FEED_BATCH_SIZE,
+    ) -> PlanningChangeFeed:
+        """Return the entities changed after change ``since``, latest state only."""
+
+        rows = self._session.execute(
+            select(
+                db_models.PlanningChange.id,
+                db_models.PlanningChange.entity_type,
+                db_models.PlanningChange.entity_id,
+                db_models.PlanningChange.payload["after"],
+            )
+            .where(
+                db_models.PlanningChange.organization_id == organization_id,
+                db_models.PlanningChange.id > since,
+            )
+            .order_by(db_models.PlanningChange.id)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        latest: dict[tuple[str, int], tuple[int, Any]] = {}
+        for change_id, entity_type, entity_id, after in rows:
+            latest.pop((entity_type, entity_id), None)
+            latest[(entity_type, entity_id)] = (change_id, after)
+        feed = PlanningChangeFeed(cursor=rows[-1].id if rows else since, has_more=has_more)
+        for (entity_type, entity_id), (change_id, after) in latest.items():
+            if after is None:
+                feed.tombstones.append(
+                    PlanningTombstone(
+                        entity_type=entity_type, entity_id=entity_id, change_id=change_id
+                    )
+                )
+            else:
+                feed.upserts.append(
+                    PlanningUpsert(
+                        entity_type=entity_type,
+                        entity_id=entity_id,
+                        change_id=change_id,
+                        data=after,
+                    )
+                )
+        return feed
+
 
 class PublicationService:
     def __init__(self, session: Session, audit_service: AuditService) -> None:
@@ -769,65 +2286,3 @@ class PublicationService:
             )
             for event in events
         ]
-
-
-class AutoAssignJobService:
-    _job_store: dict[str, dict[str, Any]] = {}
-
-    def __init__(
-        self, session: Session, assignment_service: AssignmentService
-    ) -> None:
-        self._session = session
-        self._assignment_service = assignment_service
-
-    def start_job(self, *, shift_ids: list[int] | None = None) -> dict[str, Any]:
-        key_source = ",".join(str(value) for value in sorted(shift_ids or [])) or "all"
-        job_hash = hashlib.md5(key_source.encode(), usedforsecurity=False).hexdigest()[:10]
-        job_id = f"job-{job_hash}"
-        if job_id in AutoAssignJobService._job_store:
-            return AutoAssignJobService._job_store[job_id]
-        created_assignments: list[dict[str, Any]] = []
-        targets = (
-            self._session.scalars(
-                select(db_models.ShiftInstance).where(db_models.ShiftInstance.id.in_(shift_ids))
-            ).all()
-            if shift_ids
-            else self._session.scalars(select(db_models.ShiftInstance)).all()
-        )
-        for shift in targets:
-            if self._session.scalar(
-                select(db_models.Assignment.id).where(
-                    db_models.Assignment.shift_instance_id == shift.id
-                )
-            ):
-                continue
-            collaborator_id = self._session.scalar(select(db_models.Collaborator.id))
-            if collaborator_id is None:
-                continue
-            assignment_payload = AssignmentCreate(
-                shift_instance_id=shift.id,
-                collaborator_id=collaborator_id,
-                role_id=shift.role_id,
-                status="proposed",
-                source="auto-assign-v1",
-            )
-            assignment, conflicts = self._assignment_service.create_assignment(assignment_payload)
-            created_assignments.append({"assignment": assignment, "conflicts": conflicts})
-        job_payload: dict[str, Any] = {
-            "job_id": job_id,
-            "status": "completed",
-            "started_at": _timestamp(),
-            "completed_at": _timestamp(),
-            "assignments_created": len(created_assignments),
-            "conflicts": [
-                conflict for item in created_assignments for conflict in item["conflicts"]
-            ],
-        }
-        AutoAssignJobService._job_store[job_id] = job_payload
-        return job_payload
-
-    def get_status(self, job_id: str) -> dict[str, Any]:
-        job = AutoAssignJobService._job_store.get(job_id)
-        if job is None:
-            raise NotFoundError("Job not found")
-        return job
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+IntArray = npt.NDArray[np.int64]
+FloatArray = npt.NDArray[np.float64]
+
+
+@dataclass(frozen=True, slots=True)
+class BookingArrays:
+    """Column-oriented assignments: one row per assignment, times in epoch seconds."""
+
+    assignment_ids: IntArray
+    shift_ids: IntArray
+    collaborator_ids: IntArray
+    starts: IntArray
+    ends: IntArray
+    capacities: IntArray
+
+    def __len__(self) -> int:
+        return len(self.assignment_ids)
+
+
+@dataclass(frozen=True, slots=True)
+class WindowArrays:
+    """Column-oriented collaborator windows (e.g. leave), times in epoch seconds."""
+
+    collaborator_ids: IntArray
+    starts: IntArray
+    ends: IntArray
+
+    def __len__(self) -> int:
+        return len(self.collaborator_ids)
+
+
+class ScanHits(NamedTuple):
+    """Rows of the scanned arrays that violate a rule.
+
+    ``rows`` index the booking arrays, ``others`` index the colliding booking or
+    window and ``values`` carries the rule measure (rest gap in seconds, or the
+    number of assignments for capacity).
+    """
+
+    rows: IntArray
+    others: IntArray
+    values: IntArray
+
+
+@dataclass(frozen=True, slots=True)
+class CoverageCurve:
+    """Step functions of required and staffed headcount, one per group.
+
+    Points are sorted by ``(group, time)``; from ``times[i]`` until the next
+    point of the same group the levels are ``required[i]`` and ``staffed[i]``.
+    The last point of every group brings both levels back to zero.
+    """
+
+    groups: IntArray
+    times: IntArray
+    required: IntArray
+    staffed: IntArray
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+
+def _empty_hits() -> ScanHits:
+    empty = np.empty(0, dtype=np.int64)
+    return ScanHits(rows=empty, others=empty, values=empty)
+
+
+def _frame(*times: IntArray) -> tuple[int, int]:
+    origin = min(int(values.min()) for values in times if len(values))
+    latest = max(int(values.max()) for values in times if len(values))
+    return origin, latest - origin + 1
+
+
+def _running_end(ends: IntArray) -> tuple[IntArray, IntArray]:
+    """Return the running maximum of ``ends`` and the position holding it.
+
+    Keys are already prefixed by their group, so the maximum resets at every
+    group boundary without an explicit segmented scan.
+    """
+
+    running = np.maximum.accumulate(ends)
+    positions = np.arange(len(ends), dtype=np.int64)
+    holders = np.maximum.accumulate(np.where(ends == running, positions, 0))
+    return running, holders
+
+
+def booking_pairs(bookings: BookingArrays, min_rest_seconds: int) -> ScanHits:
+    """Match every booking with each booking of the same collaborator too close to it.
+
+    Rows are ordered by ``(collaborator, start)``; the later bookings starting
+    within ``min_rest_seconds`` of a row's end are contiguous, so one binary
+    search bounds them. Each pair is reported from both sides, with the rest
+    gap seen from ``rows`` in ``values``: negative when the bookings overlap.
+    """
+
+    if len(bookings) < 2:
+        return _empty_hits()
+    order = np.lexsort((bookings.ends, bookings.starts, bookings.collaborator_ids))
+    origin, span = _frame(bookings.starts, bookings.ends)
+    offsets = bookings.collaborator_ids[order] * (span + min_rest_seconds) - origin
+    starts = bookings.starts[order] + offsets
+    ends = bookings.ends[order] + offsets
+    positions = np.arange(len(order), dtype=np.int64)
+    counts = np.searchsorted(starts, ends + min_rest_seconds, side="left") - positions - 1
+    counts = np.clip(counts, 0, None)
+    earlier = np.repeat(positions, counts)
+    later = earlier + 1 + np.arange(len(earlier), dtype=np.int64) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    rows = order[np.concatenate((earlier, later))]
+    others = order[np.concatenate((later, earlier))]
+    row_starts, row_ends = bookings.starts[rows], bookings.ends[rows]
+    other_starts, other_ends = bookings.starts[others], bookings.ends[others]
+    gaps = np.where(
+        row_starts >= other_ends, row_starts - other_ends, other_starts - row_ends
+    ).astype(np.int64)
+    return ScanHits(rows=rows.astype(np.int64), others=others.astype(np.int64), values=gaps)
+
+
+def window_overlaps(bookings: BookingArrays, windows: WindowArrays) -> ScanHits:
+    """Match every booking with a window of the same collaborator overlapping it.
+
+    Windows are sorted by ``(collaborator, start)`` and each booking binary
+    searches the last window starting before it ends; the running maximum end
+    up to that window says whether any of them reaches into the booking.
+    """
+
+    if not len(bookings) or not len(windows):
+        return _empty_hits()
+    order = np.lexsort((windows.starts, windows.collaborator_ids))
+    groups = windows.collaborator_ids[order]
+    origin, span = _frame(bookings.starts, bookings.ends, windows.starts, windows.ends)
+    window_offsets = groups * span - origin
+    window_starts = windows.starts[order] + window_offsets
+    running, holders = _running_end(windows.ends[order] + window_offsets)
+
+    booking_offsets = bookings.collaborator_ids * span - origin
+    positions = np.searchsorted(window_starts, bookings.ends + booking_offsets, side="left") - 1
+    candidates = np.clip(positions, 0, None)
+    matched = (
+        (positions >= 0)
+        & (groups[candidates] == bookings.collaborator_ids)
+        & (running[candidates] > bookings.starts + booking_offsets)
+    )
+    rows = np.flatnonzero(matched).astype(np.int64)
+    return ScanHits(
+        rows=rows,
+        others=order[holders[candidates[matched]]],
+        values=np.zeros(len(rows), dtype=np.int64),
+    )
+
+
+def capacity_overruns(bookings: BookingArrays) -> ScanHits:
+    """Report one row per shift holding more assignments than its capacity."""
+
+    if not len(bookings):
+        return _empty_hits()
+    _, first_rows, counts = np.unique(bookings.shift_ids, return_index=True, return_counts=True)
+    over = counts > bookings.capacities[first_rows]
+    rows = first_rows[over].astype(np.int64)
+    return ScanHits(rows=rows, others=rows, values=counts[over].astype(np.int64))
+
+
+def coverage_curve(
+    groups: IntArray, starts: IntArray, ends: IntArray, required: IntArray, staffed: IntArray
+) -> CoverageCurve:
+    """Sweep the start/end events of weighted intervals into step functions.
+
+    Each interval adds its weights at ``start`` and removes them at ``end``;
+    after one sort by ``(group, time)`` a running sum gives the levels. Every
+    group's events cancel out, so the sum is back to zero at each group
+    boundary without a segmented scan. Simultaneous events collapse into one
+    point and points that leave both levels unchanged are dropped.
+    """
+
+    if not len(groups):
+        empty = np.empty(0, dtype=np.int64)
+        return CoverageCurve(groups=empty, times=empty, required=empty, staffed=empty)
+    event_groups = np.concatenate((groups, groups))
+    event_times = np.concatenate((starts, ends))
+    order = np.lexsort((event_times, event_groups))
+    event_groups = event_groups[order]
+    event_times = event_times[order]
+    required_levels = np.cumsum(np.concatenate((required, -required))[order])
+    staffed_levels = np.cumsum(np.concatenate((staffed, -staffed))[order])
+
+    last_at_time = np.ones(len(order), dtype=np.bool_)
+    last_at_time[:-1] = (event_groups[1:] != event_groups[:-1]) | (
+        event_times[1:] != event_times[:-1]
+    )
+    event_groups = event_groups[last_at_time]
+    event_times = event_times[last_at_time]
+    required_levels = required_levels[last_at_time]
+    staffed_levels = staffed_levels[last_at_time]
+
+    changed = np.ones(len(event_groups), dtype=np.bool_)
+    changed[1:] = (
+        (event_groups[1:] != event_groups[:-1])
+        | (required_levels[1:] != required_levels[:-1])
+        | (staffed_levels[1:] != staffed_levels[:-1])
+    )
+    return CoverageCurve(
+        groups=event_groups[changed],
+        times=event_times[changed],
+        required=required_levels[changed],
+        staffed=staffed_levels[changed],
+    )
+
+
+def bucket_means(
+    times: IntArray, levels: IntArray, origin: int, end: int, width: int
+) -> FloatArray:
+    """Time-weighted mean of one group's step function over buckets of ``width``.
+
+    Buckets tile ``[origin, end)``; the last one stops at ``end``. The integral
+    of a step function is piecewise linear between its points, so
+    interpolating it at the bucket boundaries is exact.
+    """
+
+    integral = np.zeros(len(times), dtype=np.float64)
+    if len(times) > 1:
+        integral[1:] = np.cumsum(levels[:-1] * np.diff(times))
+    count = -(-(end - origin) // width)
+    boundaries = np.minimum(origin + width * np.arange(count + 1, dtype=np.int64), end)
+    covered = np.interp(boundaries, times, integral)
+    means: FloatArray = np.diff(covered) / np.diff(boundaries)
+    return means
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    SQLColumnExpression,
+    Subquery,
+    and_,
+    case,
+    func,
+    select,
+)
+
+from app.db.models import planning as db_models
+
+# Julian day of 1970-01-01T00:00:00Z, used to turn SQLite ``julianday`` into epoch seconds.
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+def epoch_seconds(column: SQLColumnExpression[Any], dialect: str) -> ColumnElement[Any]:
+    """Seconds since the Unix epoch for a timestamp column, per SQL dialect."""
+
+    if dialect == "postgresql":
+        return func.extract("epoch", column)
+    return (func.julianday(column) - _UNIX_EPOCH_JULIAN_DAY) * 86400.0
+
+
+def scoped_bookings(
+    organization_id: int, *, start: datetime | None, end: datetime | None
+) -> list[ColumnElement[bool]]:
+    """Filters selecting an organization's live bookings overlapping ``[start, end)``.
+
+    Callers must join ``assignments`` to ``shift_instances`` and ``missions``.
+    """
+
+    conditions: list[ColumnElement[bool]] = [
+        db_models.Mission.organization_id == organization_id,
+        db_models.ShiftInstance.status != "cancelled",
+    ]
+    if start is not None:
+        conditions.append(db_models.ShiftInstance.end_utc > start)
+    if end is not None:
+        conditions.append(db_models.ShiftInstance.start_utc < end)
+    return conditions
+
+
+def _booking_rows() -> Select[Any]:
+    return (
+        select()
+        .select_from(db_models.Assignment)
+        .join(
+            db_models.ShiftInstance,
+            db_models.Assignment.shift_instance_id == db_models.ShiftInstance.id,
+        )
+        .join(db_models.Mission, db_models.ShiftInstance.mission_id == db_models.Mission.id)
+    )
+
+
+def booking_pair_query(
+    organization_id: int,
+    *,
+    dialect: str,
+    load_start: datetime | None,
+    load_end: datetime | None,
+    report_start: datetime | None,
+    report_end: datetime | None,
+    min_rest_seconds: int,
+) -> Select[Any]:
+    """Pairs of one person's bookings closer than ``min_rest_seconds``, from both sides.
+
+    A self-join on the collaborator keeps the pairs whose rest gap, seen from
+    the reported booking, is below the minimum rest; negative gaps are
+    overlaps.
+    """
+
+    shift = db_models.ShiftInstance
+    assignment = db_models.Assignment
+
+    def bookings(name: str) -> Subquery:
+        return (
+            _booking_rows()
+            .add_columns(
+                assignment.id.label("assignment_id"),
+                assignment.collaborator_id.label("collaborator_id"),
+                shift.id.label("shift_instance_id"),
+                shift.start_utc.label("start_utc"),
+                shift.end_utc.label("end_utc"),
+            )
+            .where(*scoped_bookings(organization_id, start=load_start, end=load_end))
+            .subquery(name)
+        )
+
+    booking, other = bookings("bookings"), bookings("others")
+    start = epoch_seconds(booking.c.start_utc, dialect)
+    end = epoch_seconds(booking.c.end_utc, dialect)
+    other_start = epoch_seconds(other.c.start_utc, dialect)
+    other_end = epoch_seconds(other.c.end_utc, dialect)
+    gap = func.round(case((start >= other_end, start - other_end), else_=other_start - end))
+
+    query = (
+        select(
+            booking.c.assignment_id,
+            booking.c.collaborator_id,
+            booking.c.shift_instance_id,
+            booking.c.start_utc,
+            gap.label("gap_seconds"),
+            other.c.shift_instance_id.label("other_shift_id"),
+        )
+        .join(
+            other,
+            and_(
+                other.c.collaborator_id == booking.c.collaborator_id,
+                other.c.assignment_id != booking.c.assignment_id,
+            ),
+        )
+        .where(gap < min_rest_seconds)
+    )
+    if report_start is not None:
+        query = query.where(booking.c.end_utc > report_start)
+    if report_end is not None:
+        query = query.where(booking.c.start_utc < report_end)
+    return query
+
+
+def leave_overlap_query(
+    organization_id: int, *, start: datetime | None, end: datetime | None
+) -> Select[Any]:
+    """Bookings overlapping an unavailability window of their collaborator.
+
+    Each booking is reported once, with the reason of the overlapping window
+    reaching furthest.
+    """
+
+    shift = db_models.ShiftInstance
+    assignment = db_models.Assignment
+    availability = db_models.UserAvailability
+    overlapping = (
+        availability.collaborator_id == assignment.collaborator_id,
+        availability.is_available.is_(False),
+        availability.start_utc < shift.end_utc,
+        availability.end_utc > shift.start_utc,
+    )
+    reason = (
+        select(availability.reason)
+        .where(*overlapping)
+        .order_by(availability.end_utc.desc(), availability.start_utc.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return (
+        _booking_rows()
+        .add_columns(
+            assignment.id,
+            assignment.collaborator_id,
+            shift.id,
+            shift.start_utc,
+            reason.label("reason"),
+        )
+        .where(
+            *scoped_bookings(organization_id, start=start, end=end),
+            select(availability.id).where(*overlapping).exists(),
+        )
+    )
+
+
+def overstaffed_shifts_query(
+    organization_id: int, *, start: datetime | None, end: datetime | None
+) -> Select[Any]:
+    """Live shifts holding more assignments than their capacity."""
+
+    shift = db_models.ShiftInstance
+    query = (
+        select()
+        .select_from(shift)
+        .add_columns(shift.id, shift.start_utc, shift.capacity, shift.assigned_count)
+        .join(db_models.Mission, shift.mission_id == db_models.Mission.id)
+        .where(
+            db_models.Mission.organization_id == organization_id,
+            shift.status != "cancelled",
+            shift.assigned_count > shift.capacity,
+        )
+    )
+    if start is not None:
+        query = query.where(shift.end_utc > start)
+    if end is not None:
+        query = query.where(shift.start_utc < end)
+    return query
+
+
+def booking_count_query(
+    organization_id: int, *, start: datetime | None, end: datetime | None
+) -> Select[Any]:
+    return (
+        _booking_rows()
+        .add_columns(func.count(db_models.Assignment.id))
+        .where(*scoped_bookings(organization_id, start=start, end=end))
+    )
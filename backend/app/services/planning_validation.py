@@ -0,0 +1,516 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime, timedelta
+from typing import Any, NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import planning as db_models
+from app.models.common import PaginatedResponse
+from app.models.planning_pro import (
+    CoverageReport,
+    CoverageSeries,
+    PlanningValidationReport,
+    PlanningValidationSummary,
+    PlanningViolation,
+)
+from app.services import planning_scan, planning_sql
+from app.services.errors import ValidationError
+from app.services.planning_pro import RuleService, _ensure_timezone
+from app.services.rule_catalog import CompiledRules
+
+# Coverage curves are bounded like the board: two months, and a bucket count
+# per series that keeps responses compact.
+MAX_COVERAGE_WINDOW = timedelta(days=62)
+MAX_COVERAGE_BUCKETS = 2_000
+
+
+class ViolationRecord(NamedTuple):
+    """One violation found by an organization-wide scan, with its shift start for ordering."""
+
+    start: datetime
+    shift_instance_id: int
+    assignment_id: int | None
+    collaborator_id: int | None
+    rule: str
+    type: str
+    details: dict[str, Any]
+
+    def sort_key(self) -> tuple[datetime, int, int, str, str]:
+        return (
+            self.start,
+            self.shift_instance_id,
+            self.assignment_id if self.assignment_id is not None else -1,
+            self.rule,
+            repr(sorted(self.details.items())),
+        )
+
+    def to_violation(self) -> PlanningViolation:
+        return PlanningViolation(
+            shift_instance_id=self.shift_instance_id,
+            assignment_id=self.assignment_id,
+            collaborator_id=self.collaborator_id,
+            type=self.type,
+            rule=self.rule,
+            details=self.details,
+        )
+
+
+def _epoch_seconds(value: datetime) -> int:
+    return int(_ensure_timezone(value).timestamp())
+
+
+def _from_epoch(value: int) -> datetime:
+    return datetime.fromtimestamp(value, tz=UTC)
+
+
+def _int_column(values: Iterable[Any], count: int) -> npt.NDArray[np.int64]:
+    return np.fromiter(values, dtype=np.int64, count=count)
+
+
+def _widened(
+    start: datetime | None, end: datetime | None, margin: timedelta
+) -> tuple[datetime | None, datetime | None]:
+    return (
+        start - margin if start is not None else None,
+        end + margin if end is not None else None,
+    )
+
+
+def _booking_gap_records(
+    rules: CompiledRules,
+    *,
+    start: datetime,
+    shift_instance_id: int,
+    assignment_id: int,
+    collaborator_id: int,
+    gap_seconds: int,
+    other_shift_id: int,
+) -> list[ViolationRecord]:
+    """The entries ``_booking_conflicts`` reports for one booking of a close pair."""
+
+    entries = [("min_rest", rules.min_rest_type, {"minutes_gap": gap_seconds // 60})]
+    if gap_seconds < 0 and rules.double_booking_enforced:
+        entries.insert(
+            0,
+            ("double_booking", rules.double_booking_type, {"other_shift_id": other_shift_id}),
+        )
+    return [
+        ViolationRecord(
+            start=start,
+            shift_instance_id=shift_instance_id,
+            assignment_id=assignment_id,
+            collaborator_id=collaborator_id,
+            rule=rule,
+            type=type_,
+            details=details,
+        )
+        for rule, type_, details in entries
+    ]
+
+
+def _load_booking_arrays(
+    session: Session, organization_id: int, *, start: datetime | None, end: datetime | None
+) -> planning_scan.BookingArrays:
+    rows = (
+        session.execute(
+            select(
+                db_models.Assignment.id,
+                db_models.Assignment.shift_instance_id,
+                db_models.Assignment.collaborator_id,
+                db_models.ShiftInstance.start_utc,
+                db_models.ShiftInstance.end_utc,
+                db_models.ShiftInstance.capacity,
+            )
+            .join(
+                db_models.ShiftInstance,
+                db_models.Assignment.shift_instance_id == db_models.ShiftInstance.id,
+            )
+            .join(db_models.Mission, db_models.ShiftInstance.mission_id == db_models.Mission.id)
+            .where(*planning_sql.scoped_bookings(organization_id, start=start, end=end))
+            .order_by(db_models.Assignment.id)
+        )
+        .tuples()
+        .all()
+    )
+    count = len(rows)
+    return planning_scan.BookingArrays(
+        assignment_ids=_int_column((row[0] for row in rows), count),
+        shift_ids=_int_column((row[1] for row in rows), count),
+        collaborator_ids=_int_column((row[2] for row in rows), count),
+        starts=_int_column((_epoch_seconds(row[3]) for row in rows), count),
+        ends=_int_column((_epoch_seconds(row[4]) for row in rows), count),
+        capacities=_int_column((row[5] or 1 for row in rows), count),
+    )
+
+
+def _booking_window_mask(
+    bookings: planning_scan.BookingArrays, start: datetime | None, end: datetime | None
+) -> npt.NDArray[np.bool_]:
+    in_window = np.ones(len(bookings), dtype=np.bool_)
+    if start is not None:
+        in_window &= bookings.ends > _epoch_seconds(start)
+    if end is not None:
+        in_window &= bookings.starts < _epoch_seconds(end)
+    return in_window
+
+
+def _array_booking_violations(
+    bookings: planning_scan.BookingArrays,
+    rules: CompiledRules,
+    in_window: npt.NDArray[np.bool_],
+) -> list[ViolationRecord]:
+    pairs = planning_scan.booking_pairs(bookings, int(rules.min_rest.total_seconds()))
+    return [
+        record
+        for row, other, gap in zip(
+            pairs.rows.tolist(), pairs.others.tolist(), pairs.values.tolist(), strict=True
+        )
+        if in_window[row]
+        for record in _booking_gap_records(
+            rules,
+            start=_from_epoch(int(bookings.starts[row])),
+            shift_instance_id=int(bookings.shift_ids[row]),
+            assignment_id=int(bookings.assignment_ids[row]),
+            collaborator_id=int(bookings.collaborator_ids[row]),
+            gap_seconds=gap,
+            other_shift_id=int(bookings.shift_ids[other]),
+        )
+    ]
+
+
+class PlanningValidationService:
+    """Organization-wide conflict scan run before publishing."""
+
+    def __init__(self, session: Session, rule_service: RuleService) -> None:
+        self._session = session
+        self._rule_service = rule_service
+
+    def validate_organization(
+        self,
+        organization_id: int,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        page: int = 1,
+        page_size: int = 50,
+        pushdown: bool = True,
+    ) -> PlanningValidationReport:
+        rules = self._rule_service.rules_for_organization(organization_id)
+        if pushdown:
+            violations = self._sql_booking_violations(organization_id, start=start, end=end)
+            violations.extend(self._sql_leave_violations(organization_id, start=start, end=end))
+            violations.extend(
+                self._sql_capacity_violations(organization_id, start=start, end=end)
+            )
+            scanned = self._session.execute(
+                planning_sql.booking_count_query(organization_id, start=start, end=end)
+            ).scalar_one()
+        else:
+            violations, scanned = self._array_violations(
+                organization_id, rules, start=start, end=end
+            )
+
+        violations.sort(key=ViolationRecord.sort_key)
+        by_type = Counter(item.type for item in violations)
+        offset = (page - 1) * page_size
+        return PlanningValidationReport(
+            summary=PlanningValidationSummary(
+                organization_id=organization_id,
+                rule_version=rules.version,
+                assignments_scanned=scanned,
+                hard=by_type["hard"],
+                soft=by_type["soft"],
+                by_rule=dict(Counter(item.rule for item in violations)),
+            ),
+            violations=PaginatedResponse(
+                items=[item.to_violation() for item in violations[offset : offset + page_size]],
+                total=len(violations),
+                page=page,
+                page_size=page_size,
+            ),
+        )
+
+    def _array_violations(
+        self,
+        organization_id: int,
+        rules: CompiledRules,
+        *,
+        start: datetime | None,
+        end: datetime | None,
+    ) -> tuple[list[ViolationRecord], int]:
+        load_start, load_end = _widened(start, end, rules.min_rest)
+        bookings = _load_booking_arrays(
+            self._session, organization_id, start=load_start, end=load_end
+        )
+        in_window = _booking_window_mask(bookings, start, end)
+        violations = _array_booking_violations(bookings, rules, in_window)
+
+        def record(
+            hits: planning_scan.ScanHits,
+            *,
+            rule: str,
+            details: Callable[[int, int], dict[str, Any]],
+            per_assignment: bool = True,
+        ) -> None:
+            for row, other, value in zip(
+                hits.rows.tolist(), hits.others.tolist(), hits.values.tolist(), strict=True
+            ):
+                if not in_window[row]:
+                    continue
+                violations.append(
+                    ViolationRecord(
+                        start=_from_epoch(int(bookings.starts[row])),
+                        shift_instance_id=int(bookings.shift_ids[row]),
+                        assignment_id=int(bookings.assignment_ids[row]) if per_assignment else None,
+                        collaborator_id=(
+                            int(bookings.collaborator_ids[row]) if per_assignment else None
+                        ),
+                        rule=rule,
+                        type="hard",
+                        details=details(other, value),
+                    )
+                )
+
+        leaves, reasons = self._load_leaves(organization_id, start=load_start, end=load_end)
+        record(
+            planning_scan.window_overlaps(bookings, leaves),
+            rule="leave",
+            details=lambda other, _: {"reason": reasons[other]},
+        )
+        record(
+            planning_scan.capacity_overruns(bookings),
+            rule="capacity_exceeded",
+            details=lambda row, count: {
+                "capacity": int(bookings.capacities[row]),
+                "attempted": count,
+            },
+            per_assignment=False,
+        )
+        return violations, int(in_window.sum())
+
+    def _sql_booking_violations(
+        self,
+        organization_id: int,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[ViolationRecord]:
+        """The ``double_booking``/``min_rest`` entries of every close pair of bookings."""
+
+        rules = self._rule_service.rules_for_organization(organization_id)
+        load_start, load_end = _widened(start, end, rules.min_rest)
+        query = planning_sql.booking_pair_query(
+            organization_id,
+            dialect=self._session.get_bind().dialect.name,
+            load_start=load_start,
+            load_end=load_end,
+            report_start=start,
+            report_end=end,
+            min_rest_seconds=int(rules.min_rest.total_seconds()),
+        )
+        return sorted(
+            (
+                record
+                for (
+                    assignment_id,
+                    collaborator_id,
+                    shift_id,
+                    shift_start,
+                    gap,
+                    other_shift_id,
+                ) in self._session.execute(query).tuples()
+                for record in _booking_gap_records(
+                    rules,
+                    start=_ensure_timezone(shift_start),
+                    shift_instance_id=shift_id,
+                    assignment_id=assignment_id,
+                    collaborator_id=collaborator_id,
+                    gap_seconds=int(gap),
+                    other_shift_id=other_shift_id,
+                )
+            ),
+            key=ViolationRecord.sort_key,
+        )
+
+    def _sql_leave_violations(
+        self, organization_id: int, *, start: datetime | None, end: datetime | None
+    ) -> list[ViolationRecord]:
+        return [
+            ViolationRecord(
+                start=_ensure_timezone(shift_start),
+                shift_instance_id=shift_id,
+                assignment_id=assignment_id,
+                collaborator_id=collaborator_id,
+                rule="leave",
+                type="hard",
+                details={"reason": reason},
+            )
+            for assignment_id, collaborator_id, shift_id, shift_start, reason in (
+                self._session.execute(
+                    planning_sql.leave_overlap_query(organization_id, start=start, end=end)
+                ).tuples()
+            )
+        ]
+
+    def _sql_capacity_violations(
+        self, organization_id: int, *, start: datetime | None, end: datetime | None
+    ) -> list[ViolationRecord]:
+        return [
+            ViolationRecord(
+                start=_ensure_timezone(shift_start),
+                shift_instance_id=shift_id,
+                assignment_id=None,
+                collaborator_id=None,
+                rule="capacity_exceeded",
+                type="hard",
+                details={"capacity": capacity, "attempted": assigned_count},
+            )
+            for shift_id, shift_start, capacity, assigned_count in self._session.execute(
+                planning_sql.overstaffed_shifts_query(organization_id, start=start, end=end)
+            ).tuples()
+        ]
+
+    def _load_leaves(
+        self, organization_id: int, *, start: datetime | None, end: datetime | None
+    ) -> tuple[planning_scan.WindowArrays, list[str | None]]:
+        query = (
+            select(
+                db_models.UserAvailability.collaborator_id,
+                db_models.UserAvailability.start_utc,
+                db_models.UserAvailability.end_utc,
+                db_models.UserAvailability.reason,
+            )
+            .join(
+                db_models.Collaborator,
+                db_models.UserAvailability.collaborator_id == db_models.Collaborator.id,
+            )
+            .where(
+                db_models.Collaborator.organization_id == organization_id,
+                db_models.UserAvailability.is_available.is_(False),
+            )
+        )
+        if start is not None:
+            query = query.where(db_models.UserAvailability.end_utc > start)
+        if end is not None:
+            query = query.where(db_models.UserAvailability.start_utc < end)
+        rows = self._session.execute(query).tuples().all()
+        count = len(rows)
+        windows = planning_scan.WindowArrays(
+            collaborator_ids=_int_column((row[0] for row in rows), count),
+            starts=_int_column((_epoch_seconds(row[1]) for row in rows), count),
+            ends=_int_column((_epoch_seconds(row[2]) for row in rows), count),
+        )
+        return windows, [row[3] for row in rows]
+
+
+class CoverageService:
+    """Required versus staffed headcount over time, per site and role."""
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def coverage(
+        self,
+        organization_id: int,
+        *,
+        start: datetime,
+        end: datetime,
+        site_ids: list[int] | None = None,
+        role_ids: list[int] | None = None,
+        resolution: timedelta | None = None,
+    ) -> CoverageReport:
+        """Return one step function per ``(site, role)``, plus bucket means at ``resolution``."""
+
+        start = _ensure_timezone(start)
+        end = _ensure_timezone(end)
+        if end <= start:
+            raise ValidationError("end must be later than start")
+        if end - start > MAX_COVERAGE_WINDOW:
+            raise ValidationError("Coverage windows are limited to 62 days")
+        if resolution is not None and (end - start) / resolution > MAX_COVERAGE_BUCKETS:
+            raise ValidationError(
+                f"Resolution too fine: at most {MAX_COVERAGE_BUCKETS} buckets per series"
+            )
+
+        dialect = self._session.get_bind().dialect.name
+        query = (
+            select(
+                db_models.ShiftInstance.site_id,
+                db_models.ShiftInstance.role_id,
+                planning_sql.epoch_seconds(db_models.ShiftInstance.start_utc, dialect),
+                planning_sql.epoch_seconds(db_models.ShiftInstance.end_utc, dialect),
+                func.coalesce(db_models.ShiftInstance.capacity, 1),
+                func.coalesce(db_models.ShiftInstance.assigned_count, 0),
+            )
+            .join(db_models.Site, db_models.ShiftInstance.site_id == db_models.Site.id)
+            .where(
+                db_models.Site.organization_id == organization_id,
+                db_models.ShiftInstance.status != "cancelled",
+                db_models.ShiftInstance.start_utc < end,
+                db_models.ShiftInstance.end_utc > start,
+            )
+        )
+        if site_ids:
+            query = query.where(db_models.ShiftInstance.site_id.in_(site_ids))
+        if role_ids:
+            query = query.where(db_models.ShiftInstance.role_id.in_(role_ids))
+        # Plain columns: a Core execution skips the ORM row-loading layer.
+        rows = self._session.connection().execute(query).all()
+
+        report = CoverageReport(
+            start=start,
+            end=end,
+            resolution_minutes=(
+                int(resolution.total_seconds() // 60) if resolution is not None else None
+            ),
+        )
+        if not rows:
+            return report
+        window_start, window_end = _epoch_seconds(start), _epoch_seconds(end)
+        # Epochs come back as floats (``julianday`` arithmetic on SQLite).
+        sites, roles, starts, ends, capacities, staffed = np.rint(
+            np.array([tuple(row) for row in rows], dtype=np.float64)
+        ).astype(np.int64).T
+        stride = int(roles.max()) + 1
+        curve = planning_scan.coverage_curve(
+            sites * stride + roles,
+            np.maximum(starts, window_start),
+            np.minimum(ends, window_end),
+            capacities,
+            staffed,
+        )
+
+        boundaries = np.flatnonzero(curve.groups[1:] != curve.groups[:-1]) + 1
+        for lo, hi in zip(
+            np.concatenate(([0], boundaries)),
+            np.concatenate((boundaries, [len(curve)])),
+            strict=True,
+        ):
+            site_id, role_id = divmod(int(curve.groups[lo]), stride)
+            times = curve.times[lo:hi]
+            series = {
+                "site_id": site_id,
+                "role_id": role_id,
+                "at": times.tolist(),
+                "required": curve.required[lo:hi].tolist(),
+                "staffed": curve.staffed[lo:hi].tolist(),
+            }
+            if resolution is not None:
+                width = int(resolution.total_seconds())
+                for key, levels in (
+                    ("bucket_required", curve.required[lo:hi]),
+                    ("bucket_staffed", curve.staffed[lo:hi]),
+                ):
+                    series[key] = np.round(
+                        planning_scan.bucket_means(times, levels, window_start, window_end, width),
+                        3,
+                    ).tolist()
+            # Epoch seconds validate straight into UTC datetimes.
+            report.series.append(CoverageSeries.model_validate(series))
+        return report
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.models import planning as db_models
+
+
+class PlanningVersionService:
+    """Per-organization planning version counters backing conditional reads.
+
+    Every planning write bumps the counter of its organization inside the
+    write transaction, so a reader can tell that nothing changed with a single
+    primary-key lookup instead of re-running its query. Reads that span all
+    organizations use the sum of the counters, which grows with every bump
+    without funnelling all writers through one shared row.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def bump(self, organization_ids: Iterable[int]) -> None:
+        """Increment the counters of ``organization_ids``; the caller commits."""
+
+        for organization_id in sorted(set(organization_ids)):
+            if self._increment(organization_id):
+                continue
+            try:
+                with self._session.begin_nested():
+                    self._session.execute(
+                        insert(db_models.PlanningVersion).values(
+                            organization_id=organization_id,
+                            version=1,
+                            updated_at=datetime.now(UTC),
+                        )
+                    )
+            except IntegrityError:
+                # Another writer created the row first; increment theirs.
+                self._increment(organization_id)
+
+    def current(self, organization_id: int | None = None) -> int:
+        """Return the organization's version, or the sum over all organizations."""
+
+        if organization_id is None:
+            total = self._session.scalar(
+                select(func.coalesce(func.sum(db_models.PlanningVersion.version), 0))
+            )
+        else:
+            total = self._session.scalar(
+                select(db_models.PlanningVersion.version).where(
+                    db_models.PlanningVersion.organization_id == organization_id
+                )
+            )
+        return int(total or 0)
+
+    def etag(self, organization_id: int | None, *parts: str) -> str:
+        """Weak entity tag for a read of ``organization_id`` described by ``parts``."""
+
+        scope = "all" if organization_id is None else str(organization_id)
+        digest = hashlib.sha256(
+            "\x1f".join((scope, str(self.current(organization_id)), *parts)).encode()
+        ).hexdigest()
+        return f'W/"{digest[:32]}"'
+
+    def _increment(self, organization_id: int) -> bool:
+        result = cast(
+            CursorResult[Any],
+            self._session.execute(
+                update(db_models.PlanningVersion)
+                .where(db_models.PlanningVersion.organization_id == organization_id)
+                .values(
+                    version=db_models.PlanningVersion.version + 1,
+                    updated_at=datetime.now(UTC),
+                )
+            ),
+        )
+        return result.rowcount > 0
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime, time, timedelta
+from itertools import count
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+def _parse_until(value: str) -> datetime:
+    try:
+        if value.endswith("Z"):
+            return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=UTC)
+        if "T" in value:
+            return datetime.strptime(value, "%Y%m%dT%H%M%S")
+        return datetime.combine(datetime.strptime(value, "%Y%m%d").date(), time.max)
+    except ValueError:
+        raise ValueError(f"Invalid UNTIL value: {value}") from None
+
+
+def _positive(name: str, value: str) -> int:
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return int(value)
+
+
+@dataclass(frozen=True, slots=True)
+class RecurrenceRule:
+    """The subset of RFC 5545 ``RRULE`` used by shift templates.
+
+    ``FREQ=DAILY`` or ``FREQ=WEEKLY`` with optional ``INTERVAL``, ``BYDAY``
+    (weekly only, plain weekday codes, weeks start on Monday), ``COUNT`` and
+    ``UNTIL``. Occurrences keep the wall-clock time of ``DTSTART`` in its
+    timezone. An ``UNTIL`` without ``Z`` is read in that timezone, a date-only
+    ``UNTIL`` includes the whole day.
+    """
+
+    freq: str
+    interval: int = 1
+    weekdays: tuple[int, ...] = ()
+    count: int | None = None
+    until: datetime | None = None
+
+    @classmethod
+    def parse(cls, text: str) -> RecurrenceRule:
+        """Parse ``text`` (with or without the ``RRULE:`` prefix); raise ``ValueError``."""
+
+        parts: dict[str, str] = {}
+        for part in text.strip().removeprefix("RRULE:").split(";"):
+            if not part:
+                continue
+            name, separator, value = part.partition("=")
+            name = name.strip().upper()
+            if not separator or not value.strip():
+                raise ValueError(f"Malformed recurrence rule part: {part}")
+            if name in parts:
+                raise ValueError(f"Duplicate recurrence rule part: {name}")
+            parts[name] = value.strip().upper()
+        unsupported = parts.keys() - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL", "WKST"}
+        if unsupported:
+            raise ValueError(f"Unsupported recurrence rule part: {sorted(unsupported)[0]}")
+        freq = parts.get("FREQ")
+        if freq not in ("DAILY", "WEEKLY"):
+            raise ValueError("FREQ must be DAILY or WEEKLY")
+        if parts.get("WKST", "MO") != "MO":
+            raise ValueError("Only WKST=MO is supported")
+        if "COUNT" in parts and "UNTIL" in parts:
+            raise ValueError("COUNT and UNTIL are mutually exclusive")
+        weekdays: tuple[int, ...] = ()
+        if "BYDAY" in parts:
+            if freq != "WEEKLY":
+                raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+            codes = [code.strip() for code in parts["BYDAY"].split(",")]
+            if not all(code in WEEKDAYS for code in codes):
+                raise ValueError(f"Invalid BYDAY value: {parts['BYDAY']}")
+            weekdays = tuple(sorted({WEEKDAYS.index(code) for code in codes}))
+        return cls(
+            freq=freq,
+            interval=_positive("INTERVAL", parts["INTERVAL"]) if "INTERVAL" in parts else 1,
+            weekdays=weekdays,
+            count=_positive("COUNT", parts["COUNT"]) if "COUNT" in parts else None,
+            until=_parse_until(parts["UNTIL"]) if "UNTIL" in parts else None,
+        )
+
+    def occurrences(
+        self, dtstart: datetime, *, since: datetime | None = None
+    ) -> Iterator[datetime]:
+        """Lazily yield occurrence starts, in order, from ``since`` onwards.
+
+        ``dtstart`` must be timezone-aware; occurrences are returned in its
+        timezone. Periods before ``since`` are skipped arithmetically, so
+        starting far from ``dtstart`` costs the same as starting at it. Rules
+        without ``COUNT`` or ``UNTIL`` never end: consumers bound the window.
+        """
+
+        zone = dtstart.tzinfo
+        wall_start = dtstart.replace(tzinfo=None)
+        if self.freq == "DAILY":
+            origin = wall_start
+            offsets: tuple[int, ...] = (0,)
+            period = timedelta(days=self.interval)
+        else:
+            origin = wall_start - timedelta(days=wall_start.weekday())
+            offsets = self.weekdays or (wall_start.weekday(),)
+            period = timedelta(weeks=self.interval)
+        first_offsets = tuple(
+            offset for offset in offsets if origin + timedelta(days=offset) >= wall_start
+        )
+
+        skipped = 0
+        if since is not None:
+            wall_since = since.astimezone(zone).replace(tzinfo=None)
+            if wall_since > origin:
+                skipped = (wall_since - origin) // period
+        index = 0 if skipped == 0 else len(first_offsets) + (skipped - 1) * len(offsets)
+        for number in count(skipped):
+            base = origin + number * period
+            for offset in first_offsets if number == 0 else offsets:
+                if self.count is not None and index >= self.count:
+                    return
+                start = (base + timedelta(days=offset)).replace(tzinfo=zone)
+                if self.until is not None and (
+                    start > self.until
+                    if self.until.tzinfo is not None
+                    else start.replace(tzinfo=None) > self.until
+                ):
+                    return
+                index += 1
+                if since is None or start >= since:
+                    yield start
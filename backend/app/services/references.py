@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import TypeVar, cast
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+
+ModelT = TypeVar("ModelT", bound=Base)
+
+
+class ReferenceLoader:
+    """Request-scoped, batched primary-key lookups of planning reference rows.
+
+    Ids announced with ``prime`` are fetched together with the next lookup of
+    the same model, so resolving the missions, roles or collaborators of a
+    whole batch costs one ``IN`` query per entity type. Rows are then served
+    from the loader's identity map until the session expires them (commit or
+    rollback), at which point they are reloaded in bulk again. Misses are not
+    remembered, so a row created later in the request is found.
+
+    One loader is built per request in ``get_planning_services`` and shared by
+    every planning service on that session.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+        self._rows: defaultdict[type[Base], dict[int, Base]] = defaultdict(dict)
+        self._pending: defaultdict[type[Base], set[int]] = defaultdict(set)
+
+    def prime(self, model: type[Base], ids: Iterable[int]) -> None:
+        """Queue ``ids`` so the next lookup of ``model`` loads them in the same query."""
+
+        self._pending[model].update(ids)
+
+    def get(self, model: type[ModelT], id_: int) -> ModelT | None:
+        return self.get_many(model, (id_,)).get(id_)
+
+    def get_many(self, model: type[ModelT], ids: Iterable[int]) -> dict[int, ModelT]:
+        """Return the rows of ``model`` found among ``ids``, keyed by primary key."""
+
+        ids = set(ids)
+        rows = self._rows[model]
+        wanted = ids | self._pending.pop(model, set())
+        stale = {
+            id_ for id_ in wanted if id_ not in rows or not _is_loaded(rows[id_])
+        }
+        if stale:
+            for id_ in stale:
+                rows.pop(id_, None)
+            mapper = inspect(model)
+            query = select(model).where(mapper.primary_key[0].in_(stale))
+            for row in self._session.scalars(query):
+                rows[mapper.primary_key_from_instance(row)[0]] = row
+        return {id_: cast(ModelT, rows[id_]) for id_ in ids if id_ in rows}
+
+
+def _is_loaded(row: Base) -> bool:
+    state = inspect(row)
+    return state.persistent and not state.expired
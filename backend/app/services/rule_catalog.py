@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import chain
+from threading import Lock
+from typing import Any, overload
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, UOWTransaction
+
+from app.core.config import settings
+from app.db.models import planning as db_models
+
+DEFAULT_MIN_REST = timedelta(hours=1)
+DAY = timedelta(days=1)
+WEEK = timedelta(days=7)
+
+_PENDING_RULE_ORGANIZATIONS = "planning_rule_organizations"
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRules:
+    """Ready-to-run rule thresholds for one organization.
+
+    Organizations without configured rules get the historical defaults: a one
+    hour minimum rest and double booking enforced as a hard conflict. Working
+    time limits only apply when ``max_hours_day``/``max_hours_week`` are set.
+    """
+
+    organization_id: int
+    version: str
+    min_rest: timedelta = DEFAULT_MIN_REST
+    min_rest_type: str = "hard"
+    double_booking_enforced: bool = True
+    double_booking_type: str = "hard"
+    max_hours_day: timedelta | None = None
+    max_hours_day_type: str = "hard"
+    max_hours_week: timedelta | None = None
+    max_hours_week_type: str = "hard"
+
+    @property
+    def has_workload_limits(self) -> bool:
+        return self.max_hours_day is not None or self.max_hours_week is not None
+
+    @property
+    def neighbourhood(self) -> timedelta:
+        """How far around a booking other bookings can change its conflicts."""
+
+        if self.max_hours_week is not None:
+            return max(self.min_rest, WEEK)
+        if self.max_hours_day is not None:
+            return max(self.min_rest, DAY)
+        return self.min_rest
+
+
+def compile_rules(
+    organization_id: int,
+    hr_rules: Sequence[db_models.HrRule],
+    conflict_rules: Sequence[db_models.ConflictRule],
+) -> CompiledRules:
+    min_rest = DEFAULT_MIN_REST
+    min_rest_type = "hard"
+    double_booking_enforced = True
+    double_booking_type = "hard"
+    limits: dict[str, tuple[timedelta | None, str]] = {
+        "max_hours_day": (None, "hard"),
+        "max_hours_week": (None, "hard"),
+    }
+    for hr_rule in hr_rules:
+        severity = "soft" if hr_rule.severity == "soft" else "hard"
+        if hr_rule.code in {"rest_minimum", "min_rest"}:
+            min_rest = _duration(hr_rule.config or {}, default=DEFAULT_MIN_REST)
+            min_rest_type = severity
+        elif hr_rule.code in limits:
+            limits[hr_rule.code] = (_duration(hr_rule.config or {}, default=None), severity)
+    for conflict_rule in conflict_rules:
+        if conflict_rule.code == "double_booking":
+            double_booking_enforced = bool((conflict_rule.config or {}).get("enforced", True))
+            double_booking_type = "soft" if conflict_rule.severity == "warning" else "hard"
+    return CompiledRules(
+        organization_id=organization_id,
+        version=_rule_set_version(hr_rules, conflict_rules),
+        min_rest=min_rest,
+        min_rest_type=min_rest_type,
+        double_booking_enforced=double_booking_enforced,
+        double_booking_type=double_booking_type,
+        max_hours_day=limits["max_hours_day"][0],
+        max_hours_day_type=limits["max_hours_day"][1],
+        max_hours_week=limits["max_hours_week"][0],
+        max_hours_week_type=limits["max_hours_week"][1],
+    )
+
+
+class RuleCatalog:
+    """Process-level cache of compiled rule sets keyed by organization.
+
+    Entries are dropped when a session commits a change to ``hr_rules`` or
+    ``conflict_rules``; the TTL bounds staleness for changes committed by other
+    worker processes. A session that changed an organization's rules compiles
+    them from its own rows, uncached, until it commits.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._entries: dict[int, tuple[float, CompiledRules]] = {}
+        self._lock = Lock()
+
+    def get(self, session: Session, organization_id: int) -> CompiledRules:
+        uncommitted = organization_id in session.info.get(_PENDING_RULE_ORGANIZATIONS, ())
+        entry = self._entries.get(organization_id)
+        if (
+            not uncommitted
+            and entry is not None
+            and time.monotonic() - entry[0] < self._ttl_seconds
+        ):
+            return entry[1]
+        hr_rules = session.scalars(
+            select(db_models.HrRule)
+            .where(db_models.HrRule.organization_id == organization_id)
+            .order_by(db_models.HrRule.id)
+        ).all()
+        conflict_rules = session.scalars(
+            select(db_models.ConflictRule)
+            .where(db_models.ConflictRule.organization_id == organization_id)
+            .order_by(db_models.ConflictRule.id)
+        ).all()
+        rule_set = compile_rules(organization_id, hr_rules, conflict_rules)
+        if uncommitted:
+            return rule_set
+        with self._lock:
+            self._entries[organization_id] = (time.monotonic(), rule_set)
+        return rule_set
+
+    def invalidate(self, organization_ids: Iterable[int]) -> None:
+        with self._lock:
+            for organization_id in organization_ids:
+                self._entries.pop(organization_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+rule_catalog = RuleCatalog(ttl_seconds=settings.rule_catalog_ttl_seconds)
+
+
+@overload
+def _duration(config: dict[str, Any], *, default: timedelta) -> timedelta: ...
+
+
+@overload
+def _duration(config: dict[str, Any], *, default: None) -> timedelta | None: ...
+
+
+def _duration(config: dict[str, Any], *, default: timedelta | None) -> timedelta | None:
+    if "hours" not in config and "minutes" not in config:
+        return default
+    return timedelta(
+        hours=float(config.get("hours", 0)), minutes=float(config.get("minutes", 0))
+    )
+
+
+def _rule_set_version(
+    hr_rules: Sequence[db_models.HrRule], conflict_rules: Sequence[db_models.ConflictRule]
+) -> str:
+    digest = hashlib.sha1(usedforsecurity=False)
+    rules: list[tuple[str, db_models.HrRule | db_models.ConflictRule]] = [
+        ("hr", rule) for rule in hr_rules
+    ]
+    rules.extend(("conflict", rule) for rule in conflict_rules)
+    for kind, rule in rules:
+        digest.update(
+            json.dumps(
+                [kind, rule.id, rule.code, rule.severity, rule.config],
+                sort_keys=True,
+                default=str,
+            ).encode()
+        )
+    return digest.hexdigest()[:12]
+
+
+def changed_rule_organizations(session: Session) -> set[int]:
+    """Organizations whose rules ``session`` changed in its current transaction."""
+
+    if any(
+        isinstance(instance, db_models.HrRule | db_models.ConflictRule)
+        for instance in chain(session.new, session.dirty, session.deleted)
+    ):
+        session.flush()
+    return set(session.info.get(_PENDING_RULE_ORGANIZATIONS, ()))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_rule_changes(session: Session, flush_context: UOWTransaction) -> None:  # noqa: ARG001
+    organizations = {
+        instance.organization_id
+        for instance in chain(session.new, session.dirty, session.deleted)
+        if isinstance(instance, db_models.HrRule | db_models.ConflictRule)
+    }
+    if organizations:
+        session.info.setdefault(_PENDING_RULE_ORGANIZATIONS, set()).update(organizations)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_rules(session: Session) -> None:
+    organizations = session.info.pop(_PENDING_RULE_ORGANIZATIONS, None)
+    if organizations:
+        rule_catalog.invalidate(organizations)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rule_changes(session: Session) -> None:
+    session.info.pop(_PENDING_RULE_ORGANIZATIONS, None)
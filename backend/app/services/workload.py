@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from datetime import UTC, datetime
+from threading import Lock
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.core.config import settings
+from app.db.models import planning as db_models
+
+_PENDING_BOOKINGS = "planning_workload_bookings"
+_RESET_COLLABORATORS = "planning_workload_resets"
+
+# Booking changes of one collaborator: assignment id -> new window, or None if removed.
+BookingChanges = Mapping[int, tuple[datetime, datetime] | None]
+
+
+def _epoch(value: datetime) -> float:
+    return (value if value.tzinfo is not None else value.replace(tzinfo=UTC)).timestamp()
+
+
+class CollaboratorWorkload:
+    """Booked time of one collaborator as cumulative-duration arrays.
+
+    Bookings are kept sorted by start with ``prefix[i]`` holding the total
+    duration of the first ``i`` bookings, so the time worked in any window is a
+    binary search plus a prefix difference, corrected for the bookings cut by
+    the window edges. A collaborator's bookings are assumed not to overlap;
+    double bookings are reported by their own rule.
+    """
+
+    __slots__ = ("_starts", "_ends", "_ids", "_prefix", "_windows")
+
+    def __init__(self, bookings: Iterable[tuple[int, datetime, datetime]] = ()) -> None:
+        ordered = sorted(
+            (_epoch(start), _epoch(end), assignment_id) for assignment_id, start, end in bookings
+        )
+        self._starts = [start for start, _, _ in ordered]
+        self._ends = [end for _, end, _ in ordered]
+        self._ids = [assignment_id for _, _, assignment_id in ordered]
+        self._prefix = [0.0]
+        for start, end, _ in ordered:
+            self._prefix.append(self._prefix[-1] + end - start)
+        self._windows = {assignment_id: (start, end) for start, end, assignment_id in ordered}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def with_changes(self, changes: BookingChanges) -> CollaboratorWorkload:
+        """Return a copy with ``changes`` applied, leaving this ledger untouched."""
+
+        copy = CollaboratorWorkload.__new__(CollaboratorWorkload)
+        copy._starts = list(self._starts)
+        copy._ends = list(self._ends)
+        copy._ids = list(self._ids)
+        copy._prefix = list(self._prefix)
+        copy._windows = dict(self._windows)
+        for assignment_id, window in changes.items():
+            if window is None:
+                copy.remove(assignment_id)
+            else:
+                copy.add(assignment_id, *window)
+        return copy
+
+    def add(self, assignment_id: int, start: datetime, end: datetime) -> None:
+        self.remove(assignment_id)
+        start_ts, end_ts = _epoch(start), _epoch(end)
+        position = bisect_right(self._starts, start_ts)
+        self._starts.insert(position, start_ts)
+        self._ends.insert(position, end_ts)
+        self._ids.insert(position, assignment_id)
+        duration = end_ts - start_ts
+        self._prefix.insert(position + 1, self._prefix[position] + duration)
+        for index in range(position + 2, len(self._prefix)):
+            self._prefix[index] += duration
+        self._windows[assignment_id] = (start_ts, end_ts)
+
+    def remove(self, assignment_id: int) -> None:
+        window = self._windows.pop(assignment_id, None)
+        if window is None:
+            return
+        position = bisect_left(self._starts, window[0])
+        while self._ids[position] != assignment_id:
+            position += 1
+        del self._starts[position], self._ends[position], self._ids[position]
+        del self._prefix[position + 1]
+        duration = window[1] - window[0]
+        for index in range(position + 1, len(self._prefix)):
+            self._prefix[index] -= duration
+
+    def starts_between(self, start: datetime, end: datetime) -> list[datetime]:
+        """Return the booking starts falling inside ``[start, end]``."""
+
+        first = bisect_left(self._starts, _epoch(start))
+        last = bisect_right(self._starts, _epoch(end))
+        return [datetime.fromtimestamp(value, tz=UTC) for value in self._starts[first:last]]
+
+    def ends_between(self, start: datetime, end: datetime) -> list[datetime]:
+        """Return the booking ends falling inside ``[start, end]``."""
+
+        first = bisect_left(self._ends, _epoch(start))
+        last = bisect_right(self._ends, _epoch(end))
+        return [datetime.fromtimestamp(value, tz=UTC) for value in self._ends[first:last]]
+
+    def worked_seconds(
+        self, start: datetime, end: datetime, *, exclude: int | None = None
+    ) -> float:
+        """Return booked seconds inside ``[start, end)``, optionally ignoring one booking."""
+
+        start_ts, end_ts = _epoch(start), _epoch(end)
+        first = bisect_left(self._starts, start_ts)
+        last = bisect_left(self._starts, end_ts)
+        total = self._prefix[last] - self._prefix[first]
+        if last > first and self._ends[last - 1] > end_ts:
+            total -= self._ends[last - 1] - end_ts
+        if first > 0 and self._ends[first - 1] > start_ts:
+            total += min(self._ends[first - 1], end_ts) - start_ts
+        if exclude is not None and exclude in self._windows:
+            excluded_start, excluded_end = self._windows[exclude]
+            total -= max(0.0, min(excluded_end, end_ts) - max(excluded_start, start_ts))
+        return total
+
+
+class WorkloadLedger:
+    """Process-level cache of per-collaborator workload arrays.
+
+    Ledgers are loaded once per collaborator (one query for a batch) and then
+    kept current by the assignment services, which record every booking they
+    add or remove. Those changes stay in the session until it commits: the
+    session sees them on top of the cached ledgers, other sessions only once
+    they are committed, when they are applied to copies of the cached arrays
+    (cached ledgers are never changed in place). A rolled back or abandoned
+    transaction simply drops its changes. The TTL bounds staleness for writes
+    made by other worker processes.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._entries: dict[int, tuple[float, CollaboratorWorkload]] = {}
+        self._lock = Lock()
+
+    def get_many(
+        self, session: Session, collaborator_ids: Iterable[int]
+    ) -> dict[int, CollaboratorWorkload]:
+        now = time.monotonic()
+        pending: dict[int, dict[int, tuple[datetime, datetime] | None]] = session.info.get(
+            _PENDING_BOOKINGS, {}
+        )
+        resets: set[int] = session.info.get(_RESET_COLLABORATORS, set())
+        ledgers: dict[int, CollaboratorWorkload] = {}
+        missing: set[int] = set()
+        for collaborator_id in set(collaborator_ids):
+            entry = self._entries.get(collaborator_id)
+            if (
+                collaborator_id not in resets
+                and entry is not None
+                and now - entry[0] < self._ttl_seconds
+            ):
+                ledgers[collaborator_id] = entry[1]
+            else:
+                missing.add(collaborator_id)
+        if missing:
+            loaded = self._load(session, missing)
+            # Rows read by a session that changed them may not be committed.
+            cacheable = {
+                collaborator_id: ledger
+                for collaborator_id, ledger in loaded.items()
+                if collaborator_id not in pending and collaborator_id not in resets
+            }
+            with self._lock:
+                for collaborator_id, ledger in cacheable.items():
+                    self._entries[collaborator_id] = (now, ledger)
+            ledgers.update(loaded)
+        for collaborator_id, ledger in ledgers.items():
+            changes = pending.get(collaborator_id)
+            if changes:
+                ledgers[collaborator_id] = ledger.with_changes(changes)
+        return ledgers
+
+    def record(
+        self,
+        session: Session,
+        collaborator_id: int,
+        assignment_id: int,
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        """Add or move a booking as part of ``session``'s transaction."""
+
+        self._changes(session, collaborator_id)[assignment_id] = (start, end)
+
+    def discard(self, session: Session, collaborator_id: int, assignment_id: int) -> None:
+        self._changes(session, collaborator_id)[assignment_id] = None
+
+    def reset(self, session: Session, collaborator_ids: Iterable[int]) -> None:
+        """Reload ledgers whose bookings moved in bulk (e.g. a shift was rescheduled)."""
+
+        session.info.setdefault(_RESET_COLLABORATORS, set()).update(collaborator_ids)
+
+    def invalidate(self, collaborator_ids: Iterable[int]) -> None:
+        with self._lock:
+            for collaborator_id in collaborator_ids:
+                self._entries.pop(collaborator_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def apply_committed(self, session: Session) -> None:
+        """Apply the booking changes of a transaction ``session`` just committed."""
+
+        pending = session.info.pop(_PENDING_BOOKINGS, {})
+        resets = session.info.pop(_RESET_COLLABORATORS, set())
+        with self._lock:
+            for collaborator_id in resets:
+                self._entries.pop(collaborator_id, None)
+            for collaborator_id, changes in pending.items():
+                entry = self._entries.get(collaborator_id)
+                if entry is not None and collaborator_id not in resets:
+                    self._entries[collaborator_id] = (entry[0], entry[1].with_changes(changes))
+
+    @staticmethod
+    def _changes(
+        session: Session, collaborator_id: int
+    ) -> dict[int, tuple[datetime, datetime] | None]:
+        pending: dict[int, dict[int, tuple[datetime, datetime] | None]] = session.info.setdefault(
+            _PENDING_BOOKINGS, {}
+        )
+        return pending.setdefault(collaborator_id, {})
+
+    @staticmethod
+    def _load(session: Session, collaborator_ids: set[int]) -> dict[int, CollaboratorWorkload]:
+        bookings: dict[int, list[tuple[int, datetime, datetime]]] = defaultdict(list)
+        for collaborator_id, assignment_id, start, end in session.execute(
+            select(
+                db_models.Assignment.collaborator_id,
+                db_models.Assignment.id,
+                db_models.ShiftInstance.start_utc,
+                db_models.ShiftInstance.end_utc,
+            )
+            .join(
+                db_models.ShiftInstance,
+                db_models.Assignment.shift_instance_id == db_models.ShiftInstance.id,
+            )
+            .where(
+                db_models.Assignment.collaborator_id.in_(collaborator_ids),
+                db_models.ShiftInstance.status != "cancelled",
+            )
+        ):
+            bookings[collaborator_id].append((assignment_id, start, end))
+        return {
+            collaborator_id: CollaboratorWorkload(bookings.get(collaborator_id, ()))
+            for collaborator_id in collaborator_ids
+        }
+
+
+workload_ledger = WorkloadLedger(ttl_seconds=settings.workload_ledger_ttl_seconds)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_workloads(session: Session) -> None:
+    workload_ledger.apply_committed(session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_uncommitted_workloads(session: Session, transaction: SessionTransaction) -> None:
+    # After a commit the changes were already applied; otherwise they are void.
+    if transaction.parent is None:
+        session.info.pop(_PENDING_BOOKINGS, None)
+        session.info.pop(_RESET_COLLABORATORS, None)
@@ -11,7 +11,10 @@ import app.db.models.planning as _planning_models  # noqa: F401, E402
 from app.db import base  # noqa: E402
 from app.db.session import SessionLocal, engine, get_session  # noqa: E402
 from app.main import app  # noqa: E402
+from app.services.blackout_catalog import blackout_catalog  # noqa: E402
 from app.services.registry import db  # noqa: E402
+from app.services.rule_catalog import rule_catalog  # noqa: E402
+from app.services.workload import workload_ledger  # noqa: E402
 
 
 def _override_get_session() -> Generator[Session, None, None]:
@@ -25,6 +28,9 @@ def _override_get_session() -> Generator[Session, None, None]:
 @pytest.fixture(autouse=True)
 def clean_database() -> None:
     db.reset()
+    rule_catalog.clear()
+    blackout_catalog.clear()
+    workload_ledger.clear()
     base.Base.metadata.drop_all(bind=engine)
     base.Base.metadata.create_all(bind=engine)
 
@@ -0,0 +1,222 @@
+from datetime import UTC, datetime, timedelta
+from itertools import islice, permutations
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from app.services.intervals import Interval, IntervalIndex
+from app.services.matching import min_cost_assignment
+from app.services.planning_scan import (
+    BookingArrays,
+    WindowArrays,
+    booking_pairs,
+    bucket_means,
+    capacity_overruns,
+    coverage_curve,
+    window_overlaps,
+)
+from app.services.recurrence import RecurrenceRule
+from app.services.workload import CollaboratorWorkload
+
+
+def test_interval_index_returns_overlaps_in_start_order() -> None:
+    base = datetime(2030, 1, 1, tzinfo=UTC)
+    index = IntervalIndex(
+        Interval(
+            start=base + timedelta(hours=offset),
+            end=base + timedelta(hours=offset + length),
+            payload=offset,
+        )
+        for offset, length in [(9, 1), (0, 48), (2, 2), (5, 1), (12, 3)]
+    )
+
+    matches = index.overlapping(base + timedelta(hours=3), base + timedelta(hours=6))
+
+    assert [interval.payload for interval in matches] == [0, 2, 5]
+    assert index.overlapping(base + timedelta(hours=60), base + timedelta(hours=61)) == []
+    assert len(index) == 5
+
+
+def test_scan_engine_flags_overlaps_rests_and_leave() -> None:
+    hour = 3600
+    bookings = BookingArrays(
+        assignment_ids=np.array([10, 11, 12, 13, 14], dtype=np.int64),
+        shift_ids=np.array([1, 2, 3, 4, 4], dtype=np.int64),
+        collaborator_ids=np.array([7, 7, 7, 8, 9], dtype=np.int64),
+        starts=np.array([0, 10, 2, 30, 30], dtype=np.int64) * hour,
+        ends=np.array([8, 12, 4, 32, 32], dtype=np.int64) * hour,
+        capacities=np.array([1, 1, 1, 1, 1], dtype=np.int64),
+    )
+
+    pairs = booking_pairs(bookings, min_rest_seconds=3 * hour)
+    leave = window_overlaps(
+        bookings,
+        WindowArrays(
+            collaborator_ids=np.array([8, 7], dtype=np.int64),
+            starts=np.array([31, 40], dtype=np.int64) * hour,
+            ends=np.array([40, 50], dtype=np.int64) * hour,
+        ),
+    )
+    overruns = capacity_overruns(bookings)
+
+    # Each close pair is reported from both sides, with the gap seen from ``rows``.
+    assert sorted(
+        zip(pairs.rows.tolist(), pairs.others.tolist(), pairs.values.tolist(), strict=True)
+    ) == [(0, 1, 2 * hour), (0, 2, -6 * hour), (1, 0, 2 * hour), (2, 0, -4 * hour)]
+    assert leave.rows.tolist() == [3]
+    assert (overruns.rows.tolist(), overruns.values.tolist()) == ([3], [2])
+
+
+def test_booking_pairs_report_every_overlap_of_a_triple() -> None:
+    hour = 3600
+    bookings = BookingArrays(
+        assignment_ids=np.array([1, 2, 3, 4], dtype=np.int64),
+        shift_ids=np.array([1, 2, 3, 4], dtype=np.int64),
+        collaborator_ids=np.array([5, 5, 5, 6], dtype=np.int64),
+        starts=np.array([0, 1, 2, 0], dtype=np.int64) * hour,
+        ends=np.array([4, 5, 3, 1], dtype=np.int64) * hour,
+        capacities=np.array([1, 1, 1, 1], dtype=np.int64),
+    )
+
+    pairs = booking_pairs(bookings, min_rest_seconds=0)
+
+    assert sorted(
+        zip(pairs.rows.tolist(), pairs.others.tolist(), pairs.values.tolist(), strict=True)
+    ) == [
+        (0, 1, -3 * hour),
+        (0, 2, -2 * hour),
+        (1, 0, -5 * hour),
+        (1, 2, -3 * hour),
+        (2, 0, -3 * hour),
+        (2, 1, -2 * hour),
+    ]
+
+
+def test_coverage_sweep_matches_point_evaluation() -> None:
+    rng = np.random.default_rng(3)
+    size = 400
+    groups = rng.integers(0, 5, size)
+    starts = rng.integers(0, 96, size) * 900
+    ends = starts + rng.integers(1, 40, size) * 900
+    required = rng.integers(1, 4, size)
+    staffed = rng.integers(0, 4, size)
+
+    curve = coverage_curve(groups, starts, ends, required, staffed)
+
+    for group in range(5):
+        points = curve.groups == group
+        times = curve.times[points]
+        assert np.all(np.diff(times) > 0)
+        assert curve.required[points][-1] == 0 and curve.staffed[points][-1] == 0
+        for probe in range(0, 140 * 900, 450):
+            active = (groups == group) & (starts <= probe) & (ends > probe)
+            step = np.searchsorted(times, probe, side="right") - 1
+            expected = (int(required[active].sum()), int(staffed[active].sum()))
+            got = (0, 0) if step < 0 else (
+                int(curve.required[points][step]),
+                int(curve.staffed[points][step]),
+            )
+            assert got == expected, (group, probe)
+
+    means = bucket_means(
+        np.array([100, 160, 220], dtype=np.int64),
+        np.array([2, 3, 0], dtype=np.int64),
+        origin=70,
+        end=250,
+        width=60,
+    )
+    assert means.tolist() == [1.0, 2.5, 1.5]
+
+
+def test_workload_ledger_window_sums_follow_incremental_writes() -> None:
+    base = datetime(2030, 1, 1, tzinfo=UTC)
+
+    def booking(offset: int, hours: int) -> tuple[datetime, datetime]:
+        return base + timedelta(hours=offset), base + timedelta(hours=offset + hours)
+
+    workload = CollaboratorWorkload(
+        [(1, *booking(0, 8)), (2, *booking(24, 8)), (3, *booking(48, 8))]
+    )
+    workload.add(4, *booking(12, 4))
+    workload.add(2, *booking(30, 6))
+    workload.remove(3)
+
+    def hours(start: int, end: int, *, exclude: int | None = None) -> float:
+        seconds = workload.worked_seconds(
+            base + timedelta(hours=start), base + timedelta(hours=end), exclude=exclude
+        )
+        return seconds / 3600
+
+    assert len(workload) == 3
+    assert hours(0, 168) == 18
+    assert hours(4, 14) == 6
+    assert hours(2, 3) == 1
+    assert hours(0, 168, exclude=4) == 14
+    assert hours(40, 60) == 0
+
+
+def test_recurrence_rule_skips_ahead_without_changing_occurrences() -> None:
+    dtstart = datetime(2031, 3, 26, 8, tzinfo=ZoneInfo("Europe/Paris"))  # a Wednesday
+    weekly = RecurrenceRule.parse("RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE,FR;COUNT=7")
+    assert [start.strftime("%a %d/%m %H:%M%z") for start in weekly.occurrences(dtstart)] == [
+        "Wed 26/03 08:00+0100",
+        "Fri 28/03 08:00+0100",
+        "Mon 07/04 08:00+0200",
+        "Wed 09/04 08:00+0200",
+        "Fri 11/04 08:00+0200",
+        "Mon 21/04 08:00+0200",
+        "Wed 23/04 08:00+0200",
+    ]
+
+    for text in (
+        "FREQ=DAILY;INTERVAL=3",
+        "FREQ=WEEKLY;BYDAY=TU,SA;COUNT=40",
+        "FREQ=WEEKLY;INTERVAL=3;UNTIL=20350101T000000Z",
+        "FREQ=DAILY;UNTIL=20311015",
+    ):
+        rule = RecurrenceRule.parse(text)
+        every = list(islice(rule.occurrences(dtstart), 200))
+        for since in (every[0], every[17] - timedelta(hours=1), every[-5]):
+            assert list(islice(rule.occurrences(dtstart, since=since), 5)) == [
+                start for start in every if start >= since
+            ][:5]
+
+    until = RecurrenceRule.parse("FREQ=DAILY;UNTIL=20310330")
+    assert [start.astimezone(UTC).hour for start in until.occurrences(dtstart)] == [7, 7, 7, 7, 6]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "FREQ=MONTHLY",
+        "BYDAY=MO",
+        "FREQ=DAILY;BYDAY=MO",
+        "FREQ=WEEKLY;BYDAY=XX",
+        "FREQ=DAILY;INTERVAL=0",
+        "FREQ=DAILY;COUNT=2;UNTIL=20310101",
+        "FREQ=DAILY;BYMONTH=1",
+        "FREQ=DAILY;UNTIL=tomorrow",
+    ],
+)
+def test_recurrence_rule_rejects_unsupported_rules(text: str) -> None:
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse(text)
+
+
+def test_min_cost_assignment_matches_brute_force() -> None:
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        rows = int(rng.integers(1, 5))
+        costs = rng.integers(-5, 20, size=(rows, int(rng.integers(rows, 7)))).astype(float)
+
+        matched = min_cost_assignment(costs)
+
+        assert len(set(matched.tolist())) == rows
+        best = min(
+            sum(costs[row, column] for row, column in enumerate(choice))
+            for choice in permutations(range(costs.shape[1]), rows)
+        )
+        assert costs[np.arange(rows), matched].sum() == best
+    with pytest.raises(ValueError):
+        min_cost_assignment(np.zeros((3, 2)))
@@ -1,10 +1,36 @@
+import json
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from datetime import UTC, datetime, timedelta
+from typing import Any
 from uuid import uuid4
 
+import httpx
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db.models import planning as db_models
+from app.db.session import SessionLocal, engine
+from app.models.planning_pro import (
+    Assignment,
+    AssignmentCreate,
+    ShiftInstanceCreate,
+    ShiftInstanceUpdate,
+)
+from app.services import auto_assign, auto_assign_jobs, planning_pro
+from app.services.conflict_maintenance import ConflictMaintenanceService
+from app.services.errors import StaleVersionError
+from app.services.planning_pro import (
+    BOARD_QUERY_BUDGET,
+    RuleService,
+    ShiftInstanceService,
+)
+from app.services.workload import workload_ledger
 
 
 def _setup_org_role_site(
@@ -320,6 +346,17 @@ def test_audit_contains_before_and_after(client: TestClient, session: Session) -
     assert payloads[0]["after"]["status"] == "published"
 
 
+def _wait_for_job(client: TestClient, job_id: str) -> dict[str, Any]:
+    deadline = time.monotonic() + 30
+    while True:
+        response = client.get(f"/api/v1/planning/auto-assign/status/{job_id}")
+        assert response.status_code == 200
+        job: dict[str, Any] = response.json()
+        if job["status"] not in {"queued", "running"} or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
 def test_auto_assign_job_status(client: TestClient, session: Session) -> None:
     org, role, site = _setup_org_role_site(session)
     mission_start = datetime.now(UTC)
@@ -343,12 +380,1629 @@ def test_auto_assign_job_status(client: TestClient, session: Session) -> None:
     assert shift_response.status_code == 201
 
     job_start = client.post("/api/v1/planning/auto-assign/start", json={})
-    assert job_start.status_code == 200
+    assert job_start.status_code == 202
     job_body = job_start.json()
     assert job_body["job_id"]
+    assert job_body["status"] in {"queued", "running"}
 
-    status_response = client.get(f"/api/v1/planning/auto-assign/status/{job_body['job_id']}")
-    assert status_response.status_code == 200
-    status_payload = status_response.json()
+    status_payload = _wait_for_job(client, job_body["job_id"])
     assert status_payload["assignments_created"] >= 0
     assert status_payload["status"] == "completed"
+    assert status_payload["progress"] == 100
+
+
+def _post_shift(
+    client: TestClient,
+    mission: db_models.Mission,
+    start: datetime,
+    end: datetime,
+    *,
+    status: str = "draft",
+    capacity: int = 1,
+) -> dict[str, Any]:
+    response = client.post(
+        "/api/v1/planning/shifts",
+        json={
+            "mission_id": mission.id,
+            "template_id": None,
+            "site_id": mission.site_id,
+            "role_id": mission.role_id,
+            "team_id": None,
+            "start_utc": start.isoformat(),
+            "end_utc": end.isoformat(),
+            "status": status,
+            "source": "manual",
+            "capacity": capacity,
+        },
+    )
+    assert response.status_code == 201, response.text
+    shift: dict[str, Any] = response.json()["shift"]
+    return shift
+
+
+def _post_assignment(
+    client: TestClient, shift: dict[str, Any], collaborator: db_models.Collaborator
+) -> dict[str, Any]:
+    response = client.post(
+        "/api/v1/planning/assignments",
+        json={
+            "shift_instance_id": shift["id"],
+            "collaborator_id": collaborator.id,
+            "role_id": shift["role_id"],
+            "status": "confirmed",
+            "source": "manual",
+        },
+    )
+    assert response.status_code == 201, response.text
+    payload: dict[str, Any] = response.json()
+    return payload
+
+
+def test_rest_conflicts_only_consider_neighbouring_bookings(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2030, 3, 4, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+
+    morning = _post_shift(client, mission, start, start + timedelta(hours=2))
+    next_day = _post_shift(
+        client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=2)
+    )
+    _post_assignment(client, morning, collaborator)
+    _post_assignment(client, next_day, collaborator)
+
+    cancelled = _post_shift(
+        client, mission, start + timedelta(hours=3), start + timedelta(hours=4)
+    )
+    _post_assignment(client, cancelled, collaborator)
+    client.put(f"/api/v1/planning/shifts/{cancelled['id']}", json={"status": "cancelled"})
+
+    late_morning = _post_shift(
+        client, mission, start + timedelta(hours=2, minutes=30), start + timedelta(hours=4)
+    )
+    payload = _post_assignment(client, late_morning, collaborator)
+
+    rules = [(entry["rule"], entry["details"]) for entry in payload["conflicts"]]
+    assert ("min_rest", {"minutes_gap": 30}) in rules
+    assert all(rule != "double_booking" for rule, _ in rules)
+    assert sum(1 for rule, _ in rules if rule == "min_rest") == 1
+
+
+@contextmanager
+def _count_statements() -> Iterator[list[str]]:
+    statements: list[str] = []
+
+    def _record(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def test_board_listing_evaluates_conflicts_in_constant_queries(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2030, 5, 6, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    first = _post_shift(client, mission, start, start + timedelta(hours=2))
+    overlapping = _post_shift(
+        client, mission, start + timedelta(hours=1), start + timedelta(hours=3)
+    )
+    _post_assignment(client, first, collaborator)
+    _post_assignment(client, overlapping, collaborator)
+    window = {
+        "start": start.isoformat(),
+        "end": (start + timedelta(days=14)).isoformat(),
+    }
+
+    with _count_statements() as small_board:
+        response = client.get("/api/v1/planning/shift-instances", params=window)
+    conflicts = {item["shift"]["id"]: item["conflicts"] for item in response.json()}
+    assert {
+        "type": "hard",
+        "rule": "double_booking",
+        "details": {"other_shift_id": first["id"]},
+    } in conflicts[overlapping["id"]]
+
+    for day in range(1, 10):
+        shift = _post_shift(
+            client, mission, start + timedelta(days=day), start + timedelta(days=day, hours=2)
+        )
+        _post_assignment(client, shift, collaborator)
+    with _count_statements() as large_board:
+        response = client.get("/api/v1/planning/shift-instances", params=window)
+    assert len(response.json()) == 11
+    assert len(large_board) == len(small_board)
+
+
+def test_stored_conflicts_follow_neighbouring_writes(client: TestClient, session: Session) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2030, 6, 3, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    first = _post_shift(client, mission, start, start + timedelta(hours=2))
+    second = _post_shift(client, mission, start + timedelta(hours=1), start + timedelta(hours=3))
+    _post_assignment(client, first, collaborator)
+    second_assignment = _post_assignment(client, second, collaborator)["assignment"]
+    window = {"start": start.isoformat(), "end": (start + timedelta(days=1)).isoformat()}
+
+    def _rules_by_shift() -> dict[int, set[str]]:
+        response = client.get("/api/v1/planning/shift-instances", params=window)
+        return {
+            item["shift"]["id"]: {entry["rule"] for entry in item["conflicts"]}
+            for item in response.json()
+        }
+
+    assert "double_booking" in _rules_by_shift()[first["id"]]
+
+    client.delete(f"/api/v1/planning/assignments/{second_assignment['id']}")
+    assert "double_booking" not in _rules_by_shift()[first["id"]]
+
+    leave = client.post(
+        "/api/v1/planning/availability",
+        json={
+            "collaborator_id": collaborator.id,
+            "start_utc": start.isoformat(),
+            "end_utc": (start + timedelta(hours=1)).isoformat(),
+            "is_available": False,
+            "reason": "sick",
+        },
+    )
+    assert leave.status_code == 201
+    assert "leave" in _rules_by_shift()[first["id"]]
+
+
+def test_rule_catalog_serves_configured_rest_without_rule_queries(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    rest_rule = db_models.HrRule(
+        organization_id=org.id, code="rest_minimum", severity="soft", config={"hours": 3}
+    )
+    session.add(rest_rule)
+    session.commit()
+    start = datetime(2030, 7, 1, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    first = _post_shift(client, mission, start, start + timedelta(hours=2))
+    _post_assignment(client, first, collaborator)
+
+    later = _post_shift(client, mission, start + timedelta(hours=4), start + timedelta(hours=5))
+    with _count_statements() as statements:
+        payload = _post_assignment(client, later, collaborator)
+    assert {"type": "soft", "rule": "min_rest", "details": {"minutes_gap": 120}} in (
+        payload["conflicts"]
+    )
+    assert not [sql for sql in statements if "hr_rules" in sql or "conflict_rules" in sql]
+
+    rest_rule.config = {"hours": 1}
+    session.commit()
+    next_day = _post_shift(
+        client, mission, start + timedelta(hours=7), start + timedelta(hours=8)
+    )
+    payload = _post_assignment(client, next_day, collaborator)
+    assert all(entry["rule"] != "min_rest" for entry in payload["conflicts"])
+
+
+def test_organization_validation_scan_reports_paginated_violations(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    alice = _create_collaborator(session, org, role)
+    bob = _create_collaborator(session, org, role)
+    start = datetime(2030, 8, 1, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    morning = _post_shift(client, mission, start, start + timedelta(hours=4))
+    overlapping = _post_shift(
+        client, mission, start + timedelta(hours=2), start + timedelta(hours=6)
+    )
+    evening = _post_shift(
+        client, mission, start + timedelta(hours=6, minutes=30), start + timedelta(hours=9)
+    )
+    for shift in (morning, overlapping, evening):
+        _post_assignment(client, shift, alice)
+    _post_assignment(client, evening, bob)
+    client.post(
+        "/api/v1/planning/availability",
+        json={
+            "collaborator_id": bob.id,
+            "start_utc": (start + timedelta(hours=7)).isoformat(),
+            "end_utc": (start + timedelta(days=2)).isoformat(),
+            "is_available": False,
+            "reason": "leave",
+        },
+    )
+
+    response = client.get(
+        "/api/v1/planning/validation",
+        params={"organization_id": org.id, "page_size": 2},
+    )
+
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["summary"]["assignments_scanned"] == 4
+    # Both bookings of a close pair are reported, as assignment checks do.
+    assert report["summary"]["by_rule"] == {
+        "double_booking": 2,
+        "min_rest": 4,
+        "leave": 1,
+        "capacity_exceeded": 1,
+    }
+    assert report["summary"]["hard"] == 8
+    violations = report["violations"]
+    assert violations["total"] == 8
+    assert violations["items"] == [
+        {
+            "type": "hard",
+            "rule": "double_booking",
+            "details": {"other_shift_id": overlapping["id"]},
+            "shift_instance_id": morning["id"],
+            "assignment_id": violations["items"][0]["assignment_id"],
+            "collaborator_id": alice.id,
+        },
+        {
+            "type": "hard",
+            "rule": "min_rest",
+            "details": {"minutes_gap": -120},
+            "shift_instance_id": morning["id"],
+            "assignment_id": violations["items"][0]["assignment_id"],
+            "collaborator_id": alice.id,
+        },
+    ]
+
+
+def test_site_blackouts_flag_shifts_and_refresh_stored_conflicts(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2030, 9, 1, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4))
+    _post_assignment(client, shift, collaborator)
+
+    response = client.post(
+        "/api/v1/planning/blackouts",
+        json={
+            "site_id": site.id,
+            "start_utc": (start + timedelta(hours=3)).isoformat(),
+            "end_utc": (start + timedelta(hours=12)).isoformat(),
+            "reason": "inventory",
+        },
+    )
+    assert response.status_code == 201, response.text
+    blackout_id = response.json()["id"]
+    expected = {
+        "type": "hard",
+        "rule": "site_blackout",
+        "details": {"blackout_id": blackout_id, "reason": "inventory"},
+    }
+    board = client.get("/api/v1/planning/shifts", params={"mission_id": mission.id}).json()
+    assert board[0]["conflicts"].count(expected) == 1
+    days = client.get(
+        "/api/v1/planning/board-days",
+        params={"organization_id": org.id, "start": "2030-09-01", "end": "2030-09-02"},
+    ).json()
+    assert [day["hard_conflicts"] for day in days] == [1]
+
+    candidates = [
+        ShiftInstanceCreate(
+            mission_id=mission.id,
+            site_id=site.id,
+            role_id=role.id,
+            start_utc=start + timedelta(hours=offset),
+            end_utc=start + timedelta(hours=offset + 1),
+        )
+        for offset in range(0, 48, 2)
+    ]
+    with _count_statements() as statements:
+        results = RuleService(session).blackout_conflicts(candidates)
+        RuleService(session).blackout_conflicts(candidates)
+    assert len(statements) == 1
+    assert [bool(entries) for entries in results] == [
+        offset + 1 > 3 and offset < 12 for offset in range(0, 48, 2)
+    ]
+    # Assignment checks still report the blackout of their shift.
+    preview = client.post(
+        "/api/v1/planning/conflicts/preview", json={"assignments": board[0]["assignments"]}
+    )
+    assert expected in preview.json()[0]["conflicts"]
+
+    assert client.delete(f"/api/v1/planning/blackouts/{blackout_id}").status_code == 204
+    board = client.get("/api/v1/planning/shifts", params={"mission_id": mission.id}).json()
+    assert expected not in board[0]["conflicts"]
+
+
+def test_working_time_limits_use_configured_daily_and_weekly_caps(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    session.add_all(
+        [
+            db_models.HrRule(organization_id=org.id, code="max_hours_day", config={"hours": 10}),
+            db_models.HrRule(
+                organization_id=org.id,
+                code="max_hours_week",
+                severity="soft",
+                config={"hours": 24},
+            ),
+        ]
+    )
+    session.commit()
+    start = datetime(2030, 10, 7, 6, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+
+    def book(day: int, begin: int, end: int) -> dict[str, Any]:
+        shift = _post_shift(
+            client,
+            mission,
+            start + timedelta(days=day, hours=begin),
+            start + timedelta(days=day, hours=end),
+        )
+        return _post_assignment(client, shift, collaborator)
+
+    def working_time_rules(payload: dict[str, Any]) -> list[str]:
+        return [entry["rule"] for entry in payload["conflicts"] if entry["rule"].startswith("max_")]
+
+    for day in range(3):
+        assert working_time_rules(book(day, 0, 7)) == []
+    late = book(0, 9, 13)
+    assert {
+        "type": "hard",
+        "rule": "max_hours_day",
+        "details": {"day": "2030-10-07", "limit_hours": 10.0, "worked_hours": 11.0},
+    } in late["conflicts"]
+    assert {
+        "type": "soft",
+        "rule": "max_hours_week",
+        "details": {"limit_hours": 24.0, "worked_hours": 25.0},
+    } in late["conflicts"]
+
+    response = client.delete(f"/api/v1/planning/assignments/{late['assignment']['id']}")
+    assert response.status_code == 204
+    assert working_time_rules(book(3, 0, 3)) == []
+
+
+def test_rule_changes_refresh_stored_conflicts(client: TestClient, session: Session) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2030, 10, 14, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    first = _post_shift(client, mission, start, start + timedelta(hours=2))
+    second = _post_shift(
+        client, mission, start + timedelta(hours=2, minutes=30), start + timedelta(hours=4)
+    )
+    _post_assignment(client, first, collaborator)
+    _post_assignment(client, second, collaborator)
+
+    def stored_rules() -> list[str]:
+        session.expire_all()
+        return list(
+            session.scalars(
+                select(db_models.PlanningConflict.rule).where(
+                    db_models.PlanningConflict.shift_instance_id.in_([first["id"], second["id"]])
+                )
+            )
+        )
+
+    assert stored_rules().count("min_rest") == 2
+    rest = db_models.HrRule(organization_id=org.id, code="min_rest", config={"minutes": 15})
+    session.add(rest)
+    session.commit()
+    assert "min_rest" not in stored_rules()
+
+    rest.config = {"hours": 2}
+    session.commit()
+    assert stored_rules().count("min_rest") == 2
+
+
+def test_workload_ledger_shares_committed_bookings_only(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2030, 10, 21, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4))
+    other = SessionLocal()
+
+    def booked(reader: Session) -> int:
+        return len(workload_ledger.get_many(reader, [collaborator.id])[collaborator.id])
+
+    try:
+        cached = workload_ledger.get_many(other, [collaborator.id])[collaborator.id]
+        workload_ledger.record(session, collaborator.id, -1, start, start + timedelta(hours=4))
+        assert (booked(session), booked(other)) == (1, 0)
+        # Closing without commit (no rollback event) leaves nothing behind.
+        session.close()
+        assert (booked(session), booked(other)) == (0, 0)
+
+        _post_assignment(client, shift, collaborator)
+        assert booked(other) == 1
+        assert len(cached) == 0
+    finally:
+        other.close()
+
+
+def test_assigned_count_tracks_writes_and_filters_understaffed_shifts(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    alice = _create_collaborator(session, org, role)
+    bob = _create_collaborator(session, org, role)
+    start = datetime(2030, 11, 4, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    pair = _post_shift(client, mission, start, start + timedelta(hours=4), capacity=2)
+    solo = _post_shift(
+        client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=4)
+    )
+    _post_assignment(client, pair, alice)
+    _post_assignment(client, solo, alice)
+
+    def listed(understaffed: bool) -> dict[int, int]:
+        response = client.get(
+            "/api/v1/planning/shift-instances", params={"understaffed": understaffed}
+        )
+        assert response.status_code == 200, response.text
+        return {view["shift"]["id"]: view["shift"]["assigned_count"] for view in response.json()}
+
+    assert listed(understaffed=True) == {pair["id"]: 1}
+    assert listed(understaffed=False) == {solo["id"]: 1}
+
+    with _count_statements() as statements:
+        response = client.post(
+            "/api/v1/planning/conflicts/preview",
+            json={
+                "assignments": [
+                    {
+                        "shift_instance_id": solo["id"],
+                        "collaborator_id": bob.id,
+                        "role_id": role.id,
+                    }
+                ]
+            },
+        )
+    assert {
+        "type": "hard",
+        "rule": "capacity_exceeded",
+        "details": {"capacity": 1, "attempted": 2},
+    } in response.json()[0]["conflicts"]
+    assert not [sql for sql in statements if "count(" in sql.lower()]
+
+    assignment = _post_assignment(client, pair, bob)["assignment"]
+    assert listed(understaffed=True) == {}
+    client.delete(f"/api/v1/planning/assignments/{assignment['id']}")
+    assert listed(understaffed=True) == {pair["id"]: 1}
+
+
+def test_validation_pushdown_matches_array_scan(client: TestClient, session: Session) -> None:
+    org, role, site = _setup_org_role_site(session)
+    alice = _create_collaborator(session, org, role)
+    bob = _create_collaborator(session, org, role)
+    start = datetime(2030, 12, 2, 6, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    layout = [
+        (alice, 0, 12),
+        (alice, 2, 4),
+        (alice, 5, 7),
+        (alice, 12, 13),
+        (alice, 13.5, 15),
+        (bob, 3, 6),
+        (bob, 6, 8),
+        (bob, 30, 32),
+        (bob, 40, 44),
+        (bob, 41, 45),
+        (bob, 42, 43),
+    ]
+    assignments = []
+    for collaborator, begin, finish in layout:
+        shift = _post_shift(
+            client, mission, start + timedelta(hours=begin), start + timedelta(hours=finish)
+        )
+        assignments.append(_post_assignment(client, shift, collaborator)["assignment"])
+    cancelled = _post_shift(
+        client, mission, start + timedelta(hours=31), start + timedelta(hours=33)
+    )
+    _post_assignment(client, cancelled, bob)
+    client.put(f"/api/v1/planning/shifts/{cancelled['id']}", json={"status": "cancelled"})
+
+    def report(pushdown: bool, **window: str) -> dict[str, Any]:
+        response = client.get(
+            "/api/v1/planning/validation",
+            params={"organization_id": org.id, "pushdown": pushdown, "page_size": 500, **window},
+        )
+        assert response.status_code == 200, response.text
+        payload: dict[str, Any] = response.json()
+        return payload
+
+    pushed = report(True)
+    assert pushed == report(False)
+    assert pushed["summary"]["by_rule"] == {"double_booking": 10, "min_rest": 16}
+
+    # Every booking gets the entries an assignment check reports for it.
+    def entries(items: list[dict[str, Any]]) -> list[tuple[str, str, str]]:
+        return sorted((item["rule"], item["type"], json.dumps(item["details"])) for item in items)
+
+    rule_service = RuleService(session)
+    for assignment in assignments:
+        checked = rule_service.evaluate_assignment(Assignment.model_validate(assignment))
+        reported = [
+            item
+            for item in pushed["violations"]["items"]
+            if item["assignment_id"] == assignment["id"]
+        ]
+        assert entries(reported) == entries(
+            [
+                entry.model_dump()
+                for entry in checked
+                if entry.rule in {"double_booking", "min_rest"}
+            ]
+        ), assignment
+    window = {
+        "start": (start + timedelta(hours=12, minutes=30)).isoformat(),
+        "end": (start + timedelta(hours=20)).isoformat(),
+    }
+    assert report(True, **window) == report(False, **window)
+    assert report(True, **window)["summary"]["by_rule"] == {"min_rest": 3}
+
+
+def test_double_booking_constraint_rejects_overlapping_writes(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "double_booking_constraint", True)
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 1, 6, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    morning = _post_shift(client, mission, start, start + timedelta(hours=4))
+    overlapping = _post_shift(
+        client, mission, start + timedelta(hours=1), start + timedelta(hours=2)
+    )
+    afternoon = _post_shift(
+        client, mission, start + timedelta(hours=5), start + timedelta(hours=8)
+    )
+    booked = _post_assignment(client, morning, collaborator)
+    _post_assignment(client, afternoon, collaborator)
+
+    payload = {
+        "shift_instance_id": overlapping["id"],
+        "collaborator_id": collaborator.id,
+        "role_id": overlapping["role_id"],
+        "status": "confirmed",
+        "source": "manual",
+    }
+    response = client.post("/api/v1/planning/assignments", json=payload)
+    assert response.status_code == 409
+    assert response.json()["code"] == "conflict"
+    session.expire_all()
+    stored = session.get(db_models.ShiftInstance, overlapping["id"])
+    assert stored is not None
+    assert stored.assigned_count == 0
+
+    moved = client.put(
+        f"/api/v1/planning/shifts/{morning['id']}",
+        json={"end_utc": (start + timedelta(hours=6)).isoformat()},
+    )
+    assert moved.status_code == 409
+
+    session.expire_all()
+    assignment = session.get(db_models.Assignment, booked["assignment"]["id"])
+    assert assignment is not None
+    assert assignment.booking_active
+    assert assignment.booking_end_utc is not None
+    assert assignment.booking_end_utc.replace(tzinfo=UTC) == start + timedelta(hours=4)
+
+    client.put(f"/api/v1/planning/shifts/{morning['id']}", json={"status": "cancelled"})
+    assert client.post("/api/v1/planning/assignments", json=payload).status_code == 201
+    session.expire_all()
+    assert not assignment.booking_active
+
+
+def test_shift_instances_keyset_pages_and_ndjson_stream(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 2, 3, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    offsets = [4, 0, 2, 2, 6]
+    shifts = [
+        _post_shift(
+            client, mission, start + timedelta(hours=offset), start + timedelta(hours=offset + 1)
+        )
+        for offset in offsets
+    ]
+    _post_assignment(client, shifts[1], collaborator)
+    expected = [
+        shift["id"]
+        for _, shift in sorted(zip(offsets, shifts, strict=True), key=lambda p: (p[0], p[1]["id"]))
+    ]
+
+    seen: list[int] = []
+    params: dict[str, Any] = {"limit": 2}
+    while True:
+        response = client.get("/api/v1/planning/shift-instances", params=params)
+        assert response.status_code == 200
+        seen.extend(view["shift"]["id"] for view in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+    assert seen == expected
+
+    streamed = client.get(
+        "/api/v1/planning/shift-instances",
+        params={"person_ids": collaborator.id},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["shift"]["id"] for line in lines] == [shifts[1]["id"]]
+    assert lines[0]["assignments"][0]["collaborator_id"] == collaborator.id
+
+    full = client.get("/api/v1/planning/shifts", headers={"Accept": "application/x-ndjson"})
+    assert [json.loads(line)["shift"]["id"] for line in full.text.splitlines()] == expected
+
+    invalid = client.get("/api/v1/planning/shift-instances", params={"cursor": "not-a-cursor"})
+    assert invalid.status_code == 400
+
+
+def test_board_listing_stays_within_query_budget(client: TestClient, session: Session) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborators = [_create_collaborator(session, org, role) for _ in range(3)]
+    start = datetime(2031, 3, 3, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    for day in range(12):
+        shift = _post_shift(
+            client,
+            mission,
+            start + timedelta(days=day),
+            start + timedelta(days=day, hours=4),
+            capacity=3,
+        )
+        for collaborator in collaborators[: day % 3 + 1]:
+            _post_assignment(client, shift, collaborator)
+
+    for headers in ({}, {"Accept": "application/x-ndjson"}):
+        with _count_statements() as statements:
+            response = client.get("/api/v1/planning/shift-instances", headers=headers)
+        assert response.status_code == 200
+        # One more statement reads the planning version behind the ETag.
+        assert len(statements) <= BOARD_QUERY_BUDGET + 1, statements
+    views = [json.loads(line) for line in response.text.splitlines()]
+    assert [len(view["assignments"]) for view in views] == [day % 3 + 1 for day in range(12)]
+
+
+def test_board_days_read_model_follows_planning_writes(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    remote = db_models.Site(
+        name="NYC", organization_id=org.id, address="", timezone="America/New_York"
+    )
+    session.add(remote)
+    session.commit()
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 4, 7, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    remote_mission = _create_mission(session, remote.id, role.id, start)
+    first = _post_shift(client, mission, start, start + timedelta(hours=4))
+    overlapping = _post_shift(
+        client, mission, start + timedelta(hours=2), start + timedelta(hours=6)
+    )
+    later = _post_shift(
+        client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=4)
+    )
+    _post_assignment(client, first, collaborator)
+    _post_assignment(client, overlapping, collaborator)
+    night = _post_shift(
+        client,
+        remote_mission,
+        start + timedelta(hours=18),
+        start + timedelta(hours=22),
+    )
+    week = {"organization_id": org.id, "start": "2031-04-06", "end": "2031-04-12"}
+
+    def board() -> dict[tuple[int, str], dict[str, Any]]:
+        response = client.get("/api/v1/planning/board-days", params=week)
+        assert response.status_code == 200, response.text
+        return {(day["site_id"], day["local_date"]): day for day in response.json()}
+
+    with _count_statements() as statements:
+        days = board()
+    assert len(statements) == 2  # planning version (ETag), then the buckets
+    assert set(days) == {
+        (site.id, "2031-04-07"),
+        (site.id, "2031-04-08"),
+        (remote.id, "2031-04-07"),
+    }
+    monday = days[(site.id, "2031-04-07")]
+    assert [shift["id"] for shift in monday["shifts"]] == [first["id"], overlapping["id"]]
+    assert monday["shift_count"] == 2
+    assert monday["hard_conflicts"] >= 2
+    assert "double_booking" in monday["shifts"][1]["conflict_rules"]
+    assert monday["shifts"][0]["assignments"][0]["collaborator_id"] == collaborator.id
+    assert days[(remote.id, "2031-04-07")]["shifts"][0]["id"] == night["id"]
+
+    client.put(
+        f"/api/v1/planning/shifts/{overlapping['id']}",
+        json={
+            "start_utc": (start + timedelta(days=2)).isoformat(),
+            "end_utc": (start + timedelta(days=2, hours=4)).isoformat(),
+        },
+    )
+    client.delete(f"/api/v1/planning/shifts/{later['id']}")
+    days = board()
+    assert set(days) == {
+        (site.id, "2031-04-07"),
+        (site.id, "2031-04-09"),
+        (remote.id, "2031-04-07"),
+    }
+    assert days[(site.id, "2031-04-07")]["hard_conflicts"] == 0
+    assert days[(site.id, "2031-04-09")]["shifts"][0]["assigned_count"] == 1
+
+    def contents(days: dict[tuple[int, str], dict[str, Any]]) -> dict[Any, Any]:
+        return {key: {**day, "updated_at": None} for key, day in days.items()}
+
+    assert client.post("/api/v1/planning/conflicts/rebuild").status_code == 200
+    assert contents(board()) == contents(days)
+    invalid = client.get("/api/v1/planning/board-days", params={**week, "end": "2031-04-01"})
+    assert invalid.status_code == 400
+
+
+def test_planning_reads_answer_not_modified_until_a_write(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 6, 2, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4))
+    board = {"organization_id": org.id, "start": "2031-06-01", "end": "2031-06-07"}
+
+    listing = client.get("/api/v1/planning/shift-instances")
+    days = client.get("/api/v1/planning/board-days", params=board)
+    etag = listing.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert days.headers["ETag"] != etag
+    assert client.get("/api/v1/planning/shift-instances?limit=5").headers["ETag"] != etag
+
+    with _count_statements() as statements:
+        cached = client.get(
+            "/api/v1/planning/shift-instances", headers={"If-None-Match": etag}
+        )
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert len(statements) == 1
+    assert "shift_instances" not in statements[0]
+
+    _post_assignment(client, shift, collaborator)
+    refreshed = client.get("/api/v1/planning/shift-instances", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+    assert len(refreshed.json()[0]["assignments"]) == 1
+    assert (
+        client.get(
+            "/api/v1/planning/board-days",
+            params=board,
+            headers={"If-None-Match": days.headers["ETag"]},
+        ).status_code
+        == 200
+    )
+
+    other = db_models.Organization(name="Other Org", timezone="UTC", currency="EUR")
+    session.add(other)
+    session.commit()
+    quiet = {**board, "organization_id": other.id}
+    quiet_etag = client.get("/api/v1/planning/board-days", params=quiet).headers["ETag"]
+    _post_shift(client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=4))
+    assert (
+        client.get(
+            "/api/v1/planning/board-days", params=quiet, headers={"If-None-Match": quiet_etag}
+        ).status_code
+        == 304
+    )
+
+
+def test_change_feed_returns_compacted_deltas_since_cursor(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 7, 7, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+
+    def changes(**params: int) -> dict[str, Any]:
+        response = client.get("/api/v1/planning/changes", params=params)
+        assert response.status_code == 200, response.text
+        feed: dict[str, Any] = response.json()
+        return feed
+
+    origin = changes()["cursor"]
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4))
+    client.put(f"/api/v1/planning/shifts/{shift['id']}", json={"capacity": 2})
+    assignment = _post_assignment(client, shift, collaborator)["assignment"]
+    client.delete(f"/api/v1/planning/assignments/{assignment['id']}")
+    other = _post_shift(
+        client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=4)
+    )
+
+    feed = changes(since=origin)
+    assert feed["has_more"] is False
+    assert [(item["entity_type"], item["entity_id"]) for item in feed["upserts"]] == [
+        ("shift_instance", shift["id"]),
+        ("shift_instance", other["id"]),
+    ]
+    assert feed["upserts"][0]["data"]["capacity"] == 2
+    assert [(item["entity_type"], item["entity_id"]) for item in feed["tombstones"]] == [
+        ("assignment", assignment["id"])
+    ]
+    assert changes(since=feed["cursor"]) == {
+        "cursor": feed["cursor"],
+        "has_more": False,
+        "upserts": [],
+        "tombstones": [],
+    }
+
+    first = changes(since=origin, limit=2)
+    assert first["has_more"] is True
+    assert [item["data"]["capacity"] for item in first["upserts"]] == [2]
+    second = changes(since=first["cursor"], limit=2)
+    assert second["has_more"] is True
+    assert second["upserts"] == [] and len(second["tombstones"]) == 1
+    third = changes(since=second["cursor"], limit=2)
+    assert third["has_more"] is False
+    assert third["cursor"] == feed["cursor"]
+    assert [item["entity_id"] for item in third["upserts"]] == [other["id"]]
+    assert client.get("/api/v1/planning/changes", params={"limit": 5000}).status_code == 422
+
+    booked = _post_assignment(client, other, collaborator)["assignment"]
+    cursor = changes()["cursor"]
+    job = client.post("/api/v1/planning/auto-assign/start", json={"shift_ids": [shift["id"]]})
+    assert _wait_for_job(client, job.json()["job_id"])["assignments_created"] == 1
+    assert client.delete(f"/api/v1/planning/shifts/{other['id']}").status_code == 204
+    feed = changes(since=cursor)
+    assert {(item["entity_type"], item["entity_id"]) for item in feed["tombstones"]} == {
+        ("assignment", booked["id"]),
+        ("shift_instance", other["id"]),
+    }
+    assert [
+        (item["entity_type"], item["data"]["shift_instance_id"]) for item in feed["upserts"]
+    ] == [("assignment", shift["id"])]
+
+
+def test_coverage_curve_sweeps_capacity_and_assignments(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 8, 4, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    morning = _post_shift(client, mission, start, start + timedelta(hours=4), capacity=2)
+    _post_shift(client, mission, start + timedelta(hours=2), start + timedelta(hours=6))
+    _post_shift(
+        client, mission, start, start + timedelta(hours=6), status="cancelled", capacity=5
+    )
+    _post_assignment(client, morning, collaborator)
+
+    def coverage(hours: tuple[int, int], **params: int | list[int]) -> dict[str, Any]:
+        response = client.get(
+            "/api/v1/planning/coverage",
+            params={
+                "organization_id": org.id,
+                "start": (start + timedelta(hours=hours[0])).isoformat(),
+                "end": (start + timedelta(hours=hours[1])).isoformat(),
+                **params,
+            },
+        )
+        assert response.status_code == 200, response.text
+        report: dict[str, Any] = response.json()
+        return report
+
+    report = coverage((-2, 8), resolution_minutes=120)
+    [series] = report["series"]
+    assert (series["site_id"], series["role_id"]) == (site.id, role.id)
+    assert [datetime.fromisoformat(at) for at in series["at"]] == [
+        start + timedelta(hours=hours) for hours in (0, 2, 4, 6)
+    ]
+    assert series["required"] == [2, 3, 1, 0]
+    assert series["staffed"] == [1, 1, 0, 0]
+    assert series["bucket_required"] == [0, 2, 3, 1, 0]
+    assert series["bucket_staffed"] == [0, 1, 1, 0, 0]
+
+    clipped = coverage((1, 5), resolution_minutes=90)["series"][0]
+    assert datetime.fromisoformat(clipped["at"][0]) == start + timedelta(hours=1)
+    assert datetime.fromisoformat(clipped["at"][-1]) == start + timedelta(hours=5)
+    assert (clipped["required"], clipped["staffed"]) == ([2, 3, 1, 0], [1, 1, 0, 0])
+    assert clipped["bucket_required"] == [2.333, 3.0, 1.0]
+    assert coverage((-2, 8), role_ids=[role.id + 1])["series"] == []
+
+    invalid = client.get(
+        "/api/v1/planning/coverage",
+        params={"start": start.isoformat(), "end": (start + timedelta(days=90)).isoformat()},
+    )
+    assert invalid.status_code == 400
+
+
+def test_recurring_templates_list_virtual_occurrences_until_touched(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    site.timezone = "Europe/Paris"
+    session.commit()
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 3, 24, 7, tzinfo=UTC)  # Monday 08:00 in Paris
+    mission = _create_mission(session, site.id, role.id, start)
+    template_payload = {
+        "mission_id": mission.id,
+        "site_id": site.id,
+        "role_id": role.id,
+        "recurrence_rule": "FREQ=WEEKLY;BYDAY=MO,WE",
+        "start_time_utc": start.isoformat(),
+        "end_time_utc": (start + timedelta(hours=4)).isoformat(),
+        "expected_headcount": 2,
+    }
+    invalid = client.post(
+        "/api/v1/planning/shift-templates",
+        json={**template_payload, "recurrence_rule": "FREQ=MONTHLY"},
+    )
+    assert invalid.status_code == 400
+    template = client.post("/api/v1/planning/shift-templates", json=template_payload)
+    assert template.status_code == 201, template.text
+    manual = _post_shift(
+        client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=2)
+    )
+
+    def listing(**params: str | int) -> list[dict[str, Any]]:
+        response = client.get(
+            "/api/v1/planning/shift-instances",
+            params={
+                "start": (start - timedelta(days=1)).isoformat(),
+                "end": (start + timedelta(days=13)).isoformat(),
+                **params,
+            },
+        )
+        assert response.status_code == 200, response.text
+        return [view["shift"] for view in response.json()]
+
+    shifts = listing()
+    assert [shift["id"] > 0 for shift in shifts] == [False, True, False, False, False]
+    assert [datetime.fromisoformat(shift["start_utc"]) for shift in shifts] == [
+        start,
+        start + timedelta(days=1),
+        start + timedelta(days=2),
+        start + timedelta(days=7) - timedelta(hours=1),  # daylight saving time began
+        start + timedelta(days=9) - timedelta(hours=1),
+    ]
+    virtual = shifts[0]
+    assert virtual["is_virtual"] is True
+    assert (virtual["capacity"], virtual["source"]) == (2, "recurrence")
+    assert shifts[1]["id"] == manual["id"]
+    assert session.scalar(select(func.count()).select_from(db_models.ShiftInstance)) == 1
+    assert [shift["id"] for shift in listing(limit=2)] == [virtual["id"], manual["id"]]
+    assert listing(person_ids=collaborator.id) == []
+
+    assigned = _post_assignment(client, virtual, collaborator)["assignment"]
+    stored_id = assigned["shift_instance_id"]
+    assert stored_id > 0
+    edited = client.put(f"/api/v1/planning/shifts/{shifts[2]['id']}", json={"capacity": 3})
+    assert edited.status_code == 200, edited.text
+    assert edited.json()["shift"]["id"] > 0
+    assert client.delete(f"/api/v1/planning/shifts/{shifts[3]['id']}").status_code == 204
+
+    after = listing()
+    assert [shift["is_virtual"] for shift in after] == [False, False, False, False, True]
+    assert after[0]["id"] == stored_id and after[0]["assigned_count"] == 1
+    assert after[2]["capacity"] == 3
+    assert after[3]["status"] == "cancelled"
+    assert after[4]["id"] == shifts[4]["id"]
+    feed = client.get("/api/v1/planning/changes").json()
+    assert ("shift_instance", after[3]["id"], "cancelled") in {
+        (item["entity_type"], item["entity_id"], item["data"].get("status"))
+        for item in feed["upserts"]
+    }
+    assert not feed["tombstones"]
+    assert session.scalar(select(func.count()).select_from(db_models.ShiftInstance)) == 4
+    assert client.put(
+        f"/api/v1/planning/shifts/{virtual['id']}", json={"capacity": 1}
+    ).json()["shift"]["id"] == stored_id
+    assert client.put(f"/api/v1/planning/shifts/{virtual['id'] - 1}", json={}).status_code == 404
+
+    far = client.get(
+        "/api/v1/planning/shift-instances",
+        params={"start": "2041-01-01T00:00:00+00:00", "end": "2041-01-08T00:00:00+00:00"},
+    ).json()
+    assert [datetime.fromisoformat(view["shift"]["start_utc"]).weekday() for view in far] == [
+        2,
+        0,
+    ]
+
+
+def test_recurring_templates_materialise_in_bulk(client: TestClient, session: Session) -> None:
+    org, role, site = _setup_org_role_site(session)
+    start = datetime(2031, 1, 1, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    template = client.post(
+        "/api/v1/planning/shift-templates",
+        json={
+            "mission_id": mission.id,
+            "site_id": site.id,
+            "role_id": role.id,
+            "recurrence_rule": "FREQ=DAILY",
+            "start_time_utc": start.isoformat(),
+            "end_time_utc": (start + timedelta(hours=8)).isoformat(),
+        },
+    ).json()
+    window = {"start_utc": start.isoformat(), "end_utc": (start + timedelta(days=90)).isoformat()}
+    first = client.get(
+        "/api/v1/planning/shift-instances",
+        params={"start": window["start_utc"], "end": window["end_utc"], "limit": 1},
+    ).json()[0]["shift"]
+    edited = client.put(f"/api/v1/planning/shifts/{first['id']}", json={"capacity": 2})
+    stored_id = edited.json()["shift"]["id"]
+    closed = start + timedelta(days=10)
+    blackout = client.post(
+        "/api/v1/planning/blackouts",
+        json={
+            "site_id": site.id,
+            "start_utc": (closed + timedelta(hours=2)).isoformat(),
+            "end_utc": (closed + timedelta(hours=4)).isoformat(),
+            "reason": "audit",
+        },
+    ).json()
+
+    with _count_statements() as statements:
+        response = client.post(
+            "/api/v1/planning/shift-templates/materialise",
+            json={**window, "template_id": template["id"]},
+        )
+    assert response.status_code == 201, response.text
+    result = response.json()
+    assert (result["template_ids"], result["created"]) == ([template["id"]], 88)
+    assert result["skipped"] == 1
+    assert result["shift_ids"] == sorted(result["shift_ids"])
+    assert stored_id not in result["shift_ids"]
+    inserts = [sql for sql in statements if sql.startswith("INSERT INTO shift_instances")]
+    assert len(inserts) == 1
+
+    listing = client.get(
+        "/api/v1/planning/shift-instances",
+        params={"start": window["start_utc"], "end": window["end_utc"]},
+    ).json()
+    assert len(listing) == 90
+    virtual = [view for view in listing if view["shift"]["is_virtual"]]
+    assert [datetime.fromisoformat(view["shift"]["start_utc"]) for view in virtual] == [closed]
+    assert virtual[0]["conflicts"] == [
+        {
+            "type": "hard",
+            "rule": "site_blackout",
+            "details": {"blackout_id": blackout["id"], "reason": "audit"},
+        }
+    ]
+    assert listing[0]["shift"]["capacity"] == 2
+    assert {view["shift"]["source"] for view in listing} == {"recurrence"}
+    board = client.get(
+        "/api/v1/planning/board-days",
+        params={"organization_id": org.id, "start": "2031-03-31", "end": "2031-04-01"},
+    ).json()
+    assert [day["shift_count"] for day in board] == [1]
+
+    feed = client.get("/api/v1/planning/changes", params={"organization_id": org.id}).json()
+    upserts = {entry["entity_id"] for entry in feed["upserts"]}
+    assert set(result["shift_ids"]) <= upserts
+    again = client.post(
+        "/api/v1/planning/shift-templates/materialise",
+        json={**window, "mission_id": mission.id},
+    )
+    assert (again.status_code, again.json()["created"], again.json()["skipped"]) == (201, 0, 1)
+
+    both = {**window, "template_id": template["id"], "mission_id": mission.id}
+    assert client.post(
+        "/api/v1/planning/shift-templates/materialise", json=both
+    ).status_code == 422
+    assert client.post(
+        "/api/v1/planning/shift-templates/materialise",
+        json={**window, "template_id": template["id"] + 1},
+    ).status_code == 404
+    too_wide = {**window, "end_utc": (start + timedelta(days=400)).isoformat()}
+    assert client.post(
+        "/api/v1/planning/shift-templates/materialise",
+        json={**too_wide, "template_id": template["id"]},
+    ).status_code == 400
+
+
+def test_assignment_batch_upserts_in_one_transaction(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    alice = _create_collaborator(session, org, role)
+    bob = _create_collaborator(session, org, role)
+    start = datetime(2031, 2, 3, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    morning = _post_shift(client, mission, start, start + timedelta(hours=4), capacity=2)
+    overlapping = _post_shift(
+        client, mission, start + timedelta(hours=2), start + timedelta(hours=6)
+    )
+    existing = _post_assignment(client, morning, bob)["assignment"]
+
+    def item(shift: dict[str, Any], collaborator_id: int, **extra: str) -> dict[str, Any]:
+        return {
+            "shift_instance_id": shift["id"],
+            "collaborator_id": collaborator_id,
+            "role_id": shift["role_id"],
+            "status": "proposed",
+            "source": "import",
+            **extra,
+        }
+
+    items = [
+        item(morning, alice.id),
+        item(overlapping, alice.id),
+        item(morning, bob.id, status="confirmed", note="imported"),
+        item(morning, alice.id + bob.id),
+        {**item(overlapping, bob.id), "role_id": role.id + 1},
+    ]
+    with _count_statements() as statements:
+        response = client.post("/api/v1/planning/assignments:batch", json={"items": items})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["created"], result["updated"], result["rejected"]) == (2, 1, 2)
+    assert [entry["status"] for entry in result["items"]] == [
+        "created",
+        "created",
+        "updated",
+        "rejected",
+        "rejected",
+    ]
+    assert result["items"][3]["error"] == "Collaborator not found"
+    assert result["items"][4]["error"] == "Assignment role must match shift role"
+    assert result["items"][2]["assignment"]["id"] == existing["id"]
+    assert result["items"][2]["assignment"]["note"] == "imported"
+    # Both new bookings of Alice overlap: each sees the other batch item.
+    for entry in result["items"][:2]:
+        assert "double_booking" in {conflict["rule"] for conflict in entry["conflicts"]}
+    inserts = [sql for sql in statements if sql.startswith("INSERT INTO assignments")]
+    assert len(inserts) == 1
+
+    session.expire_all()
+    assert [
+        session.get(db_models.ShiftInstance, shift["id"]).assigned_count  # type: ignore[union-attr]
+        for shift in (morning, overlapping)
+    ] == [2, 1]
+    audit = client.get("/api/v1/planning/audit", params={"entity": "assignment"}).json()
+    batch = [entry for entry in audit if entry["payload"]["payload"] == {"batch": True}]
+    assert sorted(entry["action"] for entry in batch) == [
+        "create_assignment",
+        "create_assignment",
+        "update_assignment",
+    ]
+    updated = next(entry for entry in batch if entry["action"] == "update_assignment")
+    assert updated["payload"]["before"]["note"] is None
+    assert updated["payload"]["after"]["note"] == "imported"
+
+    monkeypatch.setattr(settings, "double_booking_constraint", True)
+    late = _post_shift(client, mission, start + timedelta(hours=5), start + timedelta(hours=9))
+    guarded = client.post(
+        "/api/v1/planning/assignments:batch",
+        json={"items": [item(late, bob.id), item(late, alice.id)]},
+    ).json()
+    assert [entry["status"] for entry in guarded["items"]] == ["created", "rejected"]
+    assert guarded["items"][1]["error"] == "Collaborator is already booked during this shift"
+    # Where the database carries the exclusion constraint, the setting is not needed.
+    monkeypatch.setattr(settings, "double_booking_constraint", False)
+    monkeypatch.setattr(planning_pro, "_has_double_booking_constraint", lambda _session: True)
+    inner = _post_shift(client, mission, start + timedelta(hours=6), start + timedelta(hours=7))
+    constrained = client.post(
+        "/api/v1/planning/assignments:batch", json={"items": [item(inner, bob.id)]}
+    ).json()
+    assert [entry["status"] for entry in constrained["items"]] == ["rejected"]
+    assert client.post(
+        "/api/v1/planning/assignments:batch", json={"items": []}
+    ).status_code == 422
+
+
+def test_versioned_writes_reject_stale_updates(client: TestClient, session: Session) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2031, 4, 7, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4), capacity=2)
+    assignment = _post_assignment(client, shift, collaborator)["assignment"]
+    assert (shift["version"], assignment["version"]) == (1, 1)
+
+    def put_shift(body: dict[str, Any], **headers: str) -> httpx.Response:
+        url = f"/api/v1/planning/shifts/{shift['id']}"
+        response: httpx.Response = client.put(url, json=body, headers=headers)
+        return response
+
+    # Assignment writes move assigned_count without bumping the shift version.
+    updated = put_shift({"capacity": 3}, **{"If-Match": '"1"'})
+    assert updated.status_code == 200, updated.text
+    assert updated.headers["ETag"] == '"2"'
+    assert (updated.json()["shift"]["version"], updated.json()["shift"]["assigned_count"]) == (
+        2,
+        1,
+    )
+
+    stale = put_shift({"capacity": 1}, **{"If-Match": '"1"'})
+    assert stale.status_code == 409
+    assert stale.json()["code"] == "version_conflict"
+    assert stale.headers["ETag"] == '"2"'
+    assert (stale.json()["detail"]["version"], stale.json()["detail"]["capacity"]) == (2, 3)
+    for unknown in ("2", 'W/"2"', '"1", "2"', '"v2"'):
+        rejected = put_shift({"capacity": 1}, **{"If-Match": unknown})
+        assert rejected.status_code == 412, unknown
+        assert rejected.json()["code"] == "precondition_failed"
+    assert put_shift({"capacity": 4}, **{"If-Match": "*"}).json()["shift"]["version"] == 3
+    assert put_shift({"capacity": 5}).json()["shift"]["version"] == 4
+
+    moved = client.put(
+        f"/api/v1/planning/assignments/{assignment['id']}",
+        json={"note": "early"},
+        headers={"If-Match": '"1"'},
+    )
+    assert (moved.status_code, moved.headers["ETag"]) == (200, '"2"')
+    conflict = client.put(
+        f"/api/v1/planning/assignments/{assignment['id']}",
+        json={"note": "late"},
+        headers={"If-Match": '"1"'},
+    )
+    assert conflict.status_code == 409
+    assert conflict.json()["detail"]["note"] == "early"
+
+    # A write racing another transaction fails at flush, without row locks.
+    planner = SessionLocal()
+    try:
+        service = ShiftInstanceService(
+            planner, ConflictMaintenanceService(planner, RuleService(planner))
+        )
+        read = planner.get(db_models.ShiftInstance, shift["id"])
+        assert read is not None and read.version == 4
+        assert put_shift({"capacity": 6}).status_code == 200
+        with pytest.raises(StaleVersionError) as raised:
+            service.update_instance(shift["id"], ShiftInstanceUpdate(capacity=7))
+        assert (raised.value.current["version"], raised.value.current["capacity"]) == (5, 6)
+    finally:
+        planner.close()
+
+
+def test_reference_lookups_are_batched_per_request(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborators = [_create_collaborator(session, org, role) for _ in range(3)]
+    start = datetime(2030, 9, 2, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shifts = [
+        _post_shift(
+            client, mission, start + timedelta(days=day), start + timedelta(days=day, hours=2)
+        )
+        for day in range(4)
+    ]
+    items = [
+        {"shift_instance_id": shift["id"], "collaborator_id": collaborator.id, "role_id": role.id}
+        for shift in shifts
+        for collaborator in collaborators
+    ]
+
+    def lookups(statements: list[str], table: str) -> list[str]:
+        return [sql for sql in statements if f"FROM {table} \nWHERE {table}.id IN" in sql]
+
+    with _count_statements() as statements:
+        response = client.post("/api/v1/planning/conflicts/preview", json={"assignments": items})
+    assert response.status_code == 200 and len(response.json()) == len(items)
+    assert len(lookups(statements, "shift_instances")) == 1
+    assert len(lookups(statements, "collaborators")) == 1
+
+    with _count_statements() as statements:
+        response = client.post("/api/v1/planning/assignments:batch", json={"items": items})
+    assert response.json()["created"] == len(items)
+    # Rule evaluation after the insert reuses the collaborators loaded for validation.
+    assert len(lookups(statements, "collaborators")) == 1
+
+
+def test_auto_assign_matches_eligible_collaborators(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    alice, bob, carol = (_create_collaborator(session, org, role) for _ in range(3))
+    other_role = db_models.Role(name="Driver", organization_id=org.id)
+    session.add(other_role)
+    session.commit()
+    dave = _create_collaborator(session, org, other_role)
+    start = datetime(2030, 10, 7, 8, tzinfo=UTC)
+    session.add(
+        db_models.UserAvailability(
+            collaborator_id=carol.id,
+            start_utc=start,
+            end_utc=start + timedelta(days=3),
+            is_available=False,
+            reason="leave",
+        )
+    )
+    session.commit()
+    mission = _create_mission(session, site.id, role.id, start)
+    booked = _post_shift(client, mission, start, start + timedelta(hours=4))
+    _post_assignment(client, booked, alice)
+    day = start + timedelta(days=1)
+    first = _post_shift(client, mission, day, day + timedelta(hours=4))
+    overlapping = _post_shift(
+        client, mission, day + timedelta(hours=2), day + timedelta(hours=6)
+    )
+    later = _post_shift(
+        client, mission, day + timedelta(days=1), day + timedelta(days=1, hours=4)
+    )
+
+    response = client.post(
+        "/api/v1/planning/auto-assign/start",
+        json={"shift_ids": [booked["id"], first["id"], overlapping["id"], later["id"]]},
+    )
+    assert response.status_code == 202
+    job = _wait_for_job(client, response.json()["job_id"])
+    assert (job["slots_open"], job["slots_planned"]) == (3, 3)
+    assert (job["status"], job["assignments_created"]) == ("completed", 3)
+    assert not [conflict for conflict in job["conflicts"] if conflict["type"] == "hard"]
+
+    assigned = dict(
+        session.execute(
+            select(db_models.Assignment.shift_instance_id, db_models.Assignment.collaborator_id)
+            .where(db_models.Assignment.source == "auto-assign-v2")
+        )
+        .tuples()
+        .all()
+    )
+    # Overlapping shifts go to different people; the least loaded takes the next day.
+    assert {assigned[first["id"]], assigned[overlapping["id"]]} == {alice.id, bob.id}
+    assert assigned[later["id"]] == bob.id
+    assert not {carol.id, dave.id} & set(assigned.values())
+
+
+def test_auto_assign_jobs_can_be_cancelled_or_run_out_of_time(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    collaborator = _create_collaborator(session, org, role)
+    start = datetime(2030, 11, 4, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4))
+
+    # Hold submitted jobs so they stay queued until run by hand.
+    held: list[Callable[[], None]] = []
+
+    class _HeldPool:
+        def submit(self, function: Callable[..., None], *args: object) -> None:
+            held.append(lambda: function(*args))
+
+    monkeypatch.setattr(auto_assign_jobs, "_auto_assign_pool", _HeldPool())
+    queued = client.post(
+        "/api/v1/planning/auto-assign/start", json={"shift_ids": [shift["id"]]}
+    ).json()
+    assert queued["status"] == "queued"
+    again = client.post("/api/v1/planning/auto-assign/start", json={"shift_ids": [shift["id"]]})
+    assert again.json()["job_id"] == queued["job_id"]
+
+    cancel_url = f"/api/v1/planning/auto-assign/cancel/{queued['job_id']}"
+    assert client.post(cancel_url).json()["status"] == "cancelled"
+    held.pop()()
+    assert _wait_for_job(client, queued["job_id"])["status"] == "cancelled"
+    assert client.post(cancel_url).status_code == 409
+
+    timed_out = client.post(
+        "/api/v1/planning/auto-assign/start",
+        json={"shift_ids": [shift["id"]], "time_budget_seconds": 1e-9},
+    ).json()
+    held.pop()()
+    job = _wait_for_job(client, timed_out["job_id"])
+    assert job["status"] == "failed" and "Time budget" in job["error"]
+    assert job["slots_open"] == 1
+
+    completed = client.post(
+        "/api/v1/planning/auto-assign/start", json={"shift_ids": [shift["id"]]}
+    ).json()
+    held.pop()()
+    job = _wait_for_job(client, completed["job_id"])
+    assert (job["status"], job["progress"], job["assignments_created"]) == ("completed", 100, 1)
+    assert session.scalar(
+        select(db_models.Assignment.collaborator_id).where(
+            db_models.Assignment.shift_instance_id == shift["id"]
+        )
+    ) == collaborator.id
+
+
+def test_auto_assign_jobs_are_serialised_and_recheck_their_plan(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    alice = _create_collaborator(session, org, role)
+    start = datetime(2030, 11, 18, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    first = _post_shift(client, mission, start, start + timedelta(hours=4))
+    second = _post_shift(
+        client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=4)
+    )
+    overlapping = _post_shift(
+        client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=2)
+    )
+    held: list[Callable[[], None]] = []
+
+    class _HeldPool:
+        def submit(self, function: Callable[..., None], *args: object) -> None:
+            held.append(lambda: function(*args))
+
+    monkeypatch.setattr(auto_assign_jobs, "_auto_assign_pool", _HeldPool())
+    url = "/api/v1/planning/auto-assign/start"
+
+    # Another run holds the lock for longer than this job's budget.
+    waiting = client.post(
+        url, json={"shift_ids": [first["id"]], "time_budget_seconds": 0.05}
+    ).json()
+    with auto_assign_jobs._auto_assign_lock:
+        held.pop()()
+    job = _wait_for_job(client, waiting["job_id"])
+    assert job["status"] == "failed" and "waiting for another job" in job["error"]
+
+    # Planners write in between: the plan is checked again before it is written.
+    plan = auto_assign._AutoAssignPlanner.plan
+
+    def plan_then_write(
+        planner: auto_assign._AutoAssignPlanner,
+        on_wave: Callable[[int, int, int], None] | None = None,
+    ) -> list[AssignmentCreate]:
+        planned = plan(planner, on_wave)
+        assert [item.collaborator_id for item in planned] == [alice.id, alice.id]
+        _post_assignment(client, first, _create_collaborator(session, org, role))
+        _post_assignment(client, overlapping, alice)
+        return planned
+
+    monkeypatch.setattr(auto_assign._AutoAssignPlanner, "plan", plan_then_write)
+    started = client.post(url, json={"shift_ids": [first["id"], second["id"]]}).json()
+    held.pop()()
+    job = _wait_for_job(client, started["job_id"])
+    assert (job["status"], job["assignments_created"]) == ("completed", 0)
+    assert session.scalar(
+        select(func.count())
+        .select_from(db_models.Assignment)
+        .where(db_models.Assignment.source == auto_assign.AUTO_ASSIGN_SOURCE)
+    ) == 0
+    shifts = {
+        view["shift"]["id"]: view["shift"]["assigned_count"]
+        for view in client.get("/api/v1/planning/shift-instances").json()
+    }
+    assert (shifts[first["id"]], shifts[second["id"]]) == (1, 0)
+
+
+def test_auto_assign_jobs_lost_by_their_worker_are_replaced(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    _create_collaborator(session, org, role)
+    start = datetime(2030, 11, 25, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4))
+    held: list[Callable[[], None]] = []
+
+    class _HeldPool:
+        def submit(self, function: Callable[..., None], *args: object) -> None:
+            held.append(lambda: function(*args))
+
+    monkeypatch.setattr(auto_assign_jobs, "_auto_assign_pool", _HeldPool())
+
+    def start_job() -> dict[str, Any]:
+        response = client.post(
+            "/api/v1/planning/auto-assign/start", json={"shift_ids": [shift["id"]]}
+        )
+        assert response.status_code == 202, response.text
+        job: dict[str, Any] = response.json()
+        return job
+
+    def age(job_id: str, **values: object) -> None:
+        session.execute(
+            update(db_models.AutoAssignJob)
+            .where(db_models.AutoAssignJob.id == job_id)
+            .values(**values)
+        )
+        session.commit()
+
+    now = datetime.now(UTC)
+    queued = start_job()
+    assert start_job()["job_id"] == queued["job_id"]
+    age(queued["job_id"], queued_at=now - timedelta(hours=1))
+    replacement = start_job()
+    assert replacement["job_id"] != queued["job_id"]
+    lost = client.get(f"/api/v1/planning/auto-assign/status/{queued['job_id']}").json()
+    assert lost["status"] == "failed" and "not picked up" in lost["error"]
+    held.pop(0)()  # The late worker no longer finds it queued.
+    assert _wait_for_job(client, queued["job_id"])["status"] == "failed"
+
+    age(replacement["job_id"], status="running", started_at=now - timedelta(hours=1))
+    status = client.get(f"/api/v1/planning/auto-assign/status/{replacement['job_id']}").json()
+    assert status["status"] == "failed" and "stopped reporting" in status["error"]
+    assert start_job()["job_id"] not in {queued["job_id"], replacement["job_id"]}
+
+    # Concurrent starts cannot queue a scope twice.
+    active = session.scalars(
+        select(db_models.AutoAssignJob).where(db_models.AutoAssignJob.status == "queued")
+    ).one()
+    session.add(
+        db_models.AutoAssignJob(
+            id="job-duplicate",
+            scope_key=active.scope_key,
+            status="running",
+            time_budget_seconds=1.0,
+            queued_at=now,
+            expires_at=now + timedelta(hours=1),
+        )
+    )
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
+
+    # A slow worker given up while writing its plan still reports it.
+    active_id, slow = active.id, held.pop()
+    plan = auto_assign._AutoAssignPlanner.plan
+
+    def plan_then_stall(
+        planner: auto_assign._AutoAssignPlanner,
+        on_wave: Callable[[int, int, int], None] | None = None,
+    ) -> list[AssignmentCreate]:
+        planned = plan(planner, on_wave)
+        age(active_id, started_at=now - timedelta(hours=1))
+        lost = client.get(f"/api/v1/planning/auto-assign/status/{active_id}").json()
+        assert lost["status"] == "failed"
+        return planned
+
+    monkeypatch.setattr(auto_assign._AutoAssignPlanner, "plan", plan_then_stall)
+    slow()
+    job = _wait_for_job(client, active_id)
+    assert (job["status"], job["assignments_created"], job["error"]) == ("completed", 1, None)
+
+
+def test_auto_assign_jobs_are_stored_per_planning_version_until_expiry(
+    client: TestClient, session: Session
+) -> None:
+    org, role, site = _setup_org_role_site(session)
+    _create_collaborator(session, org, role)
+    start = datetime(2030, 12, 2, 8, tzinfo=UTC)
+    mission = _create_mission(session, site.id, role.id, start)
+    shift = _post_shift(client, mission, start, start + timedelta(hours=4))
+    url = "/api/v1/planning/auto-assign/start"
+
+    def run() -> dict[str, Any]:
+        job = client.post(url, json={"shift_ids": [shift["id"]]}).json()
+        return _wait_for_job(client, job["job_id"])
+
+    planned = run()
+    assert (planned["status"], planned["assignments_created"]) == ("completed", 1)
+    session.expire_all()
+    stored = session.get(db_models.AutoAssignJob, planned["job_id"])
+    assert stored is not None and stored.result is not None
+    assert stored.result["assignment_ids"] == planned["assignment_ids"]
+
+    # Writing the plan moved the planning version, so the same selection runs again.
+    rerun = run()
+    assert rerun["job_id"] != planned["job_id"]
+    assert (rerun["slots_open"], rerun["assignments_created"]) == (0, 0)
+    assert run()["job_id"] == rerun["job_id"]
+    _post_shift(client, mission, start + timedelta(days=1), start + timedelta(days=1, hours=4))
+    assert run()["job_id"] != rerun["job_id"]
+
+    session.execute(
+        update(db_models.AutoAssignJob)
+        .where(db_models.AutoAssignJob.id == planned["job_id"])
+        .values(expires_at=datetime.now(UTC) - timedelta(seconds=1))
+    )
+    session.commit()
+    run()
+    session.expire_all()
+    assert session.get(db_models.AutoAssignJob, planned["job_id"]) is None
+    assert client.get(f"/api/v1/planning/auto-assign/status/{planned['job_id']}").status_code == 404
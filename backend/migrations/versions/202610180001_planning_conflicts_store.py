@@ -0,0 +1,52 @@
+"""Planning PRO – persisted conflict store
+
+Revision ID: 202610180001
+Revises: 202501070001
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180001"
+down_revision = "202501070001"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: Conflicts are maintained on write by ConflictMaintenanceService and read
+# back by shift instance id when listing the planning board.
+
+def upgrade() -> None:
+    op.create_table(
+        "planning_conflicts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "shift_instance_id",
+            sa.Integer(),
+            sa.ForeignKey("shift_instances.id"),
+            nullable=False,
+        ),
+        sa.Column("assignment_id", sa.Integer(), sa.ForeignKey("assignments.id")),
+        sa.Column("collaborator_id", sa.Integer(), sa.ForeignKey("collaborators.id")),
+        sa.Column("rule", sa.String(length=120), nullable=False),
+        sa.Column("type", sa.String(length=10), nullable=False),
+        sa.Column("details", sa.JSON(), nullable=False, server_default=sa.text("'{}'")),
+        sa.Column("computed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_planning_conflicts_shift_instance_id", "planning_conflicts", ["shift_instance_id"]
+    )
+    op.create_index("ix_planning_conflicts_assignment_id", "planning_conflicts", ["assignment_id"])
+    op.create_index(
+        "ix_planning_conflicts_collaborator_id", "planning_conflicts", ["collaborator_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_planning_conflicts_collaborator_id", table_name="planning_conflicts")
+    op.drop_index("ix_planning_conflicts_assignment_id", table_name="planning_conflicts")
+    op.drop_index("ix_planning_conflicts_shift_instance_id", table_name="planning_conflicts")
+    op.drop_table("planning_conflicts")
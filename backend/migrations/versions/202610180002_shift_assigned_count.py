@@ -0,0 +1,47 @@
+"""Planning PRO – denormalised assignment counter on shift instances
+
+Revision ID: 202610180002
+Revises: 202610180001
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180002"
+down_revision = "202610180001"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: assigned_count is kept in step by AssignmentService inside the same
+# transaction as the assignment write; the backfill below seeds existing rows.
+
+def upgrade() -> None:
+    op.add_column(
+        "shift_instances",
+        sa.Column("assigned_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        UPDATE shift_instances
+        SET assigned_count = (
+            SELECT COUNT(*) FROM assignments
+            WHERE assignments.shift_instance_id = shift_instances.id
+        )
+        """
+    )
+    op.create_index(
+        "ix_shift_instances_understaffed",
+        "shift_instances",
+        ["start_utc"],
+        postgresql_where=sa.text("assigned_count < capacity"),
+        sqlite_where=sa.text("assigned_count < capacity"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_shift_instances_understaffed", table_name="shift_instances")
+    op.drop_column("shift_instances", "assigned_count")
@@ -0,0 +1,64 @@
+"""Planning PRO – database-enforced double booking prevention
+
+Revision ID: 202610180003
+Revises: 202610180002
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180003"
+down_revision = "202610180002"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: the booking_* columns mirror the shift window of each assignment and are
+# kept in step by AssignmentService/ShiftInstanceService. The PostgreSQL
+# exclusion constraint over them is created by migration 202610180010, whatever
+# the environment; its name must match DOUBLE_BOOKING_CONSTRAINT in planning_pro.
+
+CONSTRAINT_NAME = "ex_assignments_double_booking"
+
+
+def upgrade() -> None:
+    op.add_column("assignments", sa.Column("booking_start_utc", sa.DateTime(timezone=True)))
+    op.add_column("assignments", sa.Column("booking_end_utc", sa.DateTime(timezone=True)))
+    op.add_column(
+        "assignments",
+        sa.Column("booking_active", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.execute(
+        """
+        UPDATE assignments
+        SET booking_start_utc = (
+                SELECT start_utc FROM shift_instances
+                WHERE shift_instances.id = assignments.shift_instance_id
+            ),
+            booking_end_utc = (
+                SELECT end_utc FROM shift_instances
+                WHERE shift_instances.id = assignments.shift_instance_id
+            ),
+            booking_active = (
+                SELECT status <> 'cancelled' FROM shift_instances
+                WHERE shift_instances.id = assignments.shift_instance_id
+            )
+        """
+    )
+    op.create_index(
+        "ix_assignments_collaborator_booking",
+        "assignments",
+        ["collaborator_id", "booking_start_utc"],
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER TABLE assignments DROP CONSTRAINT IF EXISTS {CONSTRAINT_NAME}")
+    op.drop_index("ix_assignments_collaborator_booking", table_name="assignments")
+    op.drop_column("assignments", "booking_active")
+    op.drop_column("assignments", "booking_end_utc")
+    op.drop_column("assignments", "booking_start_utc")
@@ -0,0 +1,60 @@
+"""Planning PRO – secondary indexes for the hot query paths
+
+Revision ID: 202610180004
+Revises: 202610180003
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180004"
+down_revision = "202610180003"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: collaborator lookups on assignments are served by the leading column of
+# ix_assignments_collaborator_booking (202610180003). On PostgreSQL the indexes
+# are built CONCURRENTLY, outside the migration transaction, so that planning
+# tables stay writable. scripts/benchmark_indexes.py measures their effect.
+
+ACTIVE_SHIFTS = sa.text("status <> 'cancelled'")
+
+INDEXES: list[tuple[str, str, list[str], dict[str, object]]] = [
+    ("ix_assignments_shift_instance_id", "assignments", ["shift_instance_id"], {}),
+    ("ix_shift_instances_start_id", "shift_instances", ["start_utc", "id"], {}),
+    (
+        "ix_shift_instances_active_window",
+        "shift_instances",
+        ["start_utc", "end_utc"],
+        {"postgresql_where": ACTIVE_SHIFTS, "sqlite_where": ACTIVE_SHIFTS},
+    ),
+    ("ix_shift_instances_mission_id", "shift_instances", ["mission_id"], {}),
+    (
+        "ix_user_availabilities_collaborator_start",
+        "user_availabilities",
+        ["collaborator_id", "start_utc"],
+        {},
+    ),
+    (
+        "ix_planning_changes_entity",
+        "planning_changes",
+        ["entity_type", "entity_id", "created_at"],
+        {},
+    ),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""Planning PRO – per-site day buckets read model for the planning board
+
+Revision ID: 202610180005
+Revises: 202610180004
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180005"
+down_revision = "202610180004"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: buckets are rewritten by ConflictMaintenanceService on every planning
+# write; POST /api/v1/planning/conflicts/rebuild fills them for existing data.
+
+def upgrade() -> None:
+    op.create_table(
+        "planning_board_days",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "organization_id", sa.Integer(), sa.ForeignKey("organizations.id"), nullable=False
+        ),
+        sa.Column("site_id", sa.Integer(), sa.ForeignKey("sites.id"), nullable=False),
+        sa.Column("local_date", sa.Date(), nullable=False),
+        sa.Column("shift_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("hard_conflicts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("soft_conflicts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("shifts", sa.JSON(), nullable=False, server_default=sa.text("'[]'")),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint(
+            "organization_id", "site_id", "local_date", name="uix_planning_board_day"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("planning_board_days")
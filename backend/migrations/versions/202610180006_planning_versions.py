@@ -0,0 +1,38 @@
+"""Planning PRO – per-organization planning version counter for conditional reads
+
+Revision ID: 202610180006
+Revises: 202610180005
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180006"
+down_revision = "202610180005"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: rows are created lazily by the first planning write of an organization;
+# a missing row reads as version 0.
+
+def upgrade() -> None:
+    op.create_table(
+        "planning_versions",
+        sa.Column(
+            "organization_id",
+            sa.Integer(),
+            sa.ForeignKey("organizations.id"),
+            primary_key=True,
+            autoincrement=False,
+        ),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("planning_versions")
@@ -0,0 +1,36 @@
+"""Planning PRO – materialised occurrences of recurring shift templates
+
+Revision ID: 202610180007
+Revises: 202610180006
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180007"
+down_revision = "202610180006"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: occurrences of recurring templates are listed virtually and only get a
+# row once assigned or edited; existing instances are manual (NULL occurrence).
+
+def upgrade() -> None:
+    op.add_column(
+        "shift_instances", sa.Column("occurrence_start_utc", sa.DateTime(timezone=True))
+    )
+    op.create_index(
+        "uix_shift_instance_occurrence",
+        "shift_instances",
+        ["template_id", "occurrence_start_utc"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uix_shift_instance_occurrence", table_name="shift_instances")
+    op.drop_column("shift_instances", "occurrence_start_utc")
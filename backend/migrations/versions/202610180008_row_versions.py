@@ -0,0 +1,32 @@
+"""Planning PRO – optimistic concurrency version on shift instances and assignments
+
+Revision ID: 202610180008
+Revises: 202610180007
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180008"
+down_revision = "202610180007"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: existing rows start at version 1; the ORM increments the counter on
+# every update and rejects updates based on an older version.
+
+def upgrade() -> None:
+    for table in ("shift_instances", "assignments"):
+        op.add_column(
+            table,
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        )
+
+
+def downgrade() -> None:
+    for table in ("assignments", "shift_instances"):
+        op.drop_column(table, "version")
@@ -0,0 +1,48 @@
+"""Planning PRO – persistent auto-assign job store
+
+Revision ID: 202610180009
+Revises: 202610180008
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180009"
+down_revision = "202610180008"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: rows are written by AutoAssignJobService and deleted once expires_at
+# (AUTO_ASSIGN_JOB_TTL_SECONDS after queueing or completion) has passed.
+
+def upgrade() -> None:
+    op.create_table(
+        "auto_assign_jobs",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("scope_key", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("progress", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("time_budget_seconds", sa.Float(), nullable=False),
+        sa.Column("cancel_requested", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("slots_open", sa.Integer(), nullable=True),
+        sa.Column("slots_planned", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("assignments_created", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.String(length=500), nullable=True),
+        sa.Column("queued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_auto_assign_jobs_scope", "auto_assign_jobs", ["scope_key", "status"])
+    op.create_index("ix_auto_assign_jobs_expires_at", "auto_assign_jobs", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_auto_assign_jobs_expires_at", table_name="auto_assign_jobs")
+    op.drop_index("ix_auto_assign_jobs_scope", table_name="auto_assign_jobs")
+    op.drop_table("auto_assign_jobs")
@@ -0,0 +1,82 @@
+"""Planning PRO – double booking exclusion constraint
+
+Revision ID: 202610180010
+Revises: 202610180009
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180010"
+down_revision = "202610180009"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: created on every PostgreSQL database, independently of
+# DOUBLE_BOOKING_CONSTRAINT; databases where migration 202610180003 already
+# created it are left as they are. Existing overlapping active bookings would
+# make the ALTER fail, so they are listed first and the upgrade stops until
+# they are resolved (GET /api/v1/planning/validation reports them too). The
+# name must match DOUBLE_BOOKING_CONSTRAINT in planning_pro.
+
+CONSTRAINT_NAME = "ex_assignments_double_booking"
+REPORTED_OVERLAPS = 20
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    exists = bind.scalar(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = :name)"),
+        {"name": CONSTRAINT_NAME},
+    )
+    if exists:
+        return
+    overlaps = bind.execute(
+        sa.text(
+            """
+            SELECT first.collaborator_id, first.id, second.id
+            FROM assignments AS first
+            JOIN assignments AS second
+              ON second.collaborator_id = first.collaborator_id
+             AND second.id > first.id
+             AND second.booking_active
+             AND second.booking_start_utc < first.booking_end_utc
+             AND second.booking_end_utc > first.booking_start_utc
+            WHERE first.booking_active
+            ORDER BY first.collaborator_id, first.id, second.id
+            LIMIT :limit
+            """
+        ),
+        {"limit": REPORTED_OVERLAPS},
+    ).all()
+    if overlaps:
+        listed = ", ".join(
+            f"collaborator {collaborator_id}: assignments {first_id} and {second_id}"
+            for collaborator_id, first_id, second_id in overlaps
+        )
+        raise RuntimeError(
+            f"Cannot create {CONSTRAINT_NAME}: overlapping active assignments exist "
+            f"(first {REPORTED_OVERLAPS} shown) – {listed}. Remove or move them, then "
+            "rerun the migration."
+        )
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        f"""
+        ALTER TABLE assignments ADD CONSTRAINT {CONSTRAINT_NAME}
+        EXCLUDE USING gist (
+            collaborator_id WITH =,
+            tstzrange(booking_start_utc, booking_end_utc, '[)') WITH &&
+        ) WHERE (booking_active)
+        """
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER TABLE assignments DROP CONSTRAINT IF EXISTS {CONSTRAINT_NAME}")
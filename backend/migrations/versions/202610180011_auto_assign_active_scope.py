@@ -0,0 +1,56 @@
+"""Planning PRO – one active auto-assign job per scope
+
+Revision ID: 202610180011
+Revises: 202610180010
+Create Date: 2026-10-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610180011"
+down_revision = "202610180010"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: concurrent starts could queue the same scope twice. All but the latest
+# active job of a scope are marked failed before the unique index is built;
+# their workers no longer claim or finish them.
+
+ACTIVE_JOBS = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        UPDATE auto_assign_jobs
+        SET status = 'failed',
+            error = 'Superseded by another job of the same scope',
+            completed_at = CURRENT_TIMESTAMP
+        WHERE status IN ('queued', 'running')
+          AND EXISTS (
+            SELECT 1 FROM auto_assign_jobs AS newer
+            WHERE newer.scope_key = auto_assign_jobs.scope_key
+              AND newer.status IN ('queued', 'running')
+              AND (
+                newer.queued_at > auto_assign_jobs.queued_at
+                OR (newer.queued_at = auto_assign_jobs.queued_at AND newer.id > auto_assign_jobs.id)
+              )
+          )
+        """
+    )
+    op.create_index(
+        "uix_auto_assign_jobs_active_scope",
+        "auto_assign_jobs",
+        ["scope_key"],
+        unique=True,
+        postgresql_where=ACTIVE_JOBS,
+        sqlite_where=ACTIVE_JOBS,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uix_auto_assign_jobs_active_scope", table_name="auto_assign_jobs")